@@ -1,14 +1,32 @@
 import copy
-from typing import Dict, List, Optional, Tuple, Union
+import threading
+from itertools import product
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
 
-from pgmpy.factors.discrete import TabularCPD
+import numpy as np
+import pandas as pd
+from pgmpy.factors.discrete import DiscreteFactor, TabularCPD
 from pgmpy.inference import VariableElimination
 from pgmpy.models import BayesianNetwork
 
-from bayesiangsn.core.CanonicalCPT import create_binary_logic_gate
+from bayesiangsn.core.ArithmeticCircuit import ArithmeticCircuit
+from bayesiangsn.core.CanonicalCPT import (
+    create_binary_logic_gate,
+    expand_gate_factors,
+    factorize_binary_logic_gate,
+    fold_gate_evidences,
+)
+from bayesiangsn.core.CompiledGateNetwork import CompiledGateNetwork
 from bayesiangsn.core.Enums import EGateModel, EGsnType
+from bayesiangsn.core.FaultTreeBdd import FaultTreeBdd
+from bayesiangsn.core.GateNetwork import GateNetwork
+from bayesiangsn.core.GoalBeliefs import GoalBeliefs
 from bayesiangsn.core.GsnElement import GsnElement
 from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.core.PackedGateNetwork import PackedGateNetwork
+from bayesiangsn.core.QueryPlanner import QueryPlan, plan_query
+from bayesiangsn.core.RareEventSampler import RareEventEstimate, RareEventSampler
+from bayesiangsn.core.ResultCache import ResultCache
 from bayesiangsn.utils.Utils import is_valid_prob
 
 
@@ -23,20 +41,51 @@ class NesicBayesianGsnTree:
         tree_obj (networkx.DiGraph): Parsed GSN tree as real tree structure. Nodes.data contain objects of type GsnElement.
     """
 
-    def __init__(self, name: str, gsn_tree: GsnTree) -> None:
+    def __init__(
+        self,
+        name: str,
+        gsn_tree: GsnTree,
+        dtype: np.dtype = np.float64,
+        log_space: bool = False,
+        subtree_cache: Optional[ResultCache] = None,
+        query_cache_size: int = 1024,
+    ) -> None:
         """Ctor of the NesicBayesianGsnTree class implementing a BN according to Nesic et al. 2021 (https://doi.org/10.1016/j.ssci.2021.105187)
 
         Args:
             name (str): Name of this GSN tree.
             gsn_tree(GsnTree): Original networkX-DiGraph instance of the GSN-Tree (e.g. loaded from a gsn2X YAML)
+            dtype (numpy.dtype): Floating point type of the canonical CPTs and the messages of the native evaluators.
+                Note: pgmpy stores CPDs with its globally configured dtype (see pgmpy.global_vars.config.set_dtype).
+            log_space (bool): Accumulate products over the parents of a gate in log-space (stable for many near-1 beliefs).
+            subtree_cache (ResultCache): Cache of goal beliefs keyed by subtree hashes (see GsnTree.subtree_hashes),
+                which can be shared by multiple instances to reuse the results of identical sub-arguments.
+            query_cache_size (int): Maximum number of cached results of `query_belief_in_goal` (0 disables the cache).
         """
         self._name = name
         self._gsn_tree = gsn_tree
+        self._numeric_options = {"dtype": np.dtype(dtype), "log_space": log_space}
+        self._subtree_cache = subtree_cache
+        self._query_cache = ResultCache(query_cache_size) if query_cache_size else None
 
         self._check_completeness_of_argument(self._gsn_tree)
         self._check_well_formdness(self._gsn_tree)
-        self._gurantee_inference_rules(gsn_tree)
-        self._bn = self._create_bn(self._gsn_tree)
+        self._write_lock = threading.Lock()
+        parents, state_names, priors = self._create_bn(self._gsn_tree)
+        belief_bounds = {
+            label: element.data["belief_bounds"]
+            for label, element in self._gsn_tree.tree_elements.items()
+            if label in priors and element.data.get("belief_bounds", None) is not None
+        }
+        self._snapshot = _ModelSnapshot(
+            0,
+            parents,
+            state_names,
+            priors,
+            belief_bounds,
+            self._gate_specs,
+            self._numeric_options,
+        )
 
         if self._implicit_inf_rules:
             print("The following implict inference rules (Solutions) were added:")
@@ -53,12 +102,41 @@ class NesicBayesianGsnTree:
 
     @property
     def bn(self) -> BayesianNetwork:
-        return self._bn
+        """pgmpy representation of the current model snapshot, which is created on first access."""
+        return self._snapshot.bn()
+
+    @property
+    def state_names(self) -> Dict[str, List[str]]:
+        return self._snapshot.state_names
+
+    @property
+    def subtree_cache(self) -> Optional[ResultCache]:
+        return self._subtree_cache
+
+    @property
+    def query_cache(self) -> Optional[ResultCache]:
+        return self._query_cache
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
 
     @property
     def implict_rules(self) -> Dict[str, GsnElement]:
         return self._implicit_inf_rules
 
+    @property
+    def gate_network(self) -> GateNetwork:
+        """Factorised representation of the current model snapshot (see GateNetwork), which must not be modified."""
+        return self._gate_network()
+
+    @property
+    def is_tree_structured(self) -> bool:
+        """Whether each Goal/Strategy supports a single element, which the compiled evaluators require
+        (e.g. `compile`). Otherwise, i.e. for shared goals, beliefs are inferred by variable elimination.
+        """
+        return self._gate_network().is_tree_structured
+
     def _check_well_formdness(self, gsn_tree):
         """Check the neccessary constraints on a GSN tree as outlined in Defintion 11 of Nesic et al., 2021 (https://doi.org/10.1016/j.ssci.2021.105187)
         to ensure it is a well-formed GSN argumentation.
@@ -186,9 +264,19 @@ class NesicBayesianGsnTree:
                                 )
 
     def _create_bn(self, gsn_tree):
-        """Main logic to convert a well-formed GSN tree (according to Nesic et al.) into a BN representation"""
-        # ToDo: Deal with "Assumptions" as they are expected to be always true --> therefore they can be ommitted from the BN'?
-        cpts = {}
+        """Main logic to convert a well-formed GSN tree (according to Nesic et al.) into a BN representation.
+        The BN is populated as plain structure (parents and state names of each node), beliefs of the root nodes
+        and gate specifications of all other nodes. It is valid by construction, hence no CPDs are created and
+        no model checks are run here (see _ModelSnapshot.bn for the lazily created pgmpy representation).
+
+        Returns:
+            tuple<Dict<str, List<str>>, Dict<str, List<str>>, Dict<str, float>>: Parents and state names of all
+                BN nodes and P(sat|sound) of the root nodes.
+        """
+        # Note: "Assumptions" (and all other root nodes) with a belief of 1.0|0.0 remain part of the BN, but they are
+        #       folded into the CPTs of their children for inference (see _ModelSnapshot.pruned_bn)
+        parents, state_names, priors = {}, {}, {}
+        self._gate_specs = {}
         axiom_types = [
             EGsnType.CONTEXT,
             EGsnType.JUSTIFICATION,
@@ -199,10 +287,9 @@ class NesicBayesianGsnTree:
         root_node_types = evidence_types + axiom_types
 
         # 1) make sure every "Goal" node has a "Strategy" node as a parent in the GSN tree (i.e., add implict inference rules X_psy if needed)
-        mod_gsn_tree, bn_node_connections, implicit_inf_rules = (
-            self._gurantee_inference_rules(gsn_tree)
-        )
+        mod_gsn_tree, _, implicit_inf_rules = self._gurantee_inference_rules(gsn_tree)
         self._implicit_inf_rules = implicit_inf_rules
+        self._mod_gsn_tree = mod_gsn_tree
 
         # 2) map according to Table 3 of Nesic et al., 2021 (https://doi.org/10.1016/j.ssci.2021.105187)
         # Solutions --> root nodes X_e  || states: sat, notSat
@@ -218,20 +305,11 @@ class NesicBayesianGsnTree:
         for label, node in gsn_tree.tree_elements.items():
 
             if node.element_type in root_node_types:
-                prob_axiom_sat = (
-                    node.data.get("belief", None)
-                    if node.data.get("belief", None)
-                    else 1.0
-                )
+                prob_axiom_sat = _prior_belief(node.data)
 
-                cpts[label] = TabularCPD(
-                    variable=label,
-                    variable_card=2,
-                    values=[[prob_axiom_sat], [1 - prob_axiom_sat]],
-                    evidence=None,
-                    evidence_card=None,
-                    state_names={label: ["sat", "notSat"]},
-                )
+                parents[label] = []
+                state_names[label] = ["sat", "notSat"]
+                priors[label] = prob_axiom_sat
 
         # 2.2) focus on explicit Strategy nodes X_psy, as they only have root nodes X_a (contexts) as direct parents
         #      which are given by the GSN design via to the completeness constraints
@@ -242,46 +320,23 @@ class NesicBayesianGsnTree:
                 node.element_type == EGsnType.STRATEGY
                 and label not in self._implicit_inf_rules.keys()
             ):
-
-                cur_state_names = {label: ["sound", "notSound"]}
-                for k in node.contexts:
-                    cur_state_names[k] = ["sat", "notSat"]
-
-                cpts[label] = TabularCPD(
-                    variable=label,
-                    variable_card=2,
-                    values=create_binary_logic_gate(
-                        evidences=node.contexts, gate_model=EGateModel.AND
-                    ),
-                    evidence=node.contexts,
-                    evidence_card=[2] * len(node.contexts),
-                    state_names=cur_state_names,
-                )
-
-                bn_node_connections = bn_node_connections + [
-                    (influence, label) for influence in node.contexts
-                ]
+                parents[label] = list(node.contexts)
+                state_names[label] = ["sound", "notSound"]
+                if not parents[label]:
+                    # an AND over no contexts is always sound
+                    priors[label] = 1.0
+                self._gate_specs[label] = {"gate_model": EGateModel.AND}
 
         # 2.3) implicit Strategy nodes X_psy represent root nodes as they are artifically added
         #      The CPT values need to be MANUALLY set according to Type III CPT values (see Sec. 6.3.3, of Nesic et al., 2021 (https://doi.org/10.1016/j.ssci.2021.105187))
         #      For now we fix all implicit beliefs to a predefined value
 
         for label, node in self._implicit_inf_rules.items():
-            prob_implrule_sound = (
-                node.data.get("belief", None) if node.data.get("belief", None) else 1.0
-            )
+            prob_implrule_sound = _prior_belief(node.data)
 
-            cpts[label] = TabularCPD(
-                variable=label,
-                variable_card=2,
-                values=[
-                    [prob_implrule_sound],
-                    [1 - prob_implrule_sound],
-                ],
-                evidence=None,
-                evidence_card=None,
-                state_names={label: ["sound", "notSound"]},
-            )
+            parents[label] = []
+            state_names[label] = ["sound", "notSound"]
+            priors[label] = prob_implrule_sound
 
         # 2.4) X_p have as parents directly attached axioms X_a, (implicit) inference rules X_Psy, and by an associated Strategy as proxy, preceding premises/goals X_p
         #      Due to that indirect dependence on preceding goals X_p we need to create these nodes "recursively" as stated by Nesic et al.
@@ -305,39 +360,19 @@ class NesicBayesianGsnTree:
                                 preceding_goals.append(y)
                 scoped_influences = all_directly_related_nodes + preceding_goals
 
-                cur_state_names = {label: ["sat", "notSat"]}
-                for k in scoped_influences:
-                    cur_state_names[k] = (
-                        ["sat", "notSat"]
-                        if mod_gsn_tree.tree_elements[k].element_type
-                        in root_node_types + [EGsnType.GOAL]
-                        else ["sound", "notSound"]
-                    )
-
-                cpts[label] = TabularCPD(
-                    variable=label,
-                    variable_card=2,
-                    values=create_binary_logic_gate(
-                        evidences=scoped_influences, gate_model=EGateModel.AND
-                    ),
-                    evidence=scoped_influences,
-                    evidence_card=[2] * len(scoped_influences),
-                    state_names=cur_state_names,
-                )
-
-                bn_node_connections = bn_node_connections + [
-                    (influence, label) for influence in scoped_influences
-                ]
+                parents[label] = scoped_influences
+                state_names[label] = ["sat", "notSat"]
+                self._gate_specs[label] = {"gate_model": EGateModel.AND}
 
-        model = BayesianNetwork(bn_node_connections)
-        model.add_cpds(*list(cpts.values()))
-        model.check_model()
-
-        return model
+        return parents, state_names, priors
 
     def _gurantee_inference_rules(self, gsn_tree):
         """Make sure every "Goal" node has a "Strategy" node as a parent in the GSN tree (i.e., add implict inference rules X_psy if needed)"""
-        mod_gsn_tree = copy.deepcopy(gsn_tree)
+        # only the structure is extended by implicit inference rules, hence the elements are shared
+        mod_gsn_tree = copy.copy(gsn_tree)
+        mod_gsn_tree.tree_elements = dict(gsn_tree.tree_elements)
+        mod_gsn_tree.node_connections = list(gsn_tree.node_connections)
+        mod_gsn_tree.tree_obj = gsn_tree.tree_obj.copy()
         bn_node_connections = []
         implicit_inf_rules = {}
 
@@ -395,17 +430,95 @@ class NesicBayesianGsnTree:
                     f"Belief for element {node} needs to be between 0...1 but is {val}."
                 )
 
-            old_cpt = self._bn.get_cpds(node)
-            self._bn.add_cpds(
-                TabularCPD(
-                    variable=node,
-                    variable_card=2,
-                    values=[[val], [1 - val]],
-                    evidence=None,
-                    evidence_card=None,
-                    state_names=old_cpt.state_names.copy(),
+        with self._write_lock:
+            self._publish_root_beliefs(beliefs)
+
+    def update_beliefs(
+        self, beliefs: Dict[str, Optional[Union[float, Tuple[float, float]]]]
+    ) -> List[str]:
+        """Update the belief of Solutions, Contexts, Justifications and Assumptions (e.g. after editing the YAML).
+        Only the CPDs of the given nodes and the cached messages of their successors are updated.
+        A belief of None restores the default belief of 1.0. An interval (lower, upper) sets imprecise beliefs,
+        its midpoint is used as point belief (see `query_belief_bounds`).
+
+        Returns:
+            List<str>: BN nodes affected by the update (i.e. the given nodes and their successors).
+        """
+        root_node_types = [
+            EGsnType.SOLUTION,
+            EGsnType.CONTEXT,
+            EGsnType.JUSTIFICATION,
+            EGsnType.ASSUMPTION,
+        ]
+
+        for node, val in beliefs.items():
+            element = self._gsn_tree.tree_elements.get(node, None)
+            if not element or element.element_type not in root_node_types:
+                raise ValueError(
+                    f"Scoped element {node} is not a Solution, Context, Justification or Assumption of the GSN tree."
+                )
+
+            if val is not None and not is_valid_prob(val):
+                raise ValueError(
+                    f"Belief for element {node} needs to be between 0...1 but is {val}."
+                )
+            if isinstance(val, (tuple, list)) and (len(val) != 2 or val[0] > val[1]):
+                raise ValueError(
+                    f"Belief interval for element {node} needs to be (lower, upper) but is {val}."
                 )
+
+        with self._write_lock:
+            point_beliefs, belief_bounds = {}, {}
+            for node, val in beliefs.items():
+                data = self._gsn_tree.tree_elements[node].data
+                if isinstance(val, (tuple, list)):
+                    belief_bounds[node] = (float(val[0]), float(val[1]))
+                    data["belief_bounds"] = belief_bounds[node]
+                    val = (val[0] + val[1]) / 2
+                else:
+                    data.pop("belief_bounds", None)
+                data["belief"] = val
+                point_beliefs[node] = 1.0 if val is None else val
+
+            return self._publish_root_beliefs(point_beliefs, belief_bounds)
+
+    def _publish_root_beliefs(
+        self,
+        beliefs: Dict[str, float],
+        belief_bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+    ) -> List[str]:
+        """Publish a new model snapshot with replaced CPDs of BN root nodes (copy-on-write).
+        Cached messages are only recomputed for the successors of the given nodes.
+        Given nodes without belief bounds have a point belief.
+        """
+        snapshot = self._snapshot
+        gate_network = snapshot.gate_network().copy()
+        affected = gate_network.update_priors(beliefs)
+        bounds = {
+            label: x
+            for label, x in snapshot.belief_bounds.items()
+            if label not in beliefs
+        }
+
+        new_snapshot = _ModelSnapshot(
+            snapshot.version + 1,
+            snapshot.parents,
+            snapshot.state_names,
+            gate_network.priors,
+            {**bounds, **(belief_bounds or {})},
+            snapshot.gate_specs,
+            snapshot.numeric_options,
+            gate_network,
+            snapshot.unaffected_cpds(list(beliefs)),
+        )
+        if snapshot.cached_bn is not None:
+            new_snapshot.cached_bn = _replace_cpds(
+                snapshot.cached_bn, [new_snapshot.cpd(node) for node in beliefs]
             )
+        self._snapshot = new_snapshot
+        self._invalidate_query_cache(snapshot.version, beliefs)
+
+        return list(affected)
 
     def change_goal_aggregation(
         self,
@@ -418,30 +531,455 @@ class NesicBayesianGsnTree:
         """Change the default aggregation behaviour (AND) of a goal in the transformed GSN tree (i.e. the BN representation).
         Note: due to the intention of a GSN tree, aggregations should be AND-like."""
 
-        old_cpt = self._bn.get_cpds(goal)
-        self._bn.add_cpds(
-            TabularCPD(
-                variable=goal,
-                variable_card=2,
-                values=create_binary_logic_gate(
-                    evidences=old_cpt.variables[1:],
-                    gate_model=gate_model,
-                    prob_values=prob_values,
-                    substitute_probs=substitute_probs,
-                    leak=leak,
-                ),
-                evidence=old_cpt.variables[1:],
-                evidence_card=old_cpt.cardinality[1:],
-                state_names=old_cpt.state_names.copy(),
+        with self._write_lock:
+            snapshot = self._snapshot
+            if not snapshot.parents.get(goal, None):
+                raise ValueError(
+                    f"Scoped element {goal} is not a goal or strategy of the BN representation."
+                )
+
+            gate_spec = {
+                "gate_model": gate_model,
+                "prob_values": prob_values,
+                "substitute_probs": substitute_probs,
+                "leak": leak,
+            }
+            # validate the parameters before publishing them
+            factorize_binary_logic_gate(evidences=snapshot.parents[goal], **gate_spec)
+            self._gate_specs = {**snapshot.gate_specs, goal: gate_spec}
+
+            new_snapshot = _ModelSnapshot(
+                snapshot.version + 1,
+                snapshot.parents,
+                snapshot.state_names,
+                snapshot.priors,
+                snapshot.belief_bounds,
+                self._gate_specs,
+                snapshot.numeric_options,
+                cpds=snapshot.unaffected_cpds([goal]),
             )
-        )
+            if snapshot.cached_bn is not None:
+                new_snapshot.cached_bn = _replace_cpds(
+                    snapshot.cached_bn, [new_snapshot.cpd(goal)]
+                )
+            self._snapshot = new_snapshot
+            self._invalidate_query_cache(snapshot.version, [goal])
 
     def query_belief_in_goal(
         self, goal: Optional[str] = None, evidence: Optional[Dict[str, str]] = None
-    ) -> float:
+    ) -> DiscreteFactor:
         """Calculate the belief in a provided goal.
         If no arguments are provided, the belief in the main goal is caluclated
+        Inference only runs on the nodes that are relevant for the query (see `plan_query`), unobserved root
+        nodes with a belief of 1.0|0.0 are folded into the CPTs of their children.
+        Results are cached per (goal, evidence, model version), see `query_cache` for the hit-rate.
+        """
+        resolved = self._resolve_goal(goal)
+        if not goal:
+            print(f"Running calculation for primary goal: {resolved}")
+
+        return self._query_belief_in_goal(self._snapshot, resolved, evidence)
+
+    def plan_query(
+        self, goal: Optional[str] = None, evidence: Optional[Dict[str, str]] = None
+    ) -> QueryPlan:
+        """Determine the BN nodes that are relevant for the belief in a goal given evidence, i.e. remove
+        barren nodes and nodes that are d-separated from the goal (see `query_belief_in_goal`).
+        If no goal is provided, the main goal is used.
+
+        Returns:
+            QueryPlan: Required nodes and evidence, and the number of pruned nodes.
+        """
+        return plan_query(self._snapshot.parents, self._resolve_goal(goal), evidence)
+
+    def query_goal_belief(
+        self, goal: Optional[str] = None, evidence: Optional[Dict[str, str]] = None
+    ) -> float:
+        """Calculate the belief P(goal=sat | evidence) as plain float (see `query_beliefs`).
+        If no goal is provided, the belief in the main goal is calculated.
+        """
+        return float(
+            self.query_beliefs([self._resolve_goal(goal)], evidence).beliefs[0, 0]
+        )
+
+    def query_beliefs(
+        self,
+        goals: Optional[List[str]] = None,
+        evidence: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+    ) -> GoalBeliefs:
+        """Calculate the belief P(goal=sat | evidence) of multiple goals (all goals if none are provided).
+        In contrast to `query_belief_in_goal`, no pgmpy objects are involved. The beliefs are obtained by
+        message passing on the factorised representation and returned as lightweight NumPy-backed result.
+        BNs that are not tree-structured (i.e. with shared goals) fall back to `query_belief_in_goal`.
+        As in `query_belief_in_goal`, evidence on a root node sets its belief to 1.0|0.0, hence evidence that
+        contradicts a belief of 1.0|0.0 is admissible.
+
+        Args:
+            goals (List<str>): Queried goals.
+            evidence (Dict<str, str> | List<Dict<str, str>>): Evidence of a single case or a batch of cases.
+
+        Returns:
+            GoalBeliefs: P(sat) of each goal per case (cases x goals).
+        """
+        goals = self._resolve_goals(goals)
+        cases = evidence if isinstance(evidence, list) else [evidence]
+
+        return GoalBeliefs(
+            tuple(goals), self._query_beliefs(self._snapshot, goals, cases)
+        )
+
+    def query_goal_beliefs(self, goals: Optional[List[str]] = None) -> Dict[str, float]:
+        """Calculate the belief (without evidence) of the provided goals, or of all goals if none are provided.
+        The beliefs are obtained from cached messages which are patched incrementally by `update_beliefs`.
+        If a subtree cache is used, beliefs of sub-arguments that are identical to already evaluated ones
+        (also of other instances sharing the cache) are reused instead of being recomputed.
+        BNs that are not tree-structured (i.e. with shared goals) fall back to `query_belief_in_goal`.
+        """
+        goals = self._resolve_goals(goals)
+        # the beliefs and their hashes in the shared cache are taken from the same snapshot
+        snapshot = self._snapshot
+        gate_network = snapshot.gate_network()
+        if not gate_network.is_tree_structured:
+            beliefs = self._query_beliefs(snapshot, goals, [None])
+            return {goal: float(beliefs[0, i]) for i, goal in enumerate(goals)}
+
+        if self._subtree_cache is None:
+            marginals = gate_network.prior_marginals()
+            return {goal: float(marginals[goal][0]) for goal in goals}
+
+        hashes = self._subtree_hashes(snapshot)
+        beliefs = gate_network.prior_beliefs(
+            goals, lambda label: self._subtree_cache.get(hashes[label])
+        )
+        for label in gate_network.closed_nodes:
+            if label in beliefs and hashes[label] not in self._subtree_cache:
+                self._subtree_cache.put(hashes[label], beliefs[label])
+
+        return {goal: beliefs[goal] for goal in goals}
+
+    def query_belief_bounds(
+        self, goals: Optional[List[str]] = None
+    ) -> Dict[str, Tuple[float, float]]:
+        """Calculate guaranteed bounds of the beliefs in goals for imprecise beliefs of the root nodes
+        (e.g. `belief: [0.9, 0.99]` in the YAML) by a single vectorised pass over the compiled gates,
+        instead of inferences for extreme beliefs (see CompiledGateNetwork.evaluate_bounds).
+        Root nodes with a point belief have equal lower and upper bounds.
+
+        Args:
+            goals (List<str>): Queried goals (defaults to all goals).
+
+        Returns:
+            Dict<str, tuple<float, float>>: Lower and upper bound of the belief in each goal.
+        """
+        goals = self._resolve_goals(goals)
+        # the bounds and the beliefs of the compiled program are taken from the same snapshot
+        snapshot = self._snapshot
+        compiled = CompiledGateNetwork(snapshot.gate_network())
+        lower, upper = compiled.priors.copy(), compiled.priors.copy()
+        for i, label in enumerate(compiled.roots):
+            if label in snapshot.belief_bounds:
+                lower[i], upper[i] = snapshot.belief_bounds[label]
+
+        lower, upper = compiled.evaluate_bounds(lower, upper, goals)
+        return {
+            goal: (float(lower[0, i]), float(upper[0, i]))
+            for i, goal in enumerate(goals)
+        }
+
+    def query_failure_explanations(
+        self,
+        goal: Optional[str] = None,
+        top_k: int = 5,
+        evidence: Optional[Dict[str, str]] = None,
+    ) -> List[Tuple[float, Dict[str, str]]]:
+        """Calculate the `top_k` most probable explanations for a goal being not satisfied (i.e. a MAP/MPE query).
+        The explanations are computed by a single k-best max-product pass over the BN without enumerating evidence combinations.
+        If no goal is provided, the explanations for the main goal are calculated.
+
+        Returns:
+            List<tuple<float, Dict<str, str>>>: Posterior probability of each explanation given the (failure) evidence
+                and the corresponding joint state of all BN nodes, sorted by decreasing probability.
+        """
+        goal = self._resolve_goal(goal)
+        evidence = {**(evidence if evidence else {}), goal: "notSat"}
+
+        gate_network = self._gate_network()
+        prob_evidence = gate_network.probability_of_evidence(evidence)
+        if prob_evidence <= 0.0:
+            raise ValueError(
+                f"The provided evidence {evidence} is impossible in the BN representation."
+            )
+
+        return [
+            (joint_prob / prob_evidence, assignment)
+            for joint_prob, assignment in gate_network.max_explanations(evidence, top_k)
+        ]
+
+    def query_diagnostic_beliefs(
+        self, evidence: Optional[Dict[str, str]] = None
+    ) -> Dict[str, float]:
+        """Calculate the posterior belief of all BN root nodes (i.e. X_e, X_a and implicit inference rules) given evidence, e.g. {"G1": "notSat"}.
+        All posteriors are obtained by a single calibrated (upward/downward) message passing pass instead of one query per node.
+
+        Returns:
+            Dict<str, float>: P(sat | evidence) respectively P(sound | evidence) for each BN root node.
+        """
+        gate_network = self._gate_network()
+        marginals = gate_network.marginals(evidence)
+
+        return {label: float(marginals[label][0]) for label in gate_network.priors}
+
+    def rank_evidence_importance(
+        self,
+        goal: Optional[str] = None,
+        element_types: Optional[List[EGsnType]] = None,
+    ) -> pd.DataFrame:
+        """Rank BN root nodes (by default all Solutions) by their influence on the belief in a goal.
+        For each node, the belief in the goal is calculated as if the node were set to 'sat' respectively 'notSat'.
+        All counterfactual beliefs are obtained by one upward/downward pass (i.e. without one query per node).
+        If no goal is provided, the main goal is used.
+
+        Returns:
+            pandas.DataFrame: One row per node with its belief, the goal belief if the node is (not) satisfied and the
+                resulting importance (difference of both), sorted by decreasing importance.
+        """
+        goal = self._resolve_goal(goal)
+        element_types = element_types if element_types else [EGsnType.SOLUTION]
+
+        gate_network = self._gate_network()
+        sensitivities = gate_network.root_sensitivities({goal: "sat"})
+
+        rows = []
+        for label, sensitivity in sensitivities.items():
+            element = self._gsn_tree.tree_elements.get(
+                label, self._implicit_inf_rules.get(label)
+            )
+            if element.element_type not in element_types:
+                continue
+
+            rows.append(
+                {
+                    "node": label,
+                    "belief": gate_network.priors[label],
+                    "goal_belief_if_sat": float(sensitivity[0]),
+                    "goal_belief_if_notSat": float(sensitivity[1]),
+                    "importance": float(sensitivity[0] - sensitivity[1]),
+                }
+            )
+
+        return (
+            pd.DataFrame(
+                rows,
+                columns=[
+                    "node",
+                    "belief",
+                    "goal_belief_if_sat",
+                    "goal_belief_if_notSat",
+                    "importance",
+                ],
+            )
+            .sort_values("importance", ascending=False, kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def sweep_goal_aggregations(
+        self, grid: Dict[str, List[Dict]], goal: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Calculate the belief in a goal for all combinations of alternative aggregations of the scoped goals.
+        The alternatives of each goal are given as keyword arguments of `change_goal_aggregation`, e.g.
+        {"G2": gate_parameter_grid([EGateModel.AND, EGateModel.LEAKY_AND], ..., leaks=[0.01, 0.1])}.
+        Unaffected messages are shared and the evaluation is vectorised over all combinations, the
+        current aggregations of the BN representation are not changed.
+        If no goal is provided, the belief in the main goal is calculated.
+
+        Returns:
+            pandas.DataFrame: One row per combination with the gate parameters of each scoped goal
+                (columns <goal>_<parameter>) and the resulting belief.
+        """
+        goal = self._resolve_goal(goal)
+        gate_network = self._gate_network()
+
+        gate_grid = {}
+        for label, alternatives in grid.items():
+            if label not in gate_network.gates:
+                raise ValueError(
+                    f"Scoped element {label} is not a goal or strategy of the BN representation."
+                )
+            gate_grid[label] = [
+                factorize_binary_logic_gate(
+                    evidences=gate_network.parents[label], **alternative
+                )
+                for alternative in alternatives
+            ]
+
+        beliefs = gate_network.sweep_prior_marginals(gate_grid, [goal])[goal][:, 0]
+
+        columns = {}
+        parameters = ["gate_model", "prob_values", "substitute_probs", "leak"]
+        for label, alternatives in grid.items():
+            for parameter in parameters:
+                columns[f"{label}_{parameter}"] = [
+                    alternative.get(parameter, None) for alternative in alternatives
+                ]
+
+        rows = []
+        for combination in product(*[range(len(x)) for x in grid.values()]):
+            row = {}
+            for label, idx in zip(grid, combination):
+                for parameter in parameters:
+                    value = columns[f"{label}_{parameter}"][idx]
+                    row[f"{label}_{parameter}"] = (
+                        value.value if isinstance(value, EGateModel) else value
+                    )
+            rows.append(row)
+
+        table = pd.DataFrame(rows, columns=list(columns), dtype=object)
+        table["belief"] = beliefs
+
+        return table
+
+    def compile(self) -> CompiledGateNetwork:
+        """Lower the current BN representation into a flat array program for fast repeated evaluations
+        of beliefs without evidence (e.g. millions of belief configurations of the root nodes).
+        The compiled program is independent of later changes of this instance.
+        """
+        return CompiledGateNetwork(self._gate_network())
+
+    @staticmethod
+    def pack(models: List["NesicBayesianGsnTree"]) -> PackedGateNetwork:
+        """Lower the current BN representations of many models (e.g. all assurance cases of a portfolio) into
+        a single array program, which evaluates all of them with one set of NumPy operations per level
+        (see PackedGateNetwork). Outputs are addressed as (model name, label).
+        """
+        names = [model.name for model in models]
+        duplicates = sorted({x for x in names if names.count(x) > 1})
+        if duplicates:
+            raise ValueError(
+                f"Packed models need unique names, but got {duplicates} multiple times."
+            )
+
+        return PackedGateNetwork({model.name: model.gate_network for model in models})
+
+    def compile_circuit(self) -> ArithmeticCircuit:
+        """Compile the current BN representation into an arithmetic circuit, which provides P(evidence), all
+        marginals and all derivatives with respect to the root node beliefs in time linear in its size
+        (see ArithmeticCircuit, e.g. `size` and `compile_time`).
+        The compiled circuit is independent of later changes of this instance.
+        """
+        return ArithmeticCircuit(self._gate_network())
+
+    def compile_fault_tree(
+        self, goal: Optional[str] = None, ordering: Union[str, List[str]] = "dfs"
+    ) -> FaultTreeBdd:
+        """Compile the failure of a goal into a binary decision diagram, which provides its exact probability
+        and the minimal cut sets, i.e. the minimal sets of Solutions, Contexts, Assumptions etc. whose failure
+        falsifies the goal (see FaultTreeBdd). Requires deterministic gates (AND|OR).
+
+        Args:
+            goal (str): Analysed goal, the primary goal of the scoped tree if None.
+            ordering (str | List<str>): Variable ordering heuristic ('dfs' | 'bfs') or an explicit order of the
+                root nodes, which determines the size of the BDD.
+
+        Returns:
+            FaultTreeBdd: BDD of the goal failure, independent of later changes of this instance.
         """
+        goal = self._resolve_goal(goal)
+        snapshot = self._snapshot
+        gates = {
+            label: factorize_binary_logic_gate(
+                evidences=parents, **snapshot.gate_specs[label]
+            )
+            for label, parents in snapshot.parents.items()
+            if parents
+        }
+
+        return FaultTreeBdd(snapshot.parents, gates, snapshot.priors, goal, ordering)
+
+    def estimate_goal_failure(
+        self,
+        goal: Optional[str] = None,
+        n_samples: int = 10000,
+        ce_iterations: int = 10,
+        seed: Optional[int] = None,
+    ) -> RareEventEstimate:
+        """Estimate tiny failure probabilities P(goal=notSat) by importance sampling with a proposal tuned by the
+        cross-entropy method (see RareEventSampler), e.g. for BNs that are too large for exact inference.
+
+        Args:
+            goal (str): Estimated goal, the primary goal of the scoped tree if None.
+            n_samples (int): Number of samples of the final estimate.
+            ce_iterations (int): Maximum number of cross-entropy iterations to tune the proposal.
+            seed (int): Seed of the random number generator.
+
+        Returns:
+            RareEventEstimate: Estimated failure probability and its relative error.
+        """
+        sampler = RareEventSampler(self._gate_network(), self._resolve_goal(goal))
+
+        return sampler.estimate(n_samples, ce_iterations=ce_iterations, seed=seed)
+
+    def _query_belief_in_goal(
+        self,
+        snapshot: "_ModelSnapshot",
+        goal: str,
+        evidence: Optional[Dict[str, str]],
+    ) -> DiscreteFactor:
+        if self._query_cache is None:
+            return self._query_pruned_bn(snapshot, goal, evidence)[1]
+
+        key = (goal, frozenset((evidence or {}).items()), snapshot.version)
+        cached = self._query_cache.get(key)
+        if cached:
+            return cached[1].copy()
+
+        plan, factor = self._query_pruned_bn(snapshot, goal, evidence)
+        # the result only depends on the CPDs of the required nodes
+        self._query_cache.put(key, (frozenset(plan.nodes), factor))
+
+        return factor.copy()
+
+    def _query_pruned_bn(
+        self,
+        snapshot: "_ModelSnapshot",
+        goal: str,
+        evidence: Optional[Dict[str, str]],
+    ) -> Tuple[QueryPlan, DiscreteFactor]:
+        plan = plan_query(snapshot.parents, goal, evidence)
+        factor = VariableElimination(snapshot.pruned_bn(plan)).query(
+            [goal], evidence=plan.evidence
+        )
+
+        return plan, factor
+
+    def _invalidate_query_cache(self, version: int, modified: List[str]) -> None:
+        """Carry cached query results of the given version over to the next version,
+        except results that depend on a modified node (i.e. with the node among their ancestors).
+        """
+        if self._query_cache is None:
+            return
+
+        modified = set(modified)
+        self._query_cache.rekey(
+            lambda key, value: (
+                (*key[:2], version + 1)
+                if key[2] == version and modified.isdisjoint(value[0])
+                else None
+            )
+        )
+
+    def _resolve_goals(self, goals: Optional[List[str]]) -> List[str]:
+        """Validate queried goals or return all goals if none are provided."""
+        if goals:
+            return [self._resolve_goal(goal) for goal in goals]
+
+        return [
+            label
+            for label, node in self._gsn_tree.tree_elements.items()
+            if node.element_type == EGsnType.GOAL
+        ]
+
+    def _resolve_goal(self, goal: Optional[str]) -> str:
+        """Validate a queried goal or return the primary goal if none is provided."""
         if goal:
             goal_node = self.gsn_tree.tree_elements.get(goal, None)
             if not goal_node:
@@ -455,7 +993,284 @@ class NesicBayesianGsnTree:
                 )
         else:
             goal = [n for n, d in self._gsn_tree.tree_obj.in_degree() if d == 0][0]
-            print(f"Running calculation for primary goal: {goal}")
 
-        infer = VariableElimination(self._bn)
-        return infer.query([goal], evidence=evidence)
+        return goal
+
+    def _query_beliefs(
+        self,
+        snapshot: "_ModelSnapshot",
+        goals: List[str],
+        cases: List[Optional[Dict[str, str]]],
+    ) -> np.ndarray:
+        """Calculate P(goal=sat | evidence) of the goals for each case on a single snapshot (see `query_beliefs`)."""
+        gate_network = snapshot.gate_network()
+
+        beliefs = np.empty((len(cases), len(goals)))
+        for i, case in enumerate(cases):
+            if not gate_network.is_tree_structured:
+                beliefs[i] = [
+                    self._query_belief_in_goal(snapshot, goal, case).values[0]
+                    for goal in goals
+                ]
+                continue
+
+            # evidence on root nodes is a belief of 1.0|0.0 (as in pgmpy), which only differs from
+            # conditioning on it if the evidence contradicts a belief of 1.0|0.0, i.e. is impossible
+            network = gate_network
+            contradicted = _contradicted_root_beliefs(gate_network, case)
+            if contradicted:
+                network = gate_network.copy()
+                network.update_priors(contradicted)
+
+            marginals = network.marginals(case) if case else network.prior_marginals()
+            beliefs[i] = [marginals[goal][0] for goal in goals]
+
+        return beliefs
+
+    def _subtree_hashes(
+        self, snapshot: Optional["_ModelSnapshot"] = None
+    ) -> Dict[str, str]:
+        """Return the content hashes of all subtrees of a model snapshot, the current one if none is provided
+        (see GsnTree.subtree_hashes)."""
+        snapshot = snapshot if snapshot else self._snapshot
+        if snapshot.cached_subtree_hashes is None:
+            snapshot.cached_subtree_hashes = self._mod_gsn_tree.subtree_hashes(
+                snapshot.gate_network().priors,
+                snapshot.gate_specs,
+                self._numeric_options,
+                snapshot.parents,
+            )
+
+        return snapshot.cached_subtree_hashes
+
+    def _gate_network(self) -> GateNetwork:
+        """Return the factorised representation of the current model snapshot (see GateNetwork)."""
+        return self._snapshot.gate_network()
+
+
+class _ModelSnapshot:
+    """Immutable, versioned state of the BN representation of a NesicBayesianGsnTree.
+    Mutations publish new snapshots (copy-on-write), so concurrent queries always operate on a consistent
+    model while writers never block readers. The structure (parents and state names) is shared between
+    snapshots, the factorised GateNetwork and the pgmpy BayesianNetwork are created lazily per snapshot.
+    CPDs are created per node on first use (i.e. only for nodes relevant for a query) and carried over to
+    later snapshots unless they depend on a changed node.
+    """
+
+    __slots__ = (
+        "version",
+        "parents",
+        "state_names",
+        "priors",
+        "belief_bounds",
+        "gate_specs",
+        "numeric_options",
+        "cached_bn",
+        "cached_cpds",
+        "cached_gate_network",
+        "cached_subtree_hashes",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        parents: Dict[str, List[str]],
+        state_names: Dict[str, List[str]],
+        priors: Dict[str, float],
+        belief_bounds: Dict[str, Tuple[float, float]],
+        gate_specs: Dict[str, Dict],
+        numeric_options: Dict,
+        gate_network: Optional[GateNetwork] = None,
+        cpds: Optional[Dict[Tuple[str, FrozenSet[str]], TabularCPD]] = None,
+    ) -> None:
+        self.version = version
+        self.parents = parents
+        self.state_names = state_names
+        self.priors = priors
+        self.belief_bounds = belief_bounds
+        self.gate_specs = gate_specs
+        self.numeric_options = numeric_options
+        self.cached_bn = None
+        self.cached_cpds = cpds if cpds else {}
+        self.cached_gate_network = gate_network
+        self.cached_subtree_hashes = None
+
+    def bn(self) -> BayesianNetwork:
+        if self.cached_bn is not None:
+            return self.cached_bn
+
+        self.cached_bn = _bn_from_cpds(
+            self.parents, [self.cpd(label) for label in self.parents]
+        )
+        return self.cached_bn
+
+    def pruned_bn(self, plan: QueryPlan) -> BayesianNetwork:
+        # unobserved root nodes with a belief of 1.0|0.0 are folded into the gates of their children
+        folded = {
+            label
+            for label in plan.nodes
+            if label not in plan.evidence and _is_certain_root(self, label)
+        }
+        nodes = [label for label in plan.nodes if label not in folded]
+
+        # observed parents only fix the states of their children, hence any prior is valid
+        evidence_cpds = [
+            TabularCPD(
+                variable=label,
+                variable_card=2,
+                values=[[0.5], [0.5]],
+                state_names={label: self.state_names[label]},
+            )
+            for label in plan.evidence_roots
+        ]
+
+        return _bn_from_cpds(
+            nodes + plan.evidence_roots,
+            [self.cpd(label, folded) for label in nodes] + evidence_cpds,
+        )
+
+    def cpd(self, label: str, folded: Optional[Set[str]] = None) -> TabularCPD:
+        """Return the CPD of a node, which is only created on first use (e.g. when the node is relevant for a query)."""
+        fixed_parents = (
+            frozenset(self.parents[label]).intersection(folded)
+            if folded
+            else frozenset()
+        )
+        key = (label, fixed_parents)
+        cpd = self.cached_cpds.get(key, None)
+        if cpd is None:
+            cpd = self.cached_cpds[key] = self._create_cpd(label, fixed_parents)
+
+        return cpd
+
+    def unaffected_cpds(
+        self, labels: List[str]
+    ) -> Dict[Tuple[str, FrozenSet[str]], TabularCPD]:
+        """Return the cached CPDs that do not depend on the given nodes (e.g. to carry them over to a new snapshot)."""
+        # concurrent queries may add CPDs, hence the entries are copied at once before filtering
+        entries = list(self.cached_cpds.items())
+        labels = set(labels)
+
+        return {
+            key: cpd
+            for key, cpd in entries
+            if key[0] not in labels and key[1].isdisjoint(labels)
+        }
+
+    def _create_cpd(self, label: str, fixed_parents: FrozenSet[str]) -> TabularCPD:
+        parents = self.parents[label]
+        if not parents:
+            belief = self.priors[label]
+            return TabularCPD(
+                variable=label,
+                variable_card=2,
+                values=[[belief], [1 - belief]],
+                state_names={label: self.state_names[label]},
+            )
+
+        # folded root nodes (belief of 1.0|0.0) have a certain state, which halves the CPT per parent
+        fixed_states = {
+            i: 0 if self.priors[parent] == 1.0 else 1
+            for i, parent in enumerate(parents)
+            if parent in fixed_parents
+        }
+        if fixed_states:
+            values = expand_gate_factors(
+                fold_gate_evidences(
+                    factorize_binary_logic_gate(
+                        evidences=parents, **self.gate_specs[label]
+                    ),
+                    fixed_states,
+                ),
+                **self.numeric_options,
+            )
+            parents = [x for i, x in enumerate(parents) if i not in fixed_states]
+        else:
+            values = create_binary_logic_gate(
+                evidences=parents, **self.gate_specs[label], **self.numeric_options
+            )
+
+        return TabularCPD(
+            variable=label,
+            variable_card=2,
+            values=values,
+            evidence=parents if parents else None,
+            evidence_card=[2] * len(parents) if parents else None,
+            state_names={x: self.state_names[x] for x in [label] + parents},
+        )
+
+    def gate_network(self) -> GateNetwork:
+        if self.cached_gate_network:
+            return self.cached_gate_network
+
+        gates = {
+            label: factorize_binary_logic_gate(
+                evidences=parents, **self.gate_specs[label]
+            )
+            for label, parents in self.parents.items()
+            if parents
+        }
+        self.cached_gate_network = GateNetwork(
+            self.parents,
+            self.state_names,
+            dict(self.priors),
+            gates,
+            **self.numeric_options,
+        )
+        return self.cached_gate_network
+
+
+def _prior_belief(data: Dict) -> float:
+    """Point belief of a root node. A belief of 0 (or none) is treated as not provided, i.e. 1.0, unless it is
+    the midpoint of a belief interval."""
+    if data.get("belief_bounds", None) is not None:
+        return data["belief"]
+
+    return data.get("belief", None) if data.get("belief", None) else 1.0
+
+
+def _contradicted_root_beliefs(
+    gate_network: GateNetwork, evidence: Optional[Dict[str, str]]
+) -> Dict[str, float]:
+    """Beliefs of 1.0|0.0 of the root nodes whose evidence has a probability of zero under their belief."""
+    contradicted = {}
+    for label, state in (evidence or {}).items():
+        # invalid evidence is reported by the inference
+        if (
+            label not in gate_network.priors
+            or state not in gate_network.state_names[label]
+        ):
+            continue
+
+        belief = float(gate_network.state_names[label].index(state) == 0)
+        if gate_network.priors[label] == 1.0 - belief:
+            contradicted[label] = belief
+
+    return contradicted
+
+
+def _is_certain_root(snapshot: _ModelSnapshot, label: str) -> bool:
+    """Check whether a node is a root node with a belief of 1.0|0.0, which can be folded into its children."""
+    return not snapshot.parents[label] and snapshot.priors[label] in (0.0, 1.0)
+
+
+def _bn_from_cpds(nodes: List[str], cpds: List[TabularCPD]) -> BayesianNetwork:
+    """Create a BN whose edges are given by the CPDs, e.g. folded root nodes remain as isolated nodes."""
+    model = BayesianNetwork(
+        [(parent, cpd.variable) for cpd in cpds for parent in cpd.variables[1:]]
+    )
+    model.add_nodes_from(nodes)
+    # the structure and all CPDs are valid by construction, hence pgmpy's model checks are skipped
+    model.cpds = cpds
+
+    return model
+
+
+def _replace_cpds(bn: BayesianNetwork, cpds: List[TabularCPD]) -> BayesianNetwork:
+    """Create a new BN sharing all CPDs of the given BN except the provided replacements."""
+    replacements = {cpd.variable: cpd for cpd in cpds}
+
+    # the CPDs are never modified in place, hence they can be shared between snapshots
+    return _bn_from_cpds(
+        bn.nodes(), [replacements.get(cpd.variable, cpd) for cpd in bn.get_cpds()]
+    )
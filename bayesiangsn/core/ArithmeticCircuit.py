@@ -0,0 +1,444 @@
+import time
+from itertools import product
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from bayesiangsn.core.CanonicalCPT import CanonicalGateFactors
+from bayesiangsn.core.GateNetwork import GateNetwork
+
+# operations of the arithmetic circuit, every operation has exactly two inputs
+OP_ADD, OP_MUL, OP_SUB = 0, 1, 2
+
+
+class CircuitDerivatives(NamedTuple):
+    """Results of a differentiation of an ArithmeticCircuit for a batch of cases.
+
+    Attributes:
+        probability_of_evidence (numpy.ndarray): P(evidence) per case (cases).
+        marginals (numpy.ndarray): P(x | evidence) of all nodes in the order of `labels` (cases x nodes x 2).
+        belief_derivatives (numpy.ndarray): Partial derivatives dP(evidence) / dP(root=True) (cases x roots).
+    """
+
+    probability_of_evidence: np.ndarray
+    marginals: np.ndarray
+    belief_derivatives: np.ndarray
+
+
+class ArithmeticCircuit:
+    """Arithmetic circuit of the network polynomial of a GateNetwork (Darwiche, 2003), compiled once for
+    repeated queries with varying beliefs of the root nodes.
+
+    The network polynomial f(lambda, theta) sums the products of all evidence indicators lambda_x and root
+    beliefs theta_r over all joint states. Its value is P(evidence) and its partial derivatives provide
+    P(x, evidence) = lambda_x * df/dlambda_x for every node x and dP(evidence)/dtheta_r for every root node r.
+    Hence, one upward and one reverse (downward) pass over the circuit yield all marginals and derivatives,
+    in time linear in the size of the circuit.
+
+    The circuit is compiled from the factorised canonical gates, i.e. P(y=target | x) = c * prod_i w_i(x_i):
+        f_y(target) = c * prod_i sum_s w_i(s) f_i(s)
+        f_y(other)  = prod_i sum_s f_i(s) - f_y(target)
+    Constant weights of 0|1 (e.g. of the deterministic AND gates) are folded during compilation, and identical
+    sub-circuits are shared (hash-consing). Shared root nodes are conditioned on: the circuit sums over all their
+    state combinations, sub-circuits that do not depend on these root nodes are shared between the branches.
+
+    The circuit is stored as flat program of binary operations grouped by level (see `levels`), the gate
+    parameters are compiled as constants. All values are calculated in linear space with the dtype of the
+    network (i.e. its log-space option does not apply).
+
+    Attributes:
+        labels (List<str>): All BN nodes (order of the marginals).
+        roots (List<str>): Root nodes in the column order of the beliefs passed to `evaluate`|`differentiate`.
+        priors (numpy.ndarray): Default beliefs P(True) of the root nodes.
+        size (int): Number of arithmetic operations of the circuit.
+        n_inputs (int): Number of inputs (indicators, root beliefs and constants) of the circuit.
+        compile_time (float): Duration of the compilation in seconds.
+        levels (List<Dict<int, Tuple<numpy.ndarray, numpy.ndarray>>>): Per level and operation the indices of
+            both inputs, the outputs of a level are consecutive (following the outputs of the previous level).
+    """
+
+    def __init__(self, network: GateNetwork) -> None:
+        start_time = time.perf_counter()
+
+        self._labels = list(network.order)
+        self._positions = {label: i for i, label in enumerate(self._labels)}
+        self._state_names = network.state_names
+        self._roots = [label for label in self._labels if label in network.priors]
+        self._priors = np.array(
+            [network.priors[label] for label in self._roots], dtype=float
+        )
+        self._dtype = network.dtype
+
+        builder = _CircuitBuilder()
+        indicators = {
+            label: [builder.leaf() for _ in range(2)] for label in self._labels
+        }
+        thetas = {label: [builder.leaf() for _ in range(2)] for label in self._roots}
+
+        sinks = [label for label in self._labels if not network.children[label]]
+        branches = []
+        for states in product([0, 1], repeat=len(network.cutset)):
+            branch = dict(zip(network.cutset, states))
+            # the children of shared root nodes only see the state of the branch, their own term
+            # (indicator and belief) is a factor of the branch
+            messages = {
+                label: [builder.ONE if s == state else builder.ZERO for s in range(2)]
+                for label, state in branch.items()
+            }
+            factors = [
+                builder.mul(indicators[label][state], thetas[label][state])
+                for label, state in branch.items()
+            ]
+            for label in self._labels:
+                if label in branch:
+                    continue
+                if label in thetas:
+                    messages[label] = [
+                        builder.mul(indicators[label][s], thetas[label][s])
+                        for s in range(2)
+                    ]
+                else:
+                    messages[label] = self._compile_gate(
+                        builder,
+                        network.gates[label],
+                        [messages[parent] for parent in network.parents[label]],
+                        indicators[label],
+                    )
+
+            branches.append(
+                builder.product(
+                    factors + [builder.add(*messages[label]) for label in sinks]
+                )
+            )
+        self._output = builder.sum(branches)
+
+        self._compile_program(builder, indicators, thetas)
+        self._compile_time = time.perf_counter() - start_time
+
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+
+    @property
+    def roots(self) -> List[str]:
+        return self._roots
+
+    @property
+    def priors(self) -> np.ndarray:
+        return self._priors
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def n_inputs(self) -> int:
+        return self._n_inputs
+
+    @property
+    def compile_time(self) -> float:
+        return self._compile_time
+
+    @property
+    def levels(self) -> List[Dict[int, Tuple[np.ndarray, np.ndarray]]]:
+        return self._levels
+
+    def evaluate(
+        self,
+        priors: Optional[np.ndarray] = None,
+        evidence: Optional[Dict[str, str]] = None,
+        chunk_size: int = 65536,
+    ) -> np.ndarray:
+        """Calculate P(evidence) for a batch of root node beliefs by an upward pass.
+
+        Args:
+            priors (numpy.ndarray): Beliefs P(True) of the root nodes (cases x roots) in the order of `roots`.
+                A single case may be passed as a vector, if omitted the compiled beliefs are used.
+            evidence (Dict<str, str>): Observed states of BN nodes (the same for all cases).
+            chunk_size (int): Maximum number of cases evaluated at once, which bounds the memory.
+
+        Returns:
+            numpy.ndarray: P(evidence) per case (cases).
+        """
+        priors, inputs = self._prepare(priors, evidence)
+        return np.concatenate(
+            [
+                self._upward(priors[i : i + chunk_size], inputs)[self._output_index]
+                for i in range(0, max(len(priors), 1), chunk_size)
+            ]
+        )
+
+    def differentiate(
+        self,
+        priors: Optional[np.ndarray] = None,
+        evidence: Optional[Dict[str, str]] = None,
+        chunk_size: int = 65536,
+    ) -> CircuitDerivatives:
+        """Calculate P(evidence), the marginals P(x | evidence) of all nodes and the derivatives of P(evidence)
+        with respect to all root node beliefs by an upward and a reverse pass (see `evaluate` for the arguments).
+        """
+        priors, inputs = self._prepare(priors, evidence)
+        results = [
+            self._differentiate_chunk(priors[i : i + chunk_size], inputs)
+            for i in range(0, max(len(priors), 1), chunk_size)
+        ]
+
+        return CircuitDerivatives(*[np.concatenate(x) for x in zip(*results)])
+
+    def _compile_gate(
+        self,
+        builder: "_CircuitBuilder",
+        gate: CanonicalGateFactors,
+        parent_msgs: List[List[int]],
+        indicators: List[int],
+    ) -> List[int]:
+        target = builder.product(
+            [builder.constant(gate.constant)]
+            + [
+                builder.add(
+                    builder.mul(builder.constant(weights[0]), msg[0]),
+                    builder.mul(builder.constant(weights[1]), msg[1]),
+                )
+                for weights, msg in zip(gate.weights, parent_msgs)
+            ]
+        )
+        total = builder.product([builder.add(*msg) for msg in parent_msgs])
+        other = builder.sub(total, target)
+
+        msgs = [target, other] if gate.target_state == 0 else [other, target]
+        return [builder.mul(indicators[s], msgs[s]) for s in range(2)]
+
+    def _compile_program(
+        self,
+        builder: "_CircuitBuilder",
+        indicators: Dict[str, List[int]],
+        thetas: Dict[str, List[int]],
+    ) -> None:
+        """Renumber the circuit into inputs followed by the operations of each level (grouped by operation)."""
+        depth = {}
+        for node, (op, left, right) in enumerate(builder.nodes):
+            depth[node] = 0 if op is None else 1 + max(depth[left], depth[right])
+
+        # only operations the output depends on are kept
+        used = {self._output}
+        for node in range(len(builder.nodes) - 1, -1, -1):
+            op, left, right = builder.nodes[node]
+            if node in used and op is not None:
+                used.update((left, right))
+
+        leaves = [x for x in range(len(builder.nodes)) if builder.nodes[x][0] is None]
+        operations = sorted(
+            (x for x in used if builder.nodes[x][0] is not None),
+            key=lambda x: (depth[x], builder.nodes[x][0]),
+        )
+        index = {node: i for i, node in enumerate(leaves + operations)}
+
+        self._levels = []
+        for node in operations:
+            if depth[node] > len(self._levels):
+                self._levels.append({})
+            op, left, right = builder.nodes[node]
+            inputs = self._levels[depth[node] - 1].setdefault(op, ([], []))
+            inputs[0].append(index[left])
+            inputs[1].append(index[right])
+        self._levels = [
+            {
+                op: (np.array(x, dtype=int), np.array(y, dtype=int))
+                for op, (x, y) in level.items()
+            }
+            for level in self._levels
+        ]
+        # the adjoints of the inputs of an operation group are accumulated by a segmented sum (see _scatter_plan)
+        self._scatter_plans = [
+            {op: _scatter_plan(np.concatenate(inputs)) for op, inputs in level.items()}
+            for level in self._levels
+        ]
+
+        self._n_nodes = len(index)
+        self._n_inputs = len(leaves)
+        self._size = len(operations)
+        self._output_index = index[self._output]
+        self._indicator_index = np.array(
+            [[index[x] for x in indicators[label]] for label in self._labels], dtype=int
+        )
+        self._theta_index = np.array(
+            [[index[x] for x in thetas[label]] for label in self._roots], dtype=int
+        ).reshape(-1, 2)
+        self._constant_index = np.array(
+            [index[x] for x in builder.constants.values()], dtype=int
+        )
+        self._constant_values = np.array(list(builder.constants), dtype=self._dtype)
+
+    def _prepare(
+        self, priors: Optional[np.ndarray], evidence: Optional[Dict[str, str]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        priors = np.atleast_2d(self._priors if priors is None else priors)
+        if priors.shape[1] != len(self._roots):
+            raise ValueError(
+                f"Beliefs of all {len(self._roots)} root nodes need to be provided, but got {priors.shape[1]}."
+            )
+        if np.any((priors < 0.0) | (priors > 1.0)):
+            raise ValueError("Provided beliefs need to be between 0...1.")
+
+        indicators = np.ones((len(self._labels), 2), dtype=self._dtype)
+        for label, state in (evidence if evidence else {}).items():
+            if label not in self._positions or state not in self._state_names[label]:
+                raise ValueError(
+                    f"Provided evidence {label}={state} is not part of the BN representation."
+                )
+            indicators[self._positions[label]] = 0.0
+            indicators[
+                self._positions[label], self._state_names[label].index(state)
+            ] = 1.0
+
+        return priors, indicators
+
+    def _upward(self, priors: np.ndarray, indicators: np.ndarray) -> np.ndarray:
+        values = np.empty((self._n_nodes, len(priors)), dtype=self._dtype)
+        values[self._indicator_index] = indicators[:, :, None]
+        values[self._theta_index[:, 0]] = priors.T
+        values[self._theta_index[:, 1]] = 1.0 - priors.T
+        values[self._constant_index] = self._constant_values[:, None]
+
+        start = self._n_inputs
+        for level in self._levels:
+            for op, (left, right) in level.items():
+                stop = start + len(left)
+                if op == OP_ADD:
+                    values[start:stop] = values[left] + values[right]
+                elif op == OP_MUL:
+                    values[start:stop] = values[left] * values[right]
+                else:
+                    values[start:stop] = values[left] - values[right]
+                start = stop
+
+        return values
+
+    def _differentiate_chunk(
+        self, priors: np.ndarray, indicators: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        values = self._upward(priors, indicators)
+
+        # reverse pass: adjoint df/dv of every node v
+        adjoints = np.zeros_like(values)
+        adjoints[self._output_index] = 1.0
+        stop = self._n_nodes
+        for level, plans in zip(reversed(self._levels), reversed(self._scatter_plans)):
+            for op, (left, right) in reversed(list(level.items())):
+                start = stop - len(left)
+                adjoint = adjoints[start:stop]
+                if op == OP_ADD:
+                    contributions = np.concatenate([adjoint, adjoint])
+                elif op == OP_MUL:
+                    contributions = np.concatenate(
+                        [adjoint * values[right], adjoint * values[left]]
+                    )
+                else:
+                    contributions = np.concatenate([adjoint, -adjoint])
+
+                order, targets, starts = plans[op]
+                adjoints[targets] += np.add.reduceat(contributions[order], starts)
+                stop = start
+
+        prob_evidence = values[self._output_index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            joint = values[self._indicator_index] * adjoints[self._indicator_index]
+            marginals = np.moveaxis(joint / prob_evidence, -1, 0)
+
+        derivatives = (
+            adjoints[self._theta_index[:, 0]] - adjoints[self._theta_index[:, 1]]
+        ).T
+
+        return prob_evidence, marginals, derivatives
+
+
+def _scatter_plan(targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort order, unique targets and segment starts to accumulate values with duplicate targets,
+    i.e. a[unique] += np.add.reduceat(values[order], starts) instead of the much slower np.add.at(a, targets, values).
+    """
+    order = np.argsort(targets, kind="stable")
+    unique, starts = np.unique(targets[order], return_index=True)
+
+    return order, unique, starts
+
+
+class _CircuitBuilder:
+    """Hash-consing construction of a circuit of binary operations with folding of constants."""
+
+    ZERO, ONE = 0, 1
+
+    def __init__(self) -> None:
+        # (operation, left, right) per node, inputs have no operation
+        self.nodes: List[Tuple[Optional[int], Optional[int], Optional[int]]] = []
+        self.constants: Dict[float, int] = {}
+        self._memo: Dict[Tuple, int] = {}
+        self._values: Dict[int, float] = {}
+        self.constant(0.0)
+        self.constant(1.0)
+
+    def leaf(self) -> int:
+        self.nodes.append((None, None, None))
+        return len(self.nodes) - 1
+
+    def constant(self, value: float) -> int:
+        value = float(value)
+        if value not in self.constants:
+            self.constants[value] = self.leaf()
+            self._values[self.constants[value]] = value
+
+        return self.constants[value]
+
+    def add(self, left: int, right: int) -> int:
+        if left in self._values and right in self._values:
+            return self.constant(self._values[left] + self._values[right])
+        if left == self.ZERO:
+            return right
+        if right == self.ZERO:
+            return left
+
+        return self._operation(OP_ADD, *sorted((left, right)))
+
+    def mul(self, left: int, right: int) -> int:
+        if left in self._values and right in self._values:
+            return self.constant(self._values[left] * self._values[right])
+        if self.ZERO in (left, right):
+            return self.ZERO
+        if left == self.ONE:
+            return right
+        if right == self.ONE:
+            return left
+
+        return self._operation(OP_MUL, *sorted((left, right)))
+
+    def sub(self, left: int, right: int) -> int:
+        if left in self._values and right in self._values:
+            return self.constant(self._values[left] - self._values[right])
+        if right == self.ZERO:
+            return left
+
+        return self._operation(OP_SUB, left, right)
+
+    def sum(self, nodes: List[int]) -> int:
+        return self._reduce(self.add, nodes, self.ZERO)
+
+    def product(self, nodes: List[int]) -> int:
+        return self._reduce(self.mul, nodes, self.ONE)
+
+    def _reduce(self, func, nodes: List[int], neutral: int) -> int:
+        # pairwise (balanced) reduction keeps the depth of the circuit logarithmic in the number of inputs
+        nodes = list(nodes) if nodes else [neutral]
+        while len(nodes) > 1:
+            nodes = [
+                func(nodes[i], nodes[i + 1]) if i + 1 < len(nodes) else nodes[i]
+                for i in range(0, len(nodes), 2)
+            ]
+
+        return nodes[0]
+
+    def _operation(self, op: int, left: int, right: int) -> int:
+        key = (op, left, right)
+        if key not in self._memo:
+            self.nodes.append(key)
+            self._memo[key] = len(self.nodes) - 1
+
+        return self._memo[key]
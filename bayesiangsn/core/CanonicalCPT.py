@@ -1,5 +1,5 @@
 from itertools import product
-from typing import List, Optional, Union
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
 
@@ -13,6 +13,8 @@ def create_binary_logic_gate(
     prob_values: Optional[List[float]] = None,
     substitute_probs: Optional[List[float]] = None,
     leak: Optional[float] = None,
+    dtype: np.dtype = np.float64,
+    log_space: bool = False,
 ) -> List[List[float]]:
     """
     Create a canonical CPT based on boolean logic gates.
@@ -21,35 +23,19 @@ def create_binary_logic_gate(
     prob_values: A list of probabilities values for each `evidence` variable to trigger e.g. inhibit a noisy gate.
                 Provided values e.g. for a NoisyOR represent P(y=False | x_i = True, Z=False) for all other parents variables Z.
                 They therfore represent the likelihood that an effect is NOT realized even tho a valid trigger x_i is present.
+    dtype: Floating point type of the returned table, e.g. float32 to halve the memory of large CPTs.
+    log_space: Accumulate the products over the parents in log-space and calculate both states directly
+                (i.e. without 1 - p), which keeps small probabilities of gates with many parents.
     """
-    if prob_values:
-        prob_values = (
-            np.array([prob_values])
-            if not isinstance(prob_values, list)
-            else np.array(prob_values)
+    if log_space:
+        factors = factorize_binary_logic_gate(
+            evidences, gate_model, prob_values, substitute_probs, leak
         )
+        return expand_gate_factors(factors, dtype=dtype, log_space=True)
 
-        if not is_valid_prob(prob_values):
-            raise ValueError(
-                f"Provided probabilities need to be between 0...1 but are {prob_values}."
-            )
-
-    # relevant for leaky|noisy AND
-    if substitute_probs:
-        if not len(substitute_probs) == len(evidences):
-            raise ValueError(
-                f"Substitute probabilities need to be provided for all parental nodes of a noisy|leaky AND."
-            )
-
-        substitute_probs = np.array(substitute_probs)
-
-        if not is_valid_prob(substitute_probs):
-            raise ValueError(
-                f"Provided substitute probabilities need to be between 0...1 but are {substitute_probs}."
-            )
-
-    if leak and not is_valid_prob(leak):
-        raise ValueError(f"Leak probability needs to be between 0...1")
+    prob_values, substitute_probs = _validate_gate_parameters(
+        evidences, prob_values, substitute_probs, leak
+    )
 
     if len(evidences) < 0 or len(evidences) > 31:
         # 31 is due to the maximum supported number of parents in pgmpy
@@ -97,4 +83,202 @@ def create_binary_logic_gate(
     for i, state_combination in enumerate(state_selectors):
         gate_vals[i] = canonical_cpt_function(state_combination)
 
-    return np.stack((gate_vals, 1.0 - gate_vals))
+    return np.stack((gate_vals, 1.0 - gate_vals)).astype(dtype)
+
+
+class CanonicalGateFactors(NamedTuple):
+    """Factorised form of a canonical gate: P(y=target_state | x) = constant * prod_i weights[i, x_i].
+
+    All supported gates are either AND-like (target_state=0, i.e. the 'True' state factorises) or
+    OR-like (target_state=1, i.e. the 'False' state factorises), see Diez & Druzdel, 2007.
+    The state order of the weights follows the CPT convention True | False.
+    """
+
+    target_state: int
+    constant: float
+    weights: np.ndarray
+
+
+def factorize_binary_logic_gate(
+    evidences: List[str],
+    gate_model: Union[str, EGateModel],
+    prob_values: Optional[List[float]] = None,
+    substitute_probs: Optional[List[float]] = None,
+    leak: Optional[float] = None,
+) -> CanonicalGateFactors:
+    """
+    Create the factorised representation of the canonical CPT returned by `create_binary_logic_gate`.
+    In contrast to the dense CPT (2^n columns), the factors grow linearly with the number of evidences.
+    """
+    prob_values, substitute_probs = _validate_gate_parameters(
+        evidences, prob_values, substitute_probs, leak
+    )
+
+    if isinstance(gate_model, str):
+        gate_model = gate_model.lower()
+
+    leak = 0.0 if leak is None else leak
+    weights = np.zeros((len(evidences), 2))
+
+    match gate_model:
+        case EGateModel.AND | "and":
+            weights[:, 0] = 1.0
+            return CanonicalGateFactors(0, 1.0, weights)
+        case EGateModel.OR | "or":
+            weights[:, 1] = 1.0
+            return CanonicalGateFactors(1, 1.0, weights)
+        case EGateModel.NOISY_AND | "noisy_and":
+            weights[:, 0] = 1.0 - prob_values
+            weights[:, 1] = substitute_probs
+            return CanonicalGateFactors(0, 1.0, weights)
+        case EGateModel.LEAKY_AND | "leaky_and":
+            weights[:, 0] = 1.0 - prob_values
+            weights[:, 1] = substitute_probs
+            return CanonicalGateFactors(0, 1.0 - leak, weights)
+        case EGateModel.NOISY_OR | "noisy_or":
+            weights[:, 0] = prob_values
+            weights[:, 1] = 1.0
+            return CanonicalGateFactors(1, 1.0, weights)
+        case EGateModel.LEAKY_OR | "leaky_or":
+            weights[:, 0] = prob_values
+            weights[:, 1] = 1.0
+            return CanonicalGateFactors(1, 1.0 - leak, weights)
+        case _:
+            raise TypeError(f"Unsupported gate type: {gate_model}")
+
+
+def fold_gate_evidences(
+    factors: CanonicalGateFactors, fixed_states: Dict[int, int]
+) -> CanonicalGateFactors:
+    """
+    Fold evidences with a certain state (e.g. root nodes with a belief of 1.0|0.0) into the constant of a
+    factorised gate, i.e. P(y=target | x) = (constant * prod_j weights[j, s_j]) * prod_{i != j} weights[i, x_i].
+    The remaining evidences keep their order, the dense CPT shrinks by a factor of 2 per folded evidence.
+
+    Args:
+        factors (CanonicalGateFactors): Factorised gate.
+        fixed_states (Dict<int, int>): State index (0 = True) of each folded evidence by its position.
+
+    Returns:
+        CanonicalGateFactors: Factorised gate of the remaining evidences.
+    """
+    folded = np.array(list(fixed_states), dtype=int)
+    constant = factors.constant * np.prod(
+        factors.weights[folded, list(fixed_states.values())]
+    )
+
+    return CanonicalGateFactors(
+        factors.target_state,
+        float(constant),
+        np.delete(factors.weights, folded, axis=0),
+    )
+
+
+def expand_gate_factors(
+    factors: CanonicalGateFactors,
+    dtype: np.dtype = np.float64,
+    log_space: bool = False,
+) -> np.ndarray:
+    """
+    Expand a factorised gate into the CPT (2 x 2^n) with the column order of `create_binary_logic_gate`.
+    log_space: Accumulate the products over the parents in log-space and calculate both states directly.
+    """
+    n_evidences = len(factors.weights)
+    if n_evidences > 31:
+        # 31 is due to the maximum supported number of parents in pgmpy
+        raise ValueError(f"Number of binary evidences is out of bounds (0...31).")
+
+    # state index of each parent per column (0 = True), the first parent varies slowest
+    states = (np.arange(2**n_evidences)[:, None] >> np.arange(n_evidences)[::-1]) & 1
+    column_weights = factors.weights[np.arange(n_evidences), states]
+
+    cpt = np.empty((2, 2**n_evidences))
+    if log_space:
+        with np.errstate(divide="ignore"):
+            log_target = np.log(factors.constant) + np.sum(
+                np.log(column_weights), axis=1
+            )
+        cpt[factors.target_state] = np.exp(log_target)
+        cpt[1 - factors.target_state] = -np.expm1(log_target)
+    else:
+        cpt[factors.target_state] = factors.constant * np.prod(column_weights, axis=1)
+        cpt[1 - factors.target_state] = 1.0 - cpt[factors.target_state]
+
+    return cpt.astype(dtype)
+
+
+def gate_parameter_grid(
+    gate_models: List[Union[str, EGateModel]],
+    prob_values: Optional[List[List[float]]] = None,
+    substitute_probs: Optional[List[List[float]]] = None,
+    leaks: Optional[List[float]] = None,
+) -> List[Dict]:
+    """
+    Create all combinations of gate parameters, e.g. for a sweep over different aggregation behaviours.
+    Parameters are only combined for the gate models that use them (e.g. no leak for a NoisyOR).
+    """
+    used_parameters = {
+        EGateModel.AND: [],
+        EGateModel.OR: [],
+        EGateModel.NOISY_AND: ["prob_values", "substitute_probs"],
+        EGateModel.LEAKY_AND: ["prob_values", "substitute_probs", "leak"],
+        EGateModel.NOISY_OR: ["prob_values"],
+        EGateModel.LEAKY_OR: ["prob_values", "leak"],
+    }
+    candidates = {
+        "prob_values": prob_values if prob_values else [None],
+        "substitute_probs": substitute_probs if substitute_probs else [None],
+        "leak": leaks if leaks else [None],
+    }
+
+    grid = []
+    for gate_model in gate_models:
+        gate_model = (
+            EGateModel(gate_model.lower())
+            if isinstance(gate_model, str)
+            else gate_model
+        )
+        parameters = used_parameters[gate_model]
+        for values in product(*[candidates[x] for x in parameters]):
+            grid.append({"gate_model": gate_model, **dict(zip(parameters, values))})
+
+    return grid
+
+
+def _validate_gate_parameters(
+    evidences: List[str],
+    prob_values: Optional[List[float]],
+    substitute_probs: Optional[List[float]],
+    leak: Optional[float],
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """Validate the parameters of a canonical gate and convert them into arrays."""
+    if prob_values:
+        prob_values = (
+            np.array([prob_values])
+            if not isinstance(prob_values, list)
+            else np.array(prob_values)
+        )
+
+        if not is_valid_prob(prob_values):
+            raise ValueError(
+                f"Provided probabilities need to be between 0...1 but are {prob_values}."
+            )
+
+    # relevant for leaky|noisy AND
+    if substitute_probs:
+        if not len(substitute_probs) == len(evidences):
+            raise ValueError(
+                f"Substitute probabilities need to be provided for all parental nodes of a noisy|leaky AND."
+            )
+
+        substitute_probs = np.array(substitute_probs)
+
+        if not is_valid_prob(substitute_probs):
+            raise ValueError(
+                f"Provided substitute probabilities need to be between 0...1 but are {substitute_probs}."
+            )
+
+    if leak and not is_valid_prob(leak):
+        raise ValueError(f"Leak probability needs to be between 0...1")
+
+    return prob_values, substitute_probs
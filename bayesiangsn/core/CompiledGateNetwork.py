@@ -0,0 +1,411 @@
+from collections import defaultdict
+from itertools import product
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from bayesiangsn.core.CanonicalCPT import CanonicalGateFactors
+from bayesiangsn.core.GateNetwork import GateNetwork
+from bayesiangsn.core.SharedArrays import (
+    SharedArraysHandle,
+    attach_arrays,
+    publish_arrays,
+)
+
+
+class CompiledGateNetwork:
+    """Flat array program of a GateNetwork for fast repeated evaluation of P(True) without evidence.
+
+    The structure of a BN representation does not change between queries, only the beliefs of root nodes
+    and the gate parameters do. Compilation lowers the network into topologically ordered levels with
+    integer parent index arrays, gate codes (target state of the canonical gate) and parameter arrays.
+    An evaluation is a loop over the levels of vectorised NumPy operations on a batch of cases, without
+    any dict lookups, labels or pgmpy objects on the hot path.
+
+    Shared root nodes are handled by conditioning (see GateNetwork), i.e. every case is evaluated for all
+    state combinations of the shared root nodes, which are weighted by their beliefs afterwards.
+
+    Attributes:
+        labels (List<str>): All nodes in topological order (index of the node in the array program).
+        roots (List<str>): Root nodes in the column order of the beliefs passed to `evaluate`.
+        priors (numpy.ndarray): Default beliefs P(True) of the root nodes.
+        levels (List<Dict<str, numpy.ndarray>>): Per level the node indices, gate codes, constants, parent
+            indices and weights of all edges (grouped by node) and the start of each node's edge group.
+    """
+
+    def __init__(self, network: GateNetwork) -> None:
+        network._check_tree_structure()
+        self._labels = list(network.order)
+        self._index = {label: i for i, label in enumerate(self._labels)}
+        self._dtype = network.dtype
+        self._log_space = network.log_space
+
+        self._roots = [label for label in self._labels if label in network.priors]
+        self._root_index = np.array([self._index[x] for x in self._roots], dtype=int)
+        self._priors = np.array(
+            [network.priors[label] for label in self._roots], dtype=float
+        )
+
+        # shared root nodes are conditioned on, i.e. enumerated as branches of every case
+        cutset = [self._roots.index(label) for label in network.cutset]
+        self._cutset = np.array(cutset, dtype=int)
+        self._branch_states = np.array(
+            list(product([0, 1], repeat=len(cutset))), dtype=int
+        ).reshape(2 ** len(cutset), len(cutset))
+
+        self._levels = compile_levels(
+            self._labels, network.parents, network.gates, self._dtype
+        )
+        self._gate_location = {
+            self._labels[node]: (i, j)
+            for i, level in enumerate(self._levels)
+            for j, node in enumerate(level["nodes"])
+        }
+
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+
+    @property
+    def roots(self) -> List[str]:
+        return self._roots
+
+    @property
+    def priors(self) -> np.ndarray:
+        return self._priors
+
+    @property
+    def levels(self) -> List[Dict[str, np.ndarray]]:
+        return self._levels
+
+    def share(self, path: Optional[str] = None) -> SharedArraysHandle:
+        """Publish the array program in a memory-mapped file for worker processes (see `attach`).
+
+        Workers of a process pool then receive the small handle instead of a pickled model, and all of them
+        read the same physical memory. The caller owns the file and removes it with `unlink_arrays`.
+
+        Args:
+            path (str): File to write, a temporary file (in /dev/shm if available) if omitted.
+
+        Returns:
+            SharedArraysHandle: Picklable reference to the published program.
+        """
+        arrays = {
+            "labels": np.array(self._labels, dtype=str),
+            "root_index": self._root_index,
+            "priors": self._priors,
+            "cutset": self._cutset,
+            "branch_states": self._branch_states,
+        }
+        for i, level in enumerate(self._levels):
+            arrays.update({f"levels/{i}/{key}": x for key, x in level.items()})
+
+        metadata = {
+            "dtype": self._dtype.str,
+            "log_space": self._log_space,
+            "n_levels": len(self._levels),
+        }
+        return publish_arrays(arrays, metadata, path)
+
+    @classmethod
+    def attach(cls, handle: SharedArraysHandle) -> "CompiledGateNetwork":
+        """Attach read-only to an array program published by `share`, e.g. in a worker process.
+
+        Only the labels are decoded, all numeric arrays are views of the mapped file. Gates of an attached
+        program cannot be updated.
+        """
+        arrays = attach_arrays(handle)
+        network = cls.__new__(cls)
+        network._labels = arrays["labels"].tolist()
+        network._index = {label: i for i, label in enumerate(network._labels)}
+        network._dtype = np.dtype(handle.metadata["dtype"])
+        network._log_space = handle.metadata["log_space"]
+
+        network._root_index = arrays["root_index"]
+        network._roots = [network._labels[i] for i in network._root_index]
+        network._priors = arrays["priors"]
+        network._cutset = arrays["cutset"]
+        network._branch_states = arrays["branch_states"]
+
+        keys = ["nodes", "targets", "constants", "parents", "weights", "starts"]
+        network._levels = [
+            {key: arrays[f"levels/{i}/{key}"] for key in keys}
+            for i in range(handle.metadata["n_levels"])
+        ]
+        # read-only, see `update_gate`
+        network._gate_location = None
+
+        return network
+
+    def update_gate(self, label: str, factors: CanonicalGateFactors) -> None:
+        """Replace the parameters of a compiled gate (e.g. a changed goal aggregation) in place."""
+        if self._gate_location is None:
+            raise ValueError("Gates of an attached (shared) program cannot be updated.")
+        if label not in self._gate_location:
+            raise ValueError(f"Scoped element {label} is not a gate of the BN.")
+
+        level, j = self._gate_location[label]
+        arrays = self._levels[level]
+        start = arrays["starts"][j]
+        stop = (
+            arrays["starts"][j + 1]
+            if j + 1 < len(arrays["starts"])
+            else len(arrays["parents"])
+        )
+        if len(factors.weights) != stop - start:
+            raise ValueError(
+                f"The gate of {label} needs to be defined for all its {stop - start} parents."
+            )
+
+        arrays["targets"][j] = factors.target_state
+        arrays["constants"][j] = factors.constant
+        arrays["weights"][start:stop] = factors.weights
+
+    def evaluate(
+        self,
+        priors: Optional[np.ndarray] = None,
+        outputs: Optional[List[str]] = None,
+        chunk_size: int = 65536,
+    ) -> np.ndarray:
+        """Calculate P(True) of the output nodes for a batch of root node beliefs.
+
+        Args:
+            priors (numpy.ndarray): Beliefs P(True) of the root nodes (cases x roots) in the order of `roots`.
+                A single case may be passed as a vector, if omitted the compiled beliefs are used.
+            outputs (List<str>): Nodes to return, defaults to all nodes in the order of `labels`.
+            chunk_size (int): Maximum number of cases evaluated at once, which bounds the memory.
+
+        Returns:
+            numpy.ndarray: P(True) of the output nodes (cases x outputs).
+        """
+        priors = np.atleast_2d(self._priors if priors is None else priors)
+        if priors.shape[1] != len(self._roots):
+            raise ValueError(
+                f"Beliefs of all {len(self._roots)} root nodes need to be provided, but got {priors.shape[1]}."
+            )
+        if np.any((priors < 0.0) | (priors > 1.0)):
+            raise ValueError("Provided beliefs need to be between 0...1.")
+
+        output_index = (
+            np.arange(len(self._labels))
+            if outputs is None
+            else np.array([self._index[label] for label in outputs], dtype=int)
+        )
+
+        return np.concatenate(
+            [
+                self._evaluate_chunk(priors[i : i + chunk_size], output_index)
+                for i in range(0, max(len(priors), 1), chunk_size)
+            ]
+        )
+
+    def evaluate_bounds(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        outputs: Optional[List[str]] = None,
+        chunk_size: int = 65536,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate guaranteed bounds of P(True) of the output nodes for interval beliefs of the root nodes.
+
+        The factor w_i(x_i) of a canonical gate is linear in P(x_i=True), and the product of the non-negative
+        factors is monotone in each of them. Hence the bounds of all gates follow from the bounds of their
+        parents in a single upward pass (parents are independent given the states of the shared root nodes).
+        P(True) is multilinear in the beliefs of the shared root nodes, hence the branches are weighted by all
+        vertices of their intervals. The bounds are tight unless a shared root node influences an output with
+        opposite monotonicity along different paths.
+
+        Args:
+            lower (numpy.ndarray): Lower bounds of the beliefs P(True) of the root nodes (cases x roots).
+            upper (numpy.ndarray): Upper bounds of the beliefs P(True) of the root nodes (cases x roots).
+            outputs (List<str>): Nodes to return, defaults to all nodes in the order of `labels`.
+            chunk_size (int): Maximum number of cases evaluated at once, which bounds the memory.
+
+        Returns:
+            tuple<numpy.ndarray, numpy.ndarray>: Lower and upper bounds of P(True) of the outputs (cases x outputs).
+        """
+        lower, upper = np.atleast_2d(lower), np.atleast_2d(upper)
+        if lower.shape != upper.shape or lower.shape[1] != len(self._roots):
+            raise ValueError(
+                f"Bounds of all {len(self._roots)} root nodes need to be provided, but got {lower.shape} and {upper.shape}."
+            )
+        if np.any((lower < 0.0) | (upper > 1.0) | (lower > upper)):
+            raise ValueError(
+                "Provided bounds need to be between 0...1 and lower <= upper."
+            )
+
+        output_index = (
+            np.arange(len(self._labels))
+            if outputs is None
+            else np.array([self._index[label] for label in outputs], dtype=int)
+        )
+        chunks = [
+            self._bounds_chunk(
+                lower[i : i + chunk_size], upper[i : i + chunk_size], output_index
+            )
+            for i in range(0, max(len(lower), 1), chunk_size)
+        ]
+
+        return tuple(np.concatenate(x) for x in zip(*chunks))
+
+    def _bounds_chunk(
+        self, lower: np.ndarray, upper: np.ndarray, output_index: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        n_cases, n_branches = len(lower), len(self._branch_states)
+
+        # node-major layout: bounds of P(True) (nodes x lower|upper x cases*branches), see `_evaluate_chunk`
+        bounds = np.empty((len(self._labels), 2, n_cases * n_branches), self._dtype)
+        bounds[self._root_index, 0] = np.repeat(lower.T, n_branches, axis=1)
+        bounds[self._root_index, 1] = np.repeat(upper.T, n_branches, axis=1)
+        for j, root in enumerate(self._cutset):
+            states = np.tile(self._branch_states[:, j], n_cases)
+            bounds[self._root_index[root]] = states == 0
+
+        for arrays in self._levels:
+            parent_bounds = bounds[arrays["parents"]]
+            w_true = arrays["weights"][:, :1, None]
+            w_false = arrays["weights"][:, 1:, None]
+
+            # the factor of each parent is extreme at the bounds of its belief, sorted as [min, max]
+            with np.errstate(divide="ignore"):
+                if self._log_space:
+                    removed = np.sort(
+                        (1 - w_false) + (w_false - w_true) * parent_bounds, axis=1
+                    )
+                    log_target = np.log(arrays["constants"])[
+                        :, None, None
+                    ] + np.add.reduceat(
+                        np.log1p(-np.clip(removed[:, ::-1], 0, 1)),
+                        arrays["starts"],
+                        axis=0,
+                    )
+                    p_target = np.exp(log_target)
+                    p_other = -np.expm1(log_target)
+                else:
+                    terms = np.sort(
+                        w_false + (w_true - w_false) * parent_bounds, axis=1
+                    )
+                    p_target = arrays["constants"][
+                        :, None, None
+                    ] * np.multiply.reduceat(terms, arrays["starts"], axis=0)
+                    p_other = 1.0 - p_target
+
+            is_and = (arrays["targets"] == 0)[:, None, None]
+            bounds[arrays["nodes"]] = np.where(is_and, p_target, p_other[:, ::-1])
+
+        # weight the branches by all vertices of the bounds of the shared root nodes (cases x vertices x branches)
+        vertex_beliefs = np.where(
+            self._branch_states[None] == 0,
+            lower[:, None, self._cutset],
+            upper[:, None, self._cutset],
+        )
+        vertex_weights = np.ones((n_cases, n_branches, n_branches))
+        for j in range(len(self._cutset)):
+            belief = vertex_beliefs[:, :, j, None]
+            vertex_weights *= np.where(
+                self._branch_states[:, j] == 0, belief, 1.0 - belief
+            )
+
+        beliefs = bounds[output_index].reshape(-1, 2, n_cases, n_branches)
+        return (
+            np.einsum("ocb,cvb->cvo", beliefs[:, 0], vertex_weights).min(axis=1),
+            np.einsum("ocb,cvb->cvo", beliefs[:, 1], vertex_weights).max(axis=1),
+        )
+
+    def _evaluate_chunk(
+        self, priors: np.ndarray, output_index: np.ndarray
+    ) -> np.ndarray:
+        n_cases, n_branches = len(priors), len(self._branch_states)
+
+        # node-major layout: messages (nodes x 2 x cases*branches), column = case * n_branches + branch
+        messages = np.empty((len(self._labels), 2, n_cases * n_branches), self._dtype)
+        root_msgs = np.repeat(priors.T, n_branches, axis=1)
+        messages[self._root_index, 0] = root_msgs
+        messages[self._root_index, 1] = 1.0 - root_msgs
+        for j, root in enumerate(self._cutset):
+            states = np.tile(self._branch_states[:, j], n_cases)
+            messages[self._root_index[root], 0] = states == 0
+            messages[self._root_index[root], 1] = states == 1
+
+        propagate_levels(messages, self._levels, self._log_space)
+
+        # weight the branches by the beliefs of the shared root nodes
+        branch_weights = np.ones((n_cases, n_branches))
+        for j, root in enumerate(self._cutset):
+            belief = priors[:, root][:, None]
+            branch_weights *= np.where(
+                self._branch_states[:, j] == 0, belief, 1.0 - belief
+            )
+
+        beliefs = messages[output_index, 0].reshape(-1, n_cases, n_branches)
+        return np.einsum("ocb,cb->co", beliefs, branch_weights)
+
+
+def compile_levels(
+    order: List[Hashable],
+    parents: Dict[Hashable, List[Hashable]],
+    gates: Dict[Hashable, CanonicalGateFactors],
+    dtype: np.dtype = np.float64,
+) -> List[Dict[str, np.ndarray]]:
+    """Lower canonical gates into the levels of a flat array program (see `propagate_levels`).
+    Nodes are indexed by their position in the topological `order`, the level of a gate is the length of
+    the longest path from a root node to it.
+
+    Returns:
+        List<Dict<str, numpy.ndarray>>: Per level the node indices, gate codes, constants, parent indices and
+            weights of all edges (grouped by node) and the start of each node's edge group.
+    """
+    index = {label: i for i, label in enumerate(order)}
+    depth, nodes_by_depth = {}, defaultdict(list)
+    for label in order:
+        depth[label] = 1 + max((depth[parent] for parent in parents[label]), default=-1)
+        nodes_by_depth[depth[label]].append(label)
+
+    levels = []
+    for level in range(1, max(depth.values(), default=0) + 1):
+        nodes = nodes_by_depth[level]
+        sizes = [len(parents[x]) for x in nodes]
+        levels.append(
+            {
+                "nodes": np.array([index[x] for x in nodes], dtype=int),
+                "targets": np.array([gates[x].target_state for x in nodes], dtype=int),
+                "constants": np.array([gates[x].constant for x in nodes], dtype=dtype),
+                "parents": np.array(
+                    [index[p] for x in nodes for p in parents[x]], dtype=int
+                ),
+                "weights": np.concatenate([gates[x].weights for x in nodes]).astype(
+                    dtype
+                ),
+                "starts": np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int),
+            }
+        )
+
+    return levels
+
+
+def propagate_levels(
+    messages: np.ndarray, levels: List[Dict[str, np.ndarray]], log_space: bool
+) -> None:
+    """Calculate the messages (nodes x 2 x columns) of all gates level by level (see `compile_levels`) in place,
+    given the messages of the root nodes."""
+    for arrays in levels:
+        parent_msgs = messages[arrays["parents"]]
+        weights = arrays["weights"][:, :, None]
+
+        with np.errstate(divide="ignore"):
+            if log_space:
+                removed = np.sum(parent_msgs * (1 - weights), axis=1)
+                log_target = np.log(arrays["constants"])[:, None] + np.add.reduceat(
+                    np.log1p(-np.clip(removed, 0, 1)), arrays["starts"], axis=0
+                )
+                p_target = np.exp(log_target)
+                p_other = -np.expm1(log_target)
+            else:
+                p_target = arrays["constants"][:, None] * np.multiply.reduceat(
+                    np.sum(parent_msgs * weights, axis=1), arrays["starts"], axis=0
+                )
+                p_other = 1.0 - p_target
+
+        is_and = (arrays["targets"] == 0)[:, None]
+        messages[arrays["nodes"], 0] = np.where(is_and, p_target, p_other)
+        messages[arrays["nodes"], 1] = np.where(is_and, p_other, p_target)
@@ -31,3 +31,21 @@ class EGateModel(Enum):
     OR = "or"
     LEAKY_OR = "leaky_or"
     NOISY_OR = "noisy_or"
+
+
+class EGsnConstraint(Enum):
+    """Enumeration of the constraints on a GSN tree which are checked by `validate_gsn_elements`.
+    See Definitions 11 and 12 of Nesic et al., 2021 (https://doi.org/10.1016/j.ssci.2021.105187) and
+    Table 1:2-2 Core GSN Relationships in the GSN Community Standard Version 3 (page 18).
+    """
+
+    WELLFORMEDNESS_I = "wellformedness_i"  # goals cannot connect to other goals
+    WELLFORMEDNESS_II = (
+        "wellformedness_ii"  # goals connect to one strategy or solutions
+    )
+    WELLFORMEDNESS_III = "wellformedness_iii"  # strategies connect to a justification
+    COMPLETENESS = "completeness"  # goals have a justification (or via their strategy)
+    SUPPORT_RELATION = "support_relation"  # valid supportedBy relations
+    CONTEXT_RELATION = "context_relation"  # valid inContextOf relations
+    DANGLING_REFERENCE = "dangling_reference"  # references to undefined elements
+    ROOT = "root"  # exactly one root element
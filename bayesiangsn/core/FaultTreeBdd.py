@@ -0,0 +1,322 @@
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from bayesiangsn.core.CanonicalCPT import CanonicalGateFactors
+
+ORDERING_HEURISTICS = ["dfs", "bfs"]
+
+
+class FaultTreeBdd:
+    """Binary decision diagram (ROBDD) of the failure of a goal, i.e. a fault tree analysis of the BN representation.
+
+    The failure (notSat|notSound) of a deterministic gate is a Boolean function of the failures of its parents:
+    an AND gate fails if any parent fails, an OR gate fails if all parents fail. The basic events are the
+    failures of the root nodes (Solutions, Contexts, Justifications, Assumptions and implicit inference rules)
+    with the probability 1 - belief. The BDD is built bottom-up with a unique table and a computed table, hence
+    shared sub-arguments (e.g. shared Contexts) are represented once. Its size depends on the variable order,
+    which is given by a heuristic ('dfs': depth-first, 'bfs': breadth-first traversal from the goal) or explicitly.
+
+    Based on the BDD, the exact failure probability is computed in time linear in its size and the minimal cut
+    sets are encoded by a second BDD (Rauzy, 1993), i.e. without enumerating the basic event combinations.
+    All algorithms are iterative, so BDDs over thousands of basic events do not exceed the recursion limit.
+
+    Attributes:
+        goal (str): Analysed node.
+        variables (List<str>): Basic events (root nodes) in the variable order of the BDD.
+        size (int): Number of inner nodes of the BDD of the goal failure.
+        top_probability (float): Exact probability of the goal failure.
+    """
+
+    def __init__(
+        self,
+        parents: Dict[str, List[str]],
+        gates: Dict[str, CanonicalGateFactors],
+        priors: Dict[str, float],
+        goal: str,
+        ordering: Union[str, List[str]] = "dfs",
+    ) -> None:
+        """
+        Args:
+            parents (Dict<str, List<str>>): Parents of each node in the BN (empty for root nodes).
+            gates (Dict<str, CanonicalGateFactors>): Factorised gates of all non-root nodes, which need to be
+                deterministic ANDs|ORs.
+            priors (Dict<str, float>): P(True) of all root nodes.
+            goal (str): Node whose failure is analysed.
+            ordering (str | List<str>): Variable ordering heuristic ('dfs' | 'bfs') or an explicit order of the
+                root nodes.
+        """
+        if goal not in parents:
+            raise ValueError(f"Scoped element {goal} is not part of the BN.")
+
+        self._goal = goal
+        self._variables = self._order_variables(parents, goal, ordering)
+        self._failure_probs = np.array(
+            [1.0 - priors[label] for label in self._variables]
+        )
+        position = {label: i for i, label in enumerate(self._variables)}
+
+        # node table, the terminals 0|1 are placed after the last variable
+        self._var = [len(self._variables)] * 2
+        self._low = [0, 1]
+        self._high = [0, 1]
+        self._unique: Dict[Tuple[int, int, int], int] = {}
+        self._computed: Dict[Tuple, int] = {}
+
+        failures = {}
+        for label in _topological_order(parents, goal):
+            if not parents[label]:
+                failures[label] = self._node(position[label], 0, 1)
+                continue
+
+            operation = _failure_operation(label, gates[label])
+            failure = 1 if operation == "and" else 0
+            for parent in parents[label]:
+                failure = self._solve((operation, failure, failures[parent]))
+            failures[label] = failure
+
+        self._root = failures[goal]
+        self._mcs_root = None
+
+    @property
+    def goal(self) -> str:
+        return self._goal
+
+    @property
+    def variables(self) -> List[str]:
+        return self._variables
+
+    @property
+    def size(self) -> int:
+        return len(self._reachable(self._root)) - 2
+
+    @property
+    def top_probability(self) -> float:
+        probs = {0: 0.0, 1: 1.0}
+        for node in self._reachable(self._root)[2:]:
+            p = self._failure_probs[self._var[node]]
+            probs[node] = (
+                p * probs[self._high[node]] + (1.0 - p) * probs[self._low[node]]
+            )
+
+        return probs[self._root]
+
+    def n_minimal_cut_sets(self) -> int:
+        """Count the minimal cut sets without enumerating them."""
+        counts = {0: 0, 1: 1}
+        for node in self._reachable(self._minimal_cut_set_root())[2:]:
+            counts[node] = counts[self._high[node]] + counts[self._low[node]]
+
+        return counts[self._minimal_cut_set_root()]
+
+    def minimal_cut_sets(
+        self, max_order: Optional[int] = None
+    ) -> List[Tuple[float, List[str]]]:
+        """Enumerate the minimal cut sets, i.e. the minimal sets of basic events whose failure implies the goal failure.
+
+        Args:
+            max_order (int): Only enumerate cut sets with up to this number of basic events.
+
+        Returns:
+            List<tuple<float, List<str>>>: Probability of each cut set (i.e. of all its events failing) and its
+                basic events, sorted by decreasing probability.
+        """
+        cut_sets = []
+        stack = [(self._minimal_cut_set_root(), [])]
+        while stack:
+            node, events = stack.pop()
+            if node == 1:
+                cut_sets.append(
+                    (
+                        float(np.prod(self._failure_probs[events])),
+                        [self._variables[i] for i in events],
+                    )
+                )
+                continue
+            if node == 0:
+                continue
+
+            stack.append((self._low[node], events))
+            if max_order is None or len(events) < max_order:
+                stack.append((self._high[node], events + [self._var[node]]))
+
+        return sorted(cut_sets, key=lambda x: (-x[0], len(x[1])))
+
+    def _minimal_cut_set_root(self) -> int:
+        if self._mcs_root is None:
+            self._mcs_root = self._solve(("minsol", self._root))
+
+        return self._mcs_root
+
+    def _node(self, var: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+
+        key = (var, low, high)
+        if key not in self._unique:
+            self._var.append(var)
+            self._low.append(low)
+            self._high.append(high)
+            self._unique[key] = len(self._var) - 1
+
+        return self._unique[key]
+
+    def _cofactors(self, node: int, var: int) -> Tuple[int, int]:
+        if self._var[node] != var:
+            return node, node
+
+        return self._low[node], self._high[node]
+
+    def _solve(self, task: Tuple) -> int:
+        """Evaluate a recursive BDD operation with an explicit stack, results are memoised in the computed table."""
+        stack = [task]
+        while stack:
+            current = stack[-1]
+            if current in self._computed:
+                stack.pop()
+                continue
+
+            result, subtasks, combine = self._step(current)
+            if result is not None:
+                self._computed[current] = result
+                stack.pop()
+                continue
+
+            missing = [x for x in subtasks if x not in self._computed]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            self._computed[current] = combine(*[self._computed[x] for x in subtasks])
+            stack.pop()
+
+        return self._computed[task]
+
+    def _step(self, task: Tuple) -> Tuple[Optional[int], List[Tuple], Callable]:
+        """Return the result of a terminal case or the sub-tasks and how their results are combined."""
+        operation, f = task[0], task[1]
+
+        if operation == "minsol":
+            # minimal solutions of a monotone function: f = ite(x, f1, f0) -> ite(x, minsol(f1) \ minsol(f0), minsol(f0))
+            if f < 2:
+                return f, [], None
+            var = self._var[f]
+            low, high = self._low[f], self._high[f]
+            return (
+                None,
+                [("minsol", low), ("minsol", high)],
+                lambda k0, k1: self._node(var, k0, self._solve(("without", k1, k0))),
+            )
+
+        g = task[2]
+        if operation == "without":
+            # all sets of f that are no superset of a set of g
+            if f == 0 or g == 1 or f == g:
+                return 0, [], None
+            if g == 0 or f == 1:
+                return f, [], None
+            var = min(self._var[f], self._var[g])
+            f0, f1 = self._cofactors(f, var)
+            g0, g1 = self._cofactors(g, var)
+            if self._var[f] != var:
+                return None, [("without", f, g0)], lambda k: k
+            return (
+                None,
+                [("without", f0, g0), ("without", f1, g1)],
+                lambda k0, k1: self._node(var, k0, self._solve(("without", k1, g0))),
+            )
+
+        # and|or of two functions
+        absorbing, neutral = (0, 1) if operation == "and" else (1, 0)
+        if absorbing in (f, g):
+            return absorbing, [], None
+        if f == neutral or f == g:
+            return g, [], None
+        if g == neutral:
+            return f, [], None
+        if f > g:
+            return None, [(operation, g, f)], lambda k: k
+        var = min(self._var[f], self._var[g])
+        f0, f1 = self._cofactors(f, var)
+        g0, g1 = self._cofactors(g, var)
+        return (
+            None,
+            [(operation, f0, g0), (operation, f1, g1)],
+            lambda k0, k1: self._node(var, k0, k1),
+        )
+
+    def _reachable(self, root: int) -> List[int]:
+        """Return the terminals and all inner nodes reachable from a root, children before their parents."""
+        found = {root}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node > 1:
+                for child in (self._low[node], self._high[node]):
+                    if child not in found:
+                        found.add(child)
+                        stack.append(child)
+
+        # nodes are always created after their children
+        return [0, 1] + sorted(x for x in found if x > 1)
+
+    @staticmethod
+    def _order_variables(
+        parents: Dict[str, List[str]], goal: str, ordering: Union[str, List[str]]
+    ) -> List[str]:
+        roots = []
+        if isinstance(ordering, str):
+            if ordering not in ORDERING_HEURISTICS:
+                raise ValueError(
+                    f"Unsupported ordering heuristic {ordering}, use one of {ORDERING_HEURISTICS} or a list of root nodes."
+                )
+
+            visited = {goal}
+            frontier = [goal]
+            while frontier:
+                label = frontier.pop() if ordering == "dfs" else frontier.pop(0)
+                if not parents[label]:
+                    roots.append(label)
+                new = [x for x in parents[label] if x not in visited]
+                visited.update(new)
+                frontier.extend(reversed(new) if ordering == "dfs" else new)
+
+            return roots
+
+        required = [x for x in _topological_order(parents, goal) if not parents[x]]
+        if sorted(ordering) != sorted(required):
+            raise ValueError(
+                f"An explicit ordering needs to contain all root nodes the goal depends on: {required}"
+            )
+
+        return list(ordering)
+
+
+def _topological_order(parents: Dict[str, List[str]], goal: str) -> List[str]:
+    """Return the goal and all its ancestors, parents before their children."""
+    order, visited = [], set()
+    stack = [(goal, False)]
+    while stack:
+        label, expanded = stack.pop()
+        if expanded:
+            order.append(label)
+        elif label not in visited:
+            visited.add(label)
+            stack.append((label, True))
+            stack.extend((x, False) for x in parents[label] if x not in visited)
+
+    return order
+
+
+def _failure_operation(label: str, gate: CanonicalGateFactors) -> str:
+    """Return how the failures of the parents combine to the failure of a deterministic gate ('or' | 'and')."""
+    deterministic = np.array([[1.0, 0.0]] if gate.target_state == 0 else [[0.0, 1.0]])
+    if gate.constant != 1.0 or not np.array_equal(
+        gate.weights, np.broadcast_to(deterministic, gate.weights.shape)
+    ):
+        raise ValueError(
+            f"The gate of {label} is not a deterministic AND|OR, which is required for a fault tree analysis."
+        )
+
+    # AND: fails if any parent fails | OR: fails if all parents fail
+    return "or" if gate.target_state == 0 else "and"
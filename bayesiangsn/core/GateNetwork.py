@@ -0,0 +1,777 @@
+import copy
+import heapq
+from itertools import product
+from typing import Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from bayesiangsn.core.CanonicalCPT import CanonicalGateFactors
+
+# enumerating the parent states of a noisy|leaky gate is only done up to this number of parents
+MAX_ENUMERATED_PARENTS = 16
+
+
+class GateNetwork:
+    """Factorised representation of a Nesic BN whose non-root nodes are canonical gates.
+
+    Canonical gates factorise as P(y=target | x) = c * prod_i w_i(x_i) (see `factorize_binary_logic_gate`).
+    This allows exact message passing with costs linear in the number of parents instead of the 2^n
+    columns of the corresponding CPT. The transformation of Nesic et al. 2021 yields a tree-shaped BN,
+    except for root nodes (e.g. a Context) that are referenced by multiple elements. These shared root
+    nodes are handled exactly by conditioning on their states (vectorised over all state combinations).
+
+    All messages use the state order True | False (i.e. sat|sound, notSat|notSound) of the CPTs.
+
+    The numeric backend is configurable: messages can be stored as float32 to halve memory and bandwidth,
+    and the products over the parents of a gate can be accumulated in log-space. The latter avoids the
+    cancellation in 1 - prod_i w_i(x_i), which otherwise loses the small notSat masses of deep AND chains
+    with many near-1 beliefs (e.g. 1000+ Solutions).
+
+    Attributes:
+        parents (Dict<str, List<str>>): Parents of each node in the BN (empty for root nodes).
+        state_names (Dict<str, List<str>>): State names of each node in the BN.
+        priors (Dict<str, float>): P(True) of all root nodes.
+        gates (Dict<str, CanonicalGateFactors>): Factorised gates of all non-root nodes.
+        dtype (numpy.dtype): Floating point type of all messages (float64 or float32).
+        log_space (bool): Accumulate the products over the parents of a gate in log-space.
+    """
+
+    def __init__(
+        self,
+        parents: Dict[str, List[str]],
+        state_names: Dict[str, List[str]],
+        priors: Dict[str, float],
+        gates: Dict[str, CanonicalGateFactors],
+        dtype: np.dtype = np.float64,
+        log_space: bool = False,
+    ) -> None:
+        self._dtype = np.dtype(dtype)
+        if self._dtype not in (np.float32, np.float64):
+            raise TypeError(
+                f"Unsupported dtype {self._dtype}, messages are either float32 or float64."
+            )
+
+        self._parents = parents
+        self._state_names = state_names
+        self._priors = priors
+        self._gates = gates
+        self._log_space = log_space
+
+        self._children = {label: [] for label in parents}
+        for label, node_parents in parents.items():
+            for parent in node_parents:
+                self._children[parent].append(label)
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(parents)
+        graph.add_edges_from(
+            (parent, label)
+            for label, node_parents in parents.items()
+            for parent in node_parents
+        )
+        self._order = list(nx.topological_sort(graph))
+        self._position = {label: i for i, label in enumerate(self._order)}
+        self._sinks = [label for label in self._order if not self._children[label]]
+        self._cutset = [
+            label
+            for label in self._order
+            if label in priors and len(self._children[label]) > 1
+        ]
+        self._closed_nodes = None
+
+        # upward messages without evidence (see prior_marginals)
+        self._prior_messages = None
+        self._prior_states = None
+        self._prior_weights = None
+
+    @property
+    def parents(self) -> Dict[str, List[str]]:
+        return self._parents
+
+    @property
+    def children(self) -> Dict[str, List[str]]:
+        return self._children
+
+    @property
+    def state_names(self) -> Dict[str, List[str]]:
+        return self._state_names
+
+    @property
+    def priors(self) -> Dict[str, float]:
+        return self._priors
+
+    @property
+    def gates(self) -> Dict[str, CanonicalGateFactors]:
+        return self._gates
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    @property
+    def log_space(self) -> bool:
+        return self._log_space
+
+    @property
+    def order(self) -> List[str]:
+        return self._order
+
+    @property
+    def cutset(self) -> List[str]:
+        return self._cutset
+
+    @property
+    def closed_nodes(self) -> List[str]:
+        """Gates without shared root nodes among their ancestors, i.e. P(x) only depends on the ancestors of x."""
+        if self._closed_nodes is None:
+            open_nodes = set(self.descendants(self._cutset))
+            self._closed_nodes = [
+                label for label in self._gates if label not in open_nodes
+            ]
+
+        return self._closed_nodes
+
+    @property
+    def is_tree_structured(self) -> bool:
+        return all(len(self._children[label]) <= 1 for label in self._gates)
+
+    def probability_of_evidence(
+        self, evidence: Optional[Dict[str, str]] = None
+    ) -> float:
+        """Calculate P(evidence) by a single upward pass."""
+        indicators = self._evidence_indicators(evidence)
+        states, weights = self._condition_branches(indicators)
+        messages = self._upward(indicators, states)
+
+        return float(np.sum(np.prod(weights, axis=1) * self._sink_totals(messages)))
+
+    def marginals(
+        self, evidence: Optional[Dict[str, str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Calculate the posterior P(x | evidence) of all nodes x by a calibrated upward/downward pass."""
+        indicators = self._evidence_indicators(evidence)
+        states, weights = self._condition_branches(indicators)
+        messages = self._upward(indicators, states)
+        outside = self._downward(indicators, messages)
+
+        branch_weights = np.prod(weights, axis=1)
+        branch_totals = branch_weights * self._sink_totals(messages)
+        prob_evidence = branch_totals.sum()
+        if prob_evidence <= 0.0:
+            raise ValueError(
+                f"The provided evidence {evidence} is impossible in the BN representation."
+            )
+
+        marginals = {}
+        for label in self._order:
+            if label in self._cutset:
+                node_states = states[:, self._cutset.index(label)]
+                joint = np.array(
+                    [branch_totals[node_states == state].sum() for state in range(2)]
+                )
+            else:
+                joint = branch_weights @ (messages[label] * outside[label])
+            marginals[label] = joint / prob_evidence
+
+        return marginals
+
+    def root_sensitivities(
+        self, evidence: Optional[Dict[str, str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Calculate P(evidence | do(x=state)) for both states of all root nodes x by a single upward/downward pass.
+        These are the partial derivatives of P(evidence) with respect to the prior of each root node.
+        """
+        indicators = self._evidence_indicators(evidence)
+        states, weights = self._condition_branches(indicators)
+        messages = self._upward(indicators, states)
+        outside = self._downward(indicators, messages)
+
+        branch_totals = self._sink_totals(messages)
+        sensitivities = {}
+        for label in self._priors:
+            if label in self._cutset:
+                j = self._cutset.index(label)
+                other_weights = np.prod(np.delete(weights, j, axis=1), axis=1)
+                sensitivities[label] = np.array(
+                    [
+                        np.sum((other_weights * branch_totals)[states[:, j] == state])
+                        for state in range(2)
+                    ]
+                )
+            else:
+                sensitivities[label] = np.prod(weights, axis=1) @ outside[label]
+
+        return sensitivities
+
+    def copy(self) -> "GateNetwork":
+        """Create a copy sharing structure and cached messages, which can be updated without affecting this instance."""
+        network = copy.copy(self)
+        network._priors = dict(self._priors)
+        if self._prior_messages is not None:
+            network._prior_messages = dict(self._prior_messages)
+
+        return network
+
+    def prior_marginals(self) -> Dict[str, np.ndarray]:
+        """Calculate P(x) of all nodes x without evidence.
+        The underlying upward messages are cached and patched incrementally by `update_priors`.
+        """
+        if self._prior_messages is None:
+            self._prior_states, self._prior_weights = self._condition_branches({})
+            self._prior_messages = self._upward({}, self._prior_states)
+
+        branch_weights = np.prod(self._prior_weights, axis=1)
+        return {
+            label: branch_weights @ msg for label, msg in self._prior_messages.items()
+        }
+
+    def prior_beliefs(
+        self,
+        labels: List[str],
+        lookup: Optional[Callable[[str], Optional[float]]] = None,
+    ) -> Dict[str, float]:
+        """Calculate P(True) of the given nodes without evidence by evaluating only their ancestors.
+        The lookup may provide P(True) of closed nodes (see `closed_nodes`), e.g. results of identical subtrees
+        of other models. The ancestors of such nodes are not evaluated. If the upward messages are already
+        cached (see `prior_marginals`), they are used instead.
+
+        Returns:
+            Dict<str, float>: P(True) of all evaluated nodes (including the given ones).
+        """
+        if self._prior_messages is not None:
+            return {
+                label: float(marginal[0])
+                for label, marginal in self.prior_marginals().items()
+            }
+
+        self._check_tree_structure()
+        closed = set(self.closed_nodes) if lookup else set()
+        known, needed = {}, set()
+        stack = list(labels)
+        while stack:
+            label = stack.pop()
+            if label in needed:
+                continue
+            needed.add(label)
+
+            belief = lookup(label) if label in closed else None
+            if belief is None:
+                stack.extend(self._parents[label])
+            else:
+                known[label] = belief
+
+        states, weights = self._condition_branches({})
+        messages = {}
+        for label in sorted(needed, key=self._position.get):
+            if label in known:
+                msg = np.array([known[label], 1.0 - known[label]], dtype=self._dtype)
+                messages[label] = np.tile(msg, (states.shape[0], 1))
+            else:
+                messages[label] = self._node_message(label, messages, {}, states)
+
+        branch_weights = np.prod(weights, axis=1)
+        return {
+            label: float(branch_weights @ msg[:, 0]) for label, msg in messages.items()
+        }
+
+    def update_priors(self, priors: Dict[str, float]) -> List[str]:
+        """Change P(True) of root nodes and recompute cached messages of affected nodes only.
+
+        Returns:
+            List<str>: The changed root nodes and all their descendants in topological order.
+        """
+        for label in priors:
+            if label not in self._priors:
+                raise ValueError(
+                    f"Scoped element {label} is not a root node of the BN."
+                )
+        self._priors.update(priors)
+
+        affected = self.descendants(priors)
+        if self._prior_messages is not None:
+            if any(label in self._cutset for label in priors):
+                _, self._prior_weights = self._condition_branches({})
+
+            for label in affected:
+                if label not in self._cutset:
+                    self._prior_messages[label] = self._node_message(
+                        label, self._prior_messages, {}, self._prior_states
+                    )
+
+        return affected
+
+    def sweep_prior_marginals(
+        self, gate_grid: Dict[str, List[CanonicalGateFactors]], labels: List[str]
+    ) -> Dict[str, np.ndarray]:
+        """Calculate P(x) of the given nodes for all combinations (cartesian product) of alternative gates.
+        Messages of nodes not affected by the swept gates are shared, all affected messages are vectorised
+        over the combinations.
+
+        Returns:
+            Dict<str, np.ndarray>: P(x) for each combination (combinations x 2) in C-order of the product.
+        """
+        for label, alternatives in gate_grid.items():
+            if label not in self._gates:
+                raise ValueError(f"Swept element {label} is not a gate of the BN.")
+            if any(len(f.weights) != len(self._parents[label]) for f in alternatives):
+                raise ValueError(
+                    f"Swept gates of {label} need to be defined for all its {len(self._parents[label])} parents."
+                )
+
+        self.prior_marginals()
+        sizes = [len(alternatives) for alternatives in gate_grid.values()]
+        n_combinations = int(np.prod(sizes))
+        swept = {}
+        for (label, alternatives), idx in zip(
+            gate_grid.items(), np.unravel_index(np.arange(n_combinations), sizes)
+        ):
+            swept[label] = (
+                np.array([f.target_state for f in alternatives])[idx],
+                np.array([f.constant for f in alternatives], dtype=self._dtype)[idx],
+                np.stack([f.weights for f in alternatives]).astype(self._dtype)[idx],
+            )
+
+        messages = dict(self._prior_messages)
+        n_branches = self._prior_states.shape[0]
+        for label in self.descendants(list(gate_grid)):
+            if label in swept:
+                targets, constants, weights = swept[label]
+            else:
+                factors = self._gates[label]
+                targets = np.full(n_combinations, factors.target_state)
+                constants = np.full(n_combinations, factors.constant, self._dtype)
+                weights = factors.weights.astype(self._dtype)[None]
+
+            parent_msgs = self._stack_parents(
+                messages, label, n_branches, n_combinations
+            )
+            p_target, p_other = _gate_products(
+                parent_msgs, weights[:, None], constants[:, None], self._log_space
+            )
+
+            messages[label] = np.where(
+                (targets == 0)[:, None, None],
+                np.stack([p_target, p_other], axis=-1),
+                np.stack([p_other, p_target], axis=-1),
+            )
+
+        branch_weights = np.prod(self._prior_weights, axis=1)
+        return {
+            label: np.broadcast_to(
+                branch_weights @ messages[label], (n_combinations, 2)
+            ).copy()
+            for label in labels
+        }
+
+    def descendants(self, labels: List[str]) -> List[str]:
+        """Return the given nodes and all their descendants in topological order."""
+        found = set(labels)
+        stack = list(labels)
+        while stack:
+            for child in self._children[stack.pop()]:
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+
+        return sorted(found, key=self._position.get)
+
+    def _check_tree_structure(self) -> None:
+        if not self.is_tree_structured:
+            shared = [label for label in self._gates if len(self._children[label]) > 1]
+            raise ValueError(
+                f"Message passing requires each Goal/Strategy to support a single element, but {shared} are shared."
+            )
+
+    def _evidence_indicators(
+        self, evidence: Optional[Dict[str, str]]
+    ) -> Dict[str, np.ndarray]:
+        indicators = {}
+        for label, state in (evidence or {}).items():
+            if label not in self._parents:
+                raise ValueError(
+                    f"Evidence variable {label} is not part of the BN representation."
+                )
+            if state not in self._state_names[label]:
+                raise ValueError(
+                    f"State {state} of evidence variable {label} is not one of {self._state_names[label]}."
+                )
+
+            indicator = np.zeros(2, dtype=self._dtype)
+            indicator[self._state_names[label].index(state)] = 1.0
+            indicators[label] = indicator
+
+        return indicators
+
+    def _condition_branches(
+        self, indicators: Dict[str, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Enumerate all admissible state combinations of shared root nodes.
+        Returns the states (branches x cutset) and the per-node prior weights (branches x cutset).
+        """
+        candidates = [
+            np.flatnonzero(indicators.get(label, np.ones(2))) for label in self._cutset
+        ]
+        combinations = list(product(*candidates))
+        states = np.array(combinations, dtype=int).reshape(
+            len(combinations), len(self._cutset)
+        )
+        weights = np.ones(states.shape, dtype=self._dtype)
+        for j, label in enumerate(self._cutset):
+            prior = np.array([self._priors[label], 1.0 - self._priors[label]])
+            weights[:, j] = prior[states[:, j]]
+
+        return states, weights
+
+    def _upward(
+        self, indicators: Dict[str, np.ndarray], states: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Calculate P(x, evidence of all ancestors of x) for all nodes x (branches x 2)."""
+        self._check_tree_structure()
+        messages = {}
+        for label in self._order:
+            messages[label] = self._node_message(label, messages, indicators, states)
+
+        return messages
+
+    def _node_message(
+        self,
+        label: str,
+        messages: Dict[str, np.ndarray],
+        indicators: Dict[str, np.ndarray],
+        states: np.ndarray,
+    ) -> np.ndarray:
+        n_branches = states.shape[0]
+        if label in self._gates:
+            msg = self._gate_forward(
+                self._gates[label], self._stack_parents(messages, label, n_branches)
+            )
+        elif label in self._cutset:
+            msg = np.eye(2, dtype=self._dtype)[states[:, self._cutset.index(label)]]
+        else:
+            prior = self._priors[label]
+            msg = np.tile(
+                np.array([prior, 1.0 - prior], dtype=self._dtype), (n_branches, 1)
+            )
+
+        return msg * indicators[label] if label in indicators else msg
+
+    def _downward(
+        self, indicators: Dict[str, np.ndarray], messages: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        """Calculate P(evidence of all non-ancestors | x) for all non-shared nodes x (branches x 2)."""
+        totals = {sink: messages[sink].sum(axis=1) for sink in self._sinks}
+        outside = {}
+        for sink in self._sinks:
+            others = np.prod(
+                [totals[x] for x in self._sinks if x != sink]
+                or [np.ones_like(totals[sink])],
+                axis=0,
+            )
+            outside[sink] = np.repeat(others[:, None], 2, axis=1)
+
+        for label in reversed(self._order):
+            if label not in self._gates:
+                continue
+
+            outside_y = outside[label] * indicators.get(label, 1.0)
+            parent_outside = self._gate_backward(
+                self._gates[label],
+                self._stack_parents(messages, label, outside_y.shape[0]),
+                outside_y,
+            )
+            for j, parent in enumerate(self._parents[label]):
+                if parent not in self._cutset:
+                    outside[parent] = parent_outside[:, j, :]
+
+        return outside
+
+    def _stack_parents(
+        self,
+        messages: Dict[str, np.ndarray],
+        label: str,
+        n_branches: int,
+        n_combinations: Optional[int] = None,
+    ) -> np.ndarray:
+        """Stack the parent messages of a node (branches x parents x 2). If the number of combinations
+        is provided, messages are broadcast to (combinations x branches x parents x 2).
+        """
+        parents = self._parents[label]
+        if n_combinations is None:
+            if not parents:
+                return np.ones((n_branches, 0, 2), dtype=self._dtype)
+            return np.stack([messages[parent] for parent in parents], axis=1)
+
+        if not parents:
+            return np.ones((n_combinations, n_branches, 0, 2), dtype=self._dtype)
+        shape = (n_combinations, n_branches, 2)
+        return np.stack(
+            [np.broadcast_to(messages[parent], shape) for parent in parents], axis=2
+        )
+
+    def _gate_forward(
+        self, factors: CanonicalGateFactors, parent_msgs: np.ndarray
+    ) -> np.ndarray:
+        p_target, p_other = _gate_products(
+            parent_msgs,
+            factors.weights.astype(self._dtype),
+            self._dtype.type(factors.constant),
+            self._log_space,
+        )
+
+        msg = np.empty((parent_msgs.shape[0], 2), dtype=self._dtype)
+        msg[:, factors.target_state] = p_target
+        msg[:, 1 - factors.target_state] = p_other
+
+        return msg
+
+    def _gate_backward(
+        self,
+        factors: CanonicalGateFactors,
+        parent_msgs: np.ndarray,
+        outside_y: np.ndarray,
+    ) -> np.ndarray:
+        weights = factors.weights.astype(self._dtype)
+        constant = self._dtype.type(factors.constant)
+        t = np.sum(parent_msgs, axis=-1)
+
+        # products over all other parents via prefix/suffix products (no divisions -> robust against zeros)
+        if self._log_space:
+            log_t, log_ratio = _log_gate_terms(parent_msgs, weights)
+            t_others = np.exp(_exclusive_sum(log_t))
+            with np.errstate(divide="ignore"):
+                log_target = (
+                    np.log(constant)
+                    + np.log(weights)[None, :, :]
+                    + _exclusive_sum(log_ratio)[:, :, None]
+                )
+            p_target = t_others[:, :, None] * np.exp(log_target)
+            p_other = t_others[:, :, None] * -np.expm1(log_target)
+        else:
+            u_others = _exclusive_prod(np.sum(parent_msgs * weights, axis=-1))
+            t_others = _exclusive_prod(t)
+            p_target = constant * weights[None, :, :] * u_others[:, :, None]
+            p_other = t_others[:, :, None] - p_target
+
+        out_target = outside_y[:, factors.target_state][:, None, None]
+        out_other = outside_y[:, 1 - factors.target_state][:, None, None]
+
+        return out_target * p_target + out_other * p_other
+
+    def _sink_totals(self, messages: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.prod([messages[sink].sum(axis=1) for sink in self._sinks], axis=0)
+
+    def max_explanations(
+        self, evidence: Optional[Dict[str, str]] = None, top_k: int = 1
+    ) -> List[Tuple[float, Dict[str, str]]]:
+        """Calculate the `top_k` most probable joint configurations of all nodes given the evidence (k-best max-product).
+        Returns a list of (P(configuration, evidence), configuration) sorted by decreasing probability.
+        """
+        if top_k < 1:
+            raise ValueError(
+                f"At least one explanation needs to be requested, but top_k={top_k}."
+            )
+
+        self._check_tree_structure()
+        indicators = self._evidence_indicators(evidence)
+        states, weights = self._condition_branches(indicators)
+
+        candidates = []
+        for branch, weight in zip(states, np.prod(weights, axis=1)):
+            if weight <= 0.0:
+                continue
+
+            branch_states = dict(zip(self._cutset, branch))
+            best = self._kbest_upward(indicators, branch_states, top_k)
+            fixed = tuple((label, int(state)) for label, state in branch_states.items())
+
+            sink_lists = [
+                _kbest_merge(best[sink][0] + best[sink][1], top_k)
+                for sink in self._sinks
+            ]
+            combined = [(weight, fixed)]
+            for sink_list in sink_lists:
+                combined = _kbest_product(combined, sink_list, top_k)
+            candidates.extend(combined)
+
+        return [
+            (score, self._flatten_assignment(assignment))
+            for score, assignment in _kbest_merge(candidates, top_k)
+        ]
+
+    def _kbest_upward(
+        self,
+        indicators: Dict[str, np.ndarray],
+        branch_states: Dict[str, int],
+        top_k: int,
+    ) -> Dict[str, List[List]]:
+        best = {}
+        for label in self._order:
+            if label in self._gates:
+                node_lists = self._kbest_gate(
+                    self._gates[label], [best[p] for p in self._parents[label]], top_k
+                )
+            elif label in branch_states:
+                # state and prior of shared nodes are accounted for once per branch
+                node_lists = [[], []]
+                node_lists[branch_states[label]] = [(1.0, ())]
+                best[label] = node_lists
+                continue
+            else:
+                prior = self._priors[label]
+                node_lists = [[(prior, ())], [(1.0 - prior, ())]]
+
+            indicator = indicators.get(label, np.ones(2))
+            best[label] = [
+                [
+                    (score * indicator[state], ((label, state), assignment))
+                    for score, assignment in node_lists[state]
+                    if score * indicator[state] > 0.0
+                ]
+                for state in range(2)
+            ]
+
+        return best
+
+    @staticmethod
+    def _kbest_gate(
+        factors: CanonicalGateFactors, parent_lists: List[List[List]], top_k: int
+    ) -> List[List]:
+        target = factors.target_state
+        weights = factors.weights
+
+        def weighted(lists, state, weight):
+            return [(score * weight, assignment) for score, assignment in lists[state]]
+
+        # target state factorises over the parents
+        target_list = [(factors.constant, ())] if factors.constant > 0.0 else []
+        for i, lists in enumerate(parent_lists):
+            merged = _kbest_merge(
+                weighted(lists, 0, weights[i, 0]) + weighted(lists, 1, weights[i, 1]),
+                top_k,
+            )
+            target_list = _kbest_product(target_list, merged, top_k)
+
+        deterministic = factors.constant == 1.0 and np.all(
+            (weights == 0.0) | (weights == 1.0)
+        )
+        if deterministic:
+            # 1 - prod_i w_i(x_i) is one iff at least one parent is in a zero-weight state
+            all_ones, any_zero = [(1.0, ())], []
+            for i, lists in enumerate(parent_lists):
+                ones = _kbest_merge(
+                    [x for s in range(2) if weights[i, s] == 1.0 for x in lists[s]],
+                    top_k,
+                )
+                zeros = _kbest_merge(
+                    [x for s in range(2) if weights[i, s] == 0.0 for x in lists[s]],
+                    top_k,
+                )
+                any_zero = _kbest_merge(
+                    _kbest_product(any_zero, _kbest_merge(ones + zeros, top_k), top_k)
+                    + _kbest_product(all_ones, zeros, top_k),
+                    top_k,
+                )
+                all_ones = _kbest_product(all_ones, ones, top_k)
+            other_list = any_zero
+        else:
+            if len(parent_lists) > MAX_ENUMERATED_PARENTS:
+                raise ValueError(
+                    f"Explanations for noisy|leaky gates are limited to {MAX_ENUMERATED_PARENTS} parents."
+                )
+            other_list = []
+            for parent_states in product([0, 1], repeat=len(parent_lists)):
+                p_other = 1.0 - factors.constant * np.prod(
+                    weights[np.arange(len(parent_states)), parent_states]
+                )
+                combined = [(p_other, ())] if p_other > 0.0 else []
+                for lists, state in zip(parent_lists, parent_states):
+                    combined = _kbest_product(combined, lists[state], top_k)
+                other_list = _kbest_merge(other_list + combined, top_k)
+
+        node_lists = [None, None]
+        node_lists[target] = target_list
+        node_lists[1 - target] = other_list
+        return node_lists
+
+    def _flatten_assignment(self, assignment: Tuple) -> Dict[str, str]:
+        flat = {}
+        stack = [assignment]
+        while stack:
+            item = stack.pop()
+            if not item:
+                continue
+            if isinstance(item[0], str):
+                flat[item[0]] = self._state_names[item[0]][item[1]]
+            else:
+                stack.extend(item)
+
+        return {label: flat[label] for label in self._order if label in flat}
+
+
+def _gate_products(
+    parent_msgs: np.ndarray,
+    weights: np.ndarray,
+    constants: np.ndarray,
+    log_space: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate the target and other state mass of canonical gates given the stacked parent messages (... x parents x 2)."""
+    if not log_space:
+        u = np.sum(parent_msgs * weights, axis=-1)
+        t = np.sum(parent_msgs, axis=-1)
+        p_target = constants * np.prod(u, axis=-1)
+        p_other = np.maximum(np.prod(t, axis=-1) - p_target, 0.0)
+        return p_target, p_other
+
+    log_t, log_ratio = _log_gate_terms(parent_msgs, weights)
+    with np.errstate(divide="ignore"):
+        log_target = np.log(constants) + np.sum(log_ratio, axis=-1)
+    total = np.exp(np.sum(log_t, axis=-1))
+
+    return total * np.exp(log_target), total * -np.expm1(log_target)
+
+
+def _log_gate_terms(
+    parent_msgs: np.ndarray, weights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate log t_i and log(u_i / t_i) per parent, with t_i = sum_s m_i(s) and u_i = sum_s w_i(s) * m_i(s).
+    The ratio is computed as log1p(-d_i / t_i) with d_i = sum_s (1 - w_i(s)) * m_i(s), which keeps small
+    masses (e.g. notSat of near-1 beliefs) instead of cancelling them in 1 - u_i / t_i.
+    """
+    t = np.sum(parent_msgs, axis=-1)
+    d = np.sum(parent_msgs * (1 - weights), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.clip(np.where(t > 0, d / t, 0), 0, 1)
+        return np.log(t), np.log1p(-ratio)
+
+
+def _exclusive_sum(values: np.ndarray) -> np.ndarray:
+    """Sum over all other entries along axis 1 (computed without subtractions -> robust against -inf)."""
+    zeros = np.zeros_like(values[:, :1])
+    left = np.cumsum(np.concatenate([zeros, values[:, :-1]], axis=1), axis=1)
+    right = np.cumsum(np.concatenate([zeros, values[:, :0:-1]], axis=1), axis=1)[
+        :, ::-1
+    ]
+    return left + right
+
+
+def _exclusive_prod(values: np.ndarray) -> np.ndarray:
+    """Product over all other entries along axis 1 (computed without divisions)."""
+    ones = np.ones_like(values[:, :1])
+    left = np.cumprod(np.concatenate([ones, values[:, :-1]], axis=1), axis=1)
+    right = np.cumprod(np.concatenate([ones, values[:, :0:-1]], axis=1), axis=1)[
+        :, ::-1
+    ]
+    return left * right
+
+
+def _kbest_merge(candidates: List[Tuple[float, Tuple]], top_k: int) -> List:
+    return heapq.nlargest(
+        top_k, (x for x in candidates if x[0] > 0.0), key=lambda x: x[0]
+    )
+
+
+def _kbest_product(first: List, second: List, top_k: int) -> List:
+    return _kbest_merge(
+        [(a * b, (ta, tb)) for a, ta in first for b, tb in second], top_k
+    )
@@ -0,0 +1,25 @@
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+
+class GoalBeliefs(NamedTuple):
+    """Beliefs P(sat) of multiple goals for one or a batch of cases (e.g. evidence configurations).
+    In contrast to pgmpy factors, instances only consist of the goal labels and a NumPy array, hence they
+    are cheap to pickle and send to worker processes or to a service.
+
+    Attributes:
+        goals (Tuple<str>): Labels of the queried goals (columns of `beliefs`).
+        beliefs (numpy.ndarray): P(sat) of each goal per case (cases x goals).
+    """
+
+    goals: Tuple[str, ...]
+    beliefs: np.ndarray
+
+    def belief(self, goal: str, case: int = 0) -> float:
+        """Return P(sat) of a goal for a case."""
+        return float(self.beliefs[case, self.goals.index(goal)])
+
+    def to_dict(self, case: int = 0) -> Dict[str, float]:
+        """Return P(sat) of all goals for a case."""
+        return dict(zip(self.goals, self.beliefs[case].tolist()))
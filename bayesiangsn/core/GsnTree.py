@@ -1,11 +1,20 @@
+import hashlib
+import json
 from typing import Dict, List, Optional, Tuple
 
 import networkx as nx
 import yaml
 from networkx.classes.digraph import DiGraph
 
-from bayesiangsn.core.Enums import EGsnType
+from bayesiangsn.core.Enums import EGateModel, EGsnType
 from bayesiangsn.core.GsnElement import GsnElement
+from bayesiangsn.core.GsnValidator import (
+    VALID_CONTEXT_RELATIONS,
+    VALID_SUPPORT_RELATIONS,
+    GsnViolation,
+    validate_gsn_elements,
+)
+from bayesiangsn.utils.Utils import is_valid_prob
 
 
 class GsnTree:
@@ -42,6 +51,19 @@ class GsnTree:
 
         return self.tree_obj
 
+    def validate(self) -> List[GsnViolation]:
+        """Check all constraints on the elements of this GSN tree and report every violation (see `validate_gsn_elements`)."""
+        return validate_gsn_elements(self.tree_elements)
+
+    @staticmethod
+    def validate_yaml(yaml_path: str) -> List[GsnViolation]:
+        """Check all constraints on the elements of a gsn2x YAML without creating the tree (i.e. without failing fast).
+
+        Returns:
+            List<GsnViolation>: All violations (empty for a valid GSN tree).
+        """
+        return validate_gsn_elements(GsnTree("validation")._parse_yaml(yaml_path))
+
     def _parse_yaml(self, yaml_path: str) -> Dict:
         prefix_map_yaml = {
             "G": EGsnType.GOAL,
@@ -78,7 +100,21 @@ class GsnTree:
 
                 # parse additional data:
                 data = {}
-                data["belief"] = vals.get("belief", None)
+                belief = vals.get("belief", None)
+                if isinstance(belief, list):
+                    # imprecise beliefs are given as interval [lower, upper], its midpoint is used as point belief
+                    if (
+                        len(belief) != 2
+                        or not all(isinstance(x, (int, float)) for x in belief)
+                        or not is_valid_prob(belief)
+                        or belief[0] > belief[1]
+                    ):
+                        raise ValueError(
+                            f"Belief interval of node {node_name} needs to be [lower, upper] within 0...1 but is {belief}."
+                        )
+                    data["belief_bounds"] = (float(belief[0]), float(belief[1]))
+                    belief = (belief[0] + belief[1]) / 2
+                data["belief"] = belief
                 gsn_element.data = data
                 tree_elements[node_name] = gsn_element
 
@@ -88,22 +124,9 @@ class GsnTree:
         # we need to check that the provided GSN tree has valid relationships
         # these are defined in Table 1:2-2 Core GSN Relationships in the GSN Community Standard Version 3 (page 18)
         # we use a fail-fast strategy, that means if one connection is invalid we stop.
-
-        valid_support_relations = [
-            (EGsnType.GOAL, EGsnType.GOAL),
-            (EGsnType.GOAL, EGsnType.STRATEGY),
-            (EGsnType.GOAL, EGsnType.SOLUTION),
-            (EGsnType.STRATEGY, EGsnType.GOAL),
-        ]
-
-        valid_contex_relations = [
-            (EGsnType.GOAL, EGsnType.CONTEXT),
-            (EGsnType.GOAL, EGsnType.ASSUMPTION),
-            (EGsnType.GOAL, EGsnType.JUSTIFICATION),
-            (EGsnType.STRATEGY, EGsnType.CONTEXT),
-            (EGsnType.STRATEGY, EGsnType.ASSUMPTION),
-            (EGsnType.STRATEGY, EGsnType.JUSTIFICATION),
-        ]
+        # (see `validate` for a report of all violations)
+        valid_support_relations = VALID_SUPPORT_RELATIONS
+        valid_contex_relations = VALID_CONTEXT_RELATIONS
 
         for node in tree_elements.values():
             cur_support_relations = [
@@ -175,3 +198,111 @@ class GsnTree:
         nx.set_node_attributes(model, node_attributes)
 
         return model
+
+    def diff(self, other: "GsnTree") -> Dict[str, List[str]]:
+        """Classify the elements that differ between this and another GSN tree (e.g. two parses of an edited YAML).
+
+        Returns:
+            Dict<str, List<str>>: Labels of elements with "structural" changes (added, removed, changed type or relations),
+                "belief" changes, and "text" changes (intent or motivation). An element can be listed in multiple categories.
+        """
+        changes = {"structural": [], "belief": [], "text": []}
+
+        for label in self.tree_elements.keys() | other.tree_elements.keys():
+            old = self.tree_elements.get(label, None)
+            new = other.tree_elements.get(label, None)
+
+            if not old or not new:
+                changes["structural"].append(label)
+                continue
+
+            if (
+                old.element_type != new.element_type
+                or old.supporters != new.supporters
+                or old.contexts != new.contexts
+            ):
+                changes["structural"].append(label)
+            if any(
+                old.data.get(key, None) != new.data.get(key, None)
+                for key in ["belief", "belief_bounds"]
+            ):
+                changes["belief"].append(label)
+            if old.intent != new.intent or old.motivation != new.motivation:
+                changes["text"].append(label)
+
+        return {category: sorted(labels) for category, labels in changes.items()}
+
+    def subtree_hashes(
+        self,
+        beliefs: Optional[Dict[str, float]] = None,
+        gate_models: Optional[Dict[str, Dict]] = None,
+        numeric_options: Optional[Dict] = None,
+        parents: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, str]:
+        """Calculate content-addressed hashes of the subtrees rooted at each element of the GSN tree.
+        A hash covers the structure, the element types, the beliefs and the gate models of all elements of
+        the subtree, but not their labels or texts. Identical sub-arguments (e.g. reused hazard-mitigation
+        patterns) therefore have identical hashes, even across different GSN trees.
+        Children are hashed order-independent, unless the gate model defines per-child parameters, in which case
+        they are hashed in the order of these parameters (i.e. the order of `parents`).
+
+        Args:
+            beliefs (Dict<str, float>): Beliefs overriding the beliefs of the parsed elements (e.g. of a BN representation).
+            gate_models (Dict<str, Dict>): Aggregation of elements, i.e. keyword arguments of `create_binary_logic_gate`.
+            numeric_options (Dict): Numeric backend of the evaluation (e.g. dtype and log_space), which is part of
+                every hash, as results of different backends differ in their precision.
+            parents (Dict<str, List<str>>): Children of each element in the order of the gate parameters (e.g. the
+                parents in a BN representation), defaults to the successors in the GSN tree.
+
+        Returns:
+            Dict<str, str>: SHA-256 hex digest of the subtree rooted at each element.
+        """
+        beliefs = beliefs if beliefs else {}
+        gate_models = gate_models if gate_models else {}
+        options = (
+            {key: str(value) for key, value in sorted(numeric_options.items())}
+            if numeric_options
+            else None
+        )
+
+        graph = nx.DiGraph(parents) if parents else self.tree_obj
+
+        hashes = {}
+        for label in reversed(list(nx.topological_sort(graph))):
+            element = self.tree_obj.nodes[label]["data"]
+            gate_model = _canonical_gate_model(gate_models.get(label, None))
+            children = [hashes[child] for child in graph.successors(label)]
+            if not gate_model or all(
+                gate_model[key] is None for key in ["prob_values", "substitute_probs"]
+            ):
+                children = sorted(children)
+
+            belief = beliefs.get(label, (element.data or {}).get("belief", None))
+            content = json.dumps(
+                [element.element_type.value, belief, gate_model, children, options]
+            )
+            hashes[label] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        return hashes
+
+
+def _canonical_gate_model(gate_model: Optional[Dict]) -> Optional[Dict]:
+    """JSON-serialisable, normalised representation of the keyword arguments of a canonical gate."""
+    if not gate_model:
+        return None
+
+    model = gate_model.get("gate_model", EGateModel.AND)
+    model = EGateModel(model.lower()) if isinstance(model, str) else model
+
+    canonical = {"gate_model": model.value}
+    for key in ["prob_values", "substitute_probs", "leak"]:
+        value = gate_model.get(key, None)
+        canonical[key] = (
+            None
+            if value is None
+            else (
+                [float(x) for x in value] if hasattr(value, "__len__") else float(value)
+            )
+        )
+
+    return canonical
@@ -0,0 +1,149 @@
+from typing import Dict, List, NamedTuple, Optional
+
+from bayesiangsn.core.Enums import EGsnConstraint, EGsnType
+from bayesiangsn.core.GsnElement import GsnElement
+
+VALID_SUPPORT_RELATIONS = [
+    (EGsnType.GOAL, EGsnType.GOAL),
+    (EGsnType.GOAL, EGsnType.STRATEGY),
+    (EGsnType.GOAL, EGsnType.SOLUTION),
+    (EGsnType.STRATEGY, EGsnType.GOAL),
+]
+
+VALID_CONTEXT_RELATIONS = [
+    (EGsnType.GOAL, EGsnType.CONTEXT),
+    (EGsnType.GOAL, EGsnType.ASSUMPTION),
+    (EGsnType.GOAL, EGsnType.JUSTIFICATION),
+    (EGsnType.STRATEGY, EGsnType.CONTEXT),
+    (EGsnType.STRATEGY, EGsnType.ASSUMPTION),
+    (EGsnType.STRATEGY, EGsnType.JUSTIFICATION),
+]
+
+
+class GsnViolation(NamedTuple):
+    """Violation of a constraint on a GSN tree by an element (label is None for violations of the whole tree)."""
+
+    constraint: EGsnConstraint
+    label: Optional[str]
+    message: str
+
+
+def validate_gsn_elements(tree_elements: Dict[str, GsnElement]) -> List[GsnViolation]:
+    """
+    Check all constraints on the elements of a parsed GSN tree in a single pass and collect every violation.
+    In contrast to the checks of GsnTree and NesicBayesianGsnTree, which stop at the first problem, this
+    allows to fix all problems of e.g. a large generated GSN tree at once. Neither the tree nor the BN
+    representation are created, the costs are linear in the number of elements and references.
+
+    Returns:
+        List<GsnViolation>: All violations in the order of the elements (empty for a valid GSN tree).
+    """
+    violations = []
+    referenced = set()
+
+    def violate(constraint, label, message):
+        violations.append(GsnViolation(constraint, label, message))
+
+    for label, node in tree_elements.items():
+        supporters, contexts = [], []
+        for relation, references, valid_relations, constraint in [
+            (
+                "supportedBy",
+                node.supporters,
+                VALID_SUPPORT_RELATIONS,
+                EGsnConstraint.SUPPORT_RELATION,
+            ),
+            (
+                "inContextOf",
+                node.contexts,
+                VALID_CONTEXT_RELATIONS,
+                EGsnConstraint.CONTEXT_RELATION,
+            ),
+        ]:
+            for reference in references:
+                referenced.add(reference)
+                target = tree_elements.get(reference, None)
+                if not target:
+                    violate(
+                        EGsnConstraint.DANGLING_REFERENCE,
+                        label,
+                        f"{relation} argument {reference} of node {label} does not reference a defined element.",
+                    )
+                    continue
+
+                (supporters if relation == "supportedBy" else contexts).append(
+                    target.element_type
+                )
+                if (node.element_type, target.element_type) not in valid_relations:
+                    violate(
+                        constraint,
+                        label,
+                        f"{relation} argument {reference} of node {label} defines an invalid reference "
+                        f"({node.element_type.value} -> {target.element_type.value}).",
+                    )
+
+        if node.element_type == EGsnType.GOAL:
+            # i) Nodes of type goal cannot connect to other nodes of type goal
+            if EGsnType.GOAL in supporters + contexts:
+                violate(
+                    EGsnConstraint.WELLFORMEDNESS_I,
+                    label,
+                    f"Well-formdness constraint i) violated: Nodes of type goal cannot connect to other nodes of type goal.\nViolated by node: {label}.",
+                )
+
+            # ii) Each node of type goal connects either to exactly one node of type strategy, or to at least one type solution
+            if supporters.count(EGsnType.STRATEGY) > 1:
+                violate(
+                    EGsnConstraint.WELLFORMEDNESS_II,
+                    label,
+                    f"Well-formdness constraint ii) violated: Each node of type goal connects to exactly one node of type strategy.\nViolated by node: {label}.",
+                )
+            elif (
+                EGsnType.STRATEGY not in supporters
+                and EGsnType.SOLUTION not in supporters
+            ):
+                violate(
+                    EGsnConstraint.WELLFORMEDNESS_II,
+                    label,
+                    f"Well-formdness constraint ii) violated: Each node of type goal connects to at least one type solution.\nViolated by node: {label}.",
+                )
+
+            # completeness: a goal without justification requires one via its context strategy
+            if EGsnType.JUSTIFICATION not in contexts:
+                for goal_context in node.contexts:
+                    context_node = tree_elements.get(goal_context, None)
+                    if (
+                        context_node
+                        and context_node.element_type == EGsnType.STRATEGY
+                        and not any(
+                            tree_elements[x].element_type == EGsnType.JUSTIFICATION
+                            for x in context_node.contexts
+                            if x in tree_elements
+                        )
+                    ):
+                        violate(
+                            EGsnConstraint.COMPLETENESS,
+                            label,
+                            f"Completeness constraint violated: Each node of type goal connects to a node of type context (or via its strategy).\nViolated by node: {label}.",
+                        )
+
+        # iii) Each node of type strategy connects to a node of type justification
+        if (
+            node.element_type == EGsnType.STRATEGY
+            and EGsnType.JUSTIFICATION not in contexts
+        ):
+            violate(
+                EGsnConstraint.WELLFORMEDNESS_III,
+                label,
+                f"Well-formdness constraint iii) violated: Each node of type strategy connects to a node of type justification.\nViolated by node: {label}.",
+            )
+
+    roots = [label for label in tree_elements if label not in referenced]
+    if len(roots) != 1:
+        violate(
+            EGsnConstraint.ROOT,
+            None,
+            f"A GSN tree requires exactly one root node, but found {len(roots)}: {roots}.",
+        )
+
+    return violations
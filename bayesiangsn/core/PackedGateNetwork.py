@@ -0,0 +1,214 @@
+from collections import defaultdict
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bayesiangsn.core.CompiledGateNetwork import compile_levels, propagate_levels
+from bayesiangsn.core.GateNetwork import GateNetwork
+
+
+class PackedGateNetwork:
+    """Single array program of many independent GateNetworks (e.g. the assurance cases of a portfolio).
+
+    Compiling every case separately (see CompiledGateNetwork) costs one loop of NumPy operations per case,
+    which is dominated by the call overhead for many small cases. Packing concatenates the nodes of all cases
+    into one index space and merges their levels by depth, i.e. the gates of all cases on the same level are
+    evaluated by the same segmented operations (`reduceat` over the edge groups with offset parent indices).
+
+    Shared root nodes are handled by copies instead of batch columns: every case is expanded into one copy
+    per state combination of its shared root nodes, whose states are fixed in the copy. The beliefs of an
+    output are the sum over the copies of its case weighted by the beliefs of the fixed states.
+
+    Attributes:
+        names (List<str>): Names of the packed cases.
+        labels (List<tuple<str, str>>): All nodes as (case, label), i.e. the possible outputs of `evaluate`.
+        roots (List<tuple<str, str>>): Root nodes as (case, label) in the column order of the beliefs.
+        priors (numpy.ndarray): Default beliefs P(True) of the root nodes.
+        levels (List<Dict<str, numpy.ndarray>>): Merged levels of all copies (see CompiledGateNetwork).
+        n_copies (int): Number of copies of all cases, i.e. the size of the program relative to the cases.
+    """
+
+    def __init__(self, networks: Dict[str, GateNetwork]) -> None:
+        if not networks:
+            raise ValueError("At least one network needs to be provided for packing.")
+        backends = {(network.dtype, network.log_space) for network in networks.values()}
+        if len(backends) > 1:
+            raise ValueError(
+                "All packed networks need to use the same dtype and log_space."
+            )
+        self._dtype, self._log_space = backends.pop()
+
+        self._names = list(networks)
+        self._labels, self._roots, priors = [], [], []
+        self._root_nodes, self._root_columns = [], []
+        self._fixed_nodes, self._fixed_states = [], []
+        cut_columns, cut_states = [], []
+        terms = defaultdict(list)
+        node_parents, node_gates = [], {}
+
+        for name, network in networks.items():
+            if not network.is_tree_structured:
+                raise ValueError(
+                    f"Only tree-structured networks can be packed, but {name} shares Goals|Strategies."
+                )
+            columns = {}
+            for label in network.order:
+                self._labels.append((name, label))
+                if label in network.priors:
+                    columns[label] = len(self._roots)
+                    self._roots.append((name, label))
+                    priors.append(network.priors[label])
+
+            for states in product([0, 1], repeat=len(network.cutset)):
+                copy = len(cut_columns)
+                fixed = dict(zip(network.cutset, states))
+                cut_columns.append([columns[x] for x in fixed])
+                cut_states.append(list(states))
+
+                index = {}
+                for label in network.order:
+                    index[label] = len(node_parents)
+                    terms[(name, label)].append((index[label], copy))
+                    node_parents.append([index[x] for x in network.parents[label]])
+                    if label in network.gates:
+                        node_gates[index[label]] = network.gates[label]
+                    if label in fixed:
+                        self._fixed_nodes.append(index[label])
+                        self._fixed_states.append(fixed[label])
+                    elif label in columns:
+                        self._root_nodes.append(index[label])
+                        self._root_columns.append(columns[label])
+
+        self._priors = np.array(priors, dtype=float)
+        self._n_nodes = len(node_parents)
+        self._root_nodes = np.array(self._root_nodes, dtype=int)
+        self._root_columns = np.array(self._root_columns, dtype=int)
+        self._fixed_nodes = np.array(self._fixed_nodes, dtype=int)
+        self._fixed_states = np.array(self._fixed_states, dtype=int)
+
+        # padded shared root nodes of each copy (copies x max. number of shared root nodes)
+        width = max(len(x) for x in cut_columns)
+        self._cut_mask = np.array(
+            [[j < len(x) for j in range(width)] for x in cut_columns], dtype=bool
+        ).reshape(len(cut_columns), width)
+        self._cut_columns = np.array(
+            [x + [0] * (width - len(x)) for x in cut_columns], dtype=int
+        ).reshape(len(cut_columns), width)
+        self._cut_states = np.array(
+            [x + [0] * (width - len(x)) for x in cut_states], dtype=int
+        ).reshape(len(cut_columns), width)
+
+        # terms (node of a copy) of each output, segmented by output in the order of `labels`
+        self._output_index = {label: i for i, label in enumerate(self._labels)}
+        self._term_nodes = np.array(
+            [node for label in self._labels for node, _ in terms[label]], dtype=int
+        )
+        self._term_copies = np.array(
+            [copy for label in self._labels for _, copy in terms[label]], dtype=int
+        )
+        sizes = [len(terms[label]) for label in self._labels]
+        self._term_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int)
+
+        # the nodes of every copy are appended in topological order
+        self._levels = compile_levels(
+            list(range(self._n_nodes)),
+            dict(enumerate(node_parents)),
+            node_gates,
+            self._dtype,
+        )
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def labels(self) -> List[Tuple[str, str]]:
+        return self._labels
+
+    @property
+    def roots(self) -> List[Tuple[str, str]]:
+        return self._roots
+
+    @property
+    def priors(self) -> np.ndarray:
+        return self._priors
+
+    @property
+    def levels(self) -> List[Dict[str, np.ndarray]]:
+        return self._levels
+
+    @property
+    def n_copies(self) -> int:
+        return len(self._cut_columns)
+
+    def evaluate(
+        self,
+        priors: Optional[np.ndarray] = None,
+        outputs: Optional[List[Tuple[str, str]]] = None,
+        chunk_size: int = 4096,
+    ) -> np.ndarray:
+        """Calculate P(True) of the output nodes of all cases for a batch of root node beliefs.
+
+        Args:
+            priors (numpy.ndarray): Beliefs P(True) of the root nodes of all cases (batch x roots) in the order
+                of `roots`. A single configuration may be passed as a vector, if omitted `priors` are used.
+            outputs (List<tuple<str, str>>): Nodes to return as (case, label), defaults to all nodes in the
+                order of `labels`.
+            chunk_size (int): Maximum number of configurations evaluated at once, which bounds the memory.
+
+        Returns:
+            numpy.ndarray: P(True) of the output nodes (batch x outputs).
+        """
+        priors = np.atleast_2d(self._priors if priors is None else priors)
+        if priors.shape[1] != len(self._roots):
+            raise ValueError(
+                f"Beliefs of all {len(self._roots)} root nodes need to be provided, but got {priors.shape[1]}."
+            )
+        if np.any((priors < 0.0) | (priors > 1.0)):
+            raise ValueError("Provided beliefs need to be between 0...1.")
+
+        if outputs is None:
+            output_index = np.arange(len(self._labels))
+        else:
+            unknown = [x for x in outputs if x not in self._output_index]
+            if unknown:
+                raise ValueError(
+                    f"Scoped nodes {unknown} are not part of the packed cases."
+                )
+            output_index = np.array([self._output_index[x] for x in outputs], dtype=int)
+
+        return np.concatenate(
+            [
+                self._evaluate_chunk(priors[i : i + chunk_size], output_index)
+                for i in range(0, max(len(priors), 1), chunk_size)
+            ]
+        )
+
+    def _evaluate_chunk(
+        self, priors: np.ndarray, output_index: np.ndarray
+    ) -> np.ndarray:
+        # node-major layout: messages (nodes x 2 x batch), the fixed states of shared root nodes are indicators
+        messages = np.empty((self._n_nodes, 2, len(priors)), self._dtype)
+        root_msgs = priors.T[self._root_columns]
+        messages[self._root_nodes, 0] = root_msgs
+        messages[self._root_nodes, 1] = 1.0 - root_msgs
+        messages[self._fixed_nodes, 0] = (self._fixed_states == 0)[:, None]
+        messages[self._fixed_nodes, 1] = (self._fixed_states == 1)[:, None]
+
+        propagate_levels(messages, self._levels, self._log_space)
+
+        # weight each copy by the beliefs of its fixed states (copies x batch)
+        beliefs = priors.T[self._cut_columns]
+        copy_weights = np.where(
+            self._cut_mask[:, :, None],
+            np.where(self._cut_states[:, :, None] == 0, beliefs, 1.0 - beliefs),
+            1.0,
+        ).prod(axis=1)
+
+        totals = np.add.reduceat(
+            messages[self._term_nodes, 0] * copy_weights[self._term_copies],
+            self._term_starts,
+            axis=0,
+        )
+        return totals[output_index].T
@@ -0,0 +1,91 @@
+from typing import Dict, List, NamedTuple, Optional
+
+
+class QueryPlan(NamedTuple):
+    """Nodes of a BN that are required to answer the query P(goal | evidence).
+
+    Attributes:
+        goal (str): Queried node.
+        nodes (List<str>): Nodes whose CPDs are required (i.e. neither barren nor d-separated from the goal).
+        evidence (Dict<str, str>): Evidence on required nodes, d-separated evidence is dropped.
+        evidence_roots (List<str>): Observed parents of required nodes which are not required themselves.
+            They only fix the states of their children, hence they are added as root nodes with an arbitrary prior.
+        pruned (int): Number of removed BN nodes.
+    """
+
+    goal: str
+    nodes: List[str]
+    evidence: Dict[str, str]
+    evidence_roots: List[str]
+    pruned: int
+
+
+def plan_query(
+    parents: Dict[str, List[str]],
+    goal: str,
+    evidence: Optional[Dict[str, str]] = None,
+) -> QueryPlan:
+    """
+    Remove all nodes of a BN that do not influence P(goal | evidence) before running inference:
+    1) Barren nodes, i.e. nodes that are neither ancestors of the goal nor of the evidence.
+    2) Nodes that are d-separated from the goal by the evidence. Observed nodes block all paths through their
+       outgoing edges, hence only nodes connected with the goal after removing these edges are required.
+    Only the ancestors of the goal and the evidence are visited, i.e. the costs of a query of a low-level goal
+    are bounded by its relevant subtree instead of the whole BN.
+
+    Args:
+        parents (Dict<str, List<str>>): Parents of each node in the BN (empty for root nodes).
+        goal (str): Queried node.
+        evidence (Dict<str, str>): Observed states of BN nodes.
+
+    Returns:
+        QueryPlan: Required nodes and evidence of the query.
+    """
+    evidence = evidence if evidence else {}
+    for label in [goal, *evidence]:
+        if label not in parents:
+            raise ValueError(f"Scoped element {label} is not part of the BN.")
+
+    # 1) the ancestral set of the goal and the evidence, all other nodes are barren
+    ancestral = {}
+    stack = [goal, *evidence]
+    while stack:
+        label = stack.pop()
+        if label not in ancestral:
+            ancestral[label] = None
+            stack.extend(parents[label])
+
+    # 2) the connected component of the goal without the outgoing edges of observed nodes
+    neighbours = {label: [] for label in ancestral}
+    for label in ancestral:
+        for parent in parents[label]:
+            if parent not in evidence:
+                neighbours[label].append(parent)
+                neighbours[parent].append(label)
+
+    required = {goal: None}
+    stack = [goal]
+    while stack:
+        for label in neighbours[stack.pop()]:
+            if label not in required:
+                required[label] = None
+                stack.append(label)
+
+    evidence_roots = {
+        parent: None
+        for label in required
+        for parent in parents[label]
+        if parent in evidence and parent not in required
+    }
+
+    return QueryPlan(
+        goal=goal,
+        nodes=list(required),
+        evidence={
+            label: state
+            for label, state in evidence.items()
+            if label in required or label in evidence_roots
+        },
+        evidence_roots=list(evidence_roots),
+        pruned=len(parents) - len(required) - len(evidence_roots),
+    )
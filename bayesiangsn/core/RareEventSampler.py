@@ -0,0 +1,249 @@
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from bayesiangsn.core.GateNetwork import GateNetwork
+
+
+class RareEventEstimate(NamedTuple):
+    """Importance sampling estimate of P(goal=notSat|notSound).
+
+    Attributes:
+        goal (str): Estimated node.
+        probability (float): Estimated failure probability.
+        relative_error (float): Standard error of the estimate divided by the estimate (inf if it is 0).
+        n_samples (int): Number of samples of the final estimate (without the cross-entropy iterations).
+        proposal (Dict<str, float>): Biased failure probabilities of the root nodes the samples were drawn from.
+    """
+
+    goal: str
+    probability: float
+    relative_error: float
+    n_samples: int
+    proposal: Dict[str, float]
+
+
+class RareEventSampler:
+    """Importance sampler of tiny failure probabilities of a goal, e.g. P(G1=notSat) = 1e-9.
+
+    Plain forward sampling needs ~100 / P(failure) samples for a 10% relative error. Instead, the failures of
+    the root nodes are drawn from a biased proposal q (more likely failures) and every sample is weighted by
+    the likelihood ratio p(x)/q(x) of its root states. The proposal is tuned by the cross-entropy method,
+    i.e. it iteratively moves towards the failure probabilities of the roots conditioned on the goal failure.
+    The goal itself is not sampled: every sample contributes P(goal fails | sampled parents) instead of a 0|1
+    indicator, which lowers the variance further. Gates (incl. noisy|leaky ones) are sampled from their
+    factorised CPTs, hence the BN does not need to be tree-structured.
+
+    The ancestors of the goal are lowered into topologically ordered levels (see CompiledGateNetwork), and
+    all samples of a chunk are propagated through a level with a few vectorised NumPy operations.
+
+    Attributes:
+        goal (str): Estimated node.
+        roots (List<str>): Root nodes the goal depends on, in the column order of the proposal.
+        failure_probs (numpy.ndarray): Nominal failure probabilities 1 - belief of the root nodes.
+    """
+
+    def __init__(self, network: GateNetwork, goal: str) -> None:
+        if goal not in network.parents:
+            raise ValueError(f"Scoped element {goal} is not part of the BN.")
+        if not network.parents[goal]:
+            raise ValueError(
+                f"Scoped element {goal} is a root node, its failure probability is 1 - belief."
+            )
+
+        ancestors = set()
+        stack = [goal]
+        while stack:
+            label = stack.pop()
+            if label not in ancestors:
+                ancestors.add(label)
+                stack.extend(network.parents[label])
+
+        self._goal = goal
+        self._labels = [label for label in network.order if label in ancestors]
+        index = {label: i for i, label in enumerate(self._labels)}
+        self._roots = [label for label in self._labels if not network.parents[label]]
+        self._root_index = np.array([index[x] for x in self._roots], dtype=int)
+        self._failure_probs = np.array(
+            [1.0 - network.priors[label] for label in self._roots]
+        )
+
+        depth = {}
+        for label in self._labels:
+            depth[label] = 1 + max(
+                (depth[parent] for parent in network.parents[label]), default=-1
+            )
+
+        # the goal is the only node of the last level
+        self._levels = []
+        for level in range(1, depth[goal] + 1):
+            nodes = [x for x in self._labels if depth[x] == level]
+            sizes = [len(network.parents[x]) for x in nodes]
+            self._levels.append(
+                {
+                    "nodes": np.array([index[x] for x in nodes], dtype=int),
+                    "targets": np.array(
+                        [network.gates[x].target_state for x in nodes], dtype=bool
+                    ),
+                    "constants": np.array([network.gates[x].constant for x in nodes]),
+                    "parents": np.array(
+                        [index[p] for x in nodes for p in network.parents[x]], dtype=int
+                    ),
+                    "edges": np.arange(sum(sizes)),
+                    "weights": np.concatenate(
+                        [network.gates[x].weights for x in nodes]
+                    ),
+                    "starts": np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int),
+                }
+            )
+
+    @property
+    def goal(self) -> str:
+        return self._goal
+
+    @property
+    def roots(self) -> List[str]:
+        return self._roots
+
+    @property
+    def failure_probs(self) -> np.ndarray:
+        return self._failure_probs
+
+    def estimate(
+        self,
+        n_samples: int = 10000,
+        ce_iterations: int = 10,
+        ce_samples: int = 2000,
+        smoothing: float = 0.7,
+        min_observations: int = 10,
+        proposal: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
+        chunk_size: int = 65536,
+    ) -> RareEventEstimate:
+        """Estimate the failure probability of the goal.
+
+        Args:
+            n_samples (int): Number of samples of the final estimate.
+            ce_iterations (int): Maximum number of cross-entropy iterations to tune the proposal (0 to use the
+                given or initial proposal as is).
+            ce_samples (int): Number of samples per cross-entropy iteration.
+            smoothing (float): Weight of the new proposal in each iteration, the remainder keeps the old one.
+            min_observations (int): Minimum number of samples in the failure region to update the proposal, and
+                of failures of a root node among them to update its failure probability. With thousands of roots,
+                most of them are rarely observed in a cross-entropy iteration, and updating them would degenerate
+                the proposal towards the nominal one.
+            proposal (numpy.ndarray): Initial failure probabilities of the root nodes (see `roots`). By default,
+                each root fails at least with probability 1 / number of roots.
+            seed (int): Seed of the random number generator.
+            chunk_size (int): Maximum number of samples that are propagated at once (bounds the memory usage).
+
+        Returns:
+            RareEventEstimate: Estimated failure probability, its relative error and the final proposal.
+        """
+        if n_samples < 2:
+            raise ValueError(
+                f"At least 2 samples are required but {n_samples} were requested."
+            )
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError(f"Smoothing needs to be in (0, 1] but is {smoothing}.")
+
+        rng = np.random.default_rng(seed)
+        nominal = self._failure_probs
+        # roots that cannot fail (or always fail) are never biased
+        biased = (nominal > 0.0) & (nominal < 1.0)
+
+        if proposal is None:
+            proposal = np.maximum(nominal, 1.0 / max(len(self._roots), 2))
+        proposal = np.where(biased, np.clip(proposal, nominal, 1.0 - 1e-9), nominal)
+
+        for _ in range(ce_iterations):
+            total, hits = 0.0, 0
+            failures, observations = np.zeros((2, len(self._roots)))
+            for roots, scores in self._sample(proposal, ce_samples, rng, chunk_size):
+                total += scores.sum()
+                hits += np.count_nonzero(scores)
+                failures += scores @ roots
+                observations += (scores > 0.0) @ roots
+
+            if hits < min_observations:
+                # (almost) no failure observed, i.e. the failure region is too far: bias all roots further
+                proposal = np.where(biased, 0.5 * (proposal + 0.5), nominal)
+                continue
+
+            updated = np.where(
+                biased & (observations >= min_observations),
+                np.clip(
+                    smoothing * failures / total + (1.0 - smoothing) * proposal,
+                    nominal,
+                    1.0 - 1e-9,
+                ),
+                proposal,
+            )
+            converged = np.allclose(updated, proposal, rtol=1e-2, atol=1e-12)
+            proposal = updated
+            if converged:
+                break
+
+        total, squares = 0.0, 0.0
+        for _, scores in self._sample(proposal, n_samples, rng, chunk_size):
+            total += scores.sum()
+            squares += (scores**2).sum()
+
+        probability = total / n_samples
+        variance = (
+            max(squares / n_samples - probability**2, 0.0) * n_samples / (n_samples - 1)
+        )
+        relative_error = (
+            float(np.sqrt(variance / n_samples) / probability)
+            if probability > 0.0
+            else np.inf
+        )
+
+        return RareEventEstimate(
+            goal=self._goal,
+            probability=float(probability),
+            relative_error=relative_error,
+            n_samples=n_samples,
+            proposal=dict(zip(self._roots, proposal.tolist())),
+        )
+
+    def _sample(
+        self,
+        proposal: np.ndarray,
+        n_samples: int,
+        rng: np.random.Generator,
+        chunk_size: int,
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield the sampled root failures and the weighted goal failure probabilities per chunk of samples."""
+        nominal = self._failure_probs
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_fail = np.where(nominal > 0.0, np.log(nominal) - np.log(proposal), 0.0)
+            log_sat = np.where(
+                nominal < 1.0, np.log1p(-nominal) - np.log1p(-proposal), 0.0
+            )
+
+        for start in range(0, n_samples, chunk_size):
+            size = min(chunk_size, n_samples - start)
+            failed = np.empty((size, len(self._labels)), dtype=bool)
+            roots = rng.random((size, len(self._roots))) < proposal
+            failed[:, self._root_index] = roots
+            log_weights = np.where(roots, log_fail, log_sat).sum(axis=1)
+
+            for level in self._levels:
+                # P(y=target | x) = c * prod_i w_i(x_i), with the states 0: True, 1: False
+                terms = level["weights"][
+                    level["edges"], failed[:, level["parents"]].view(np.int8)
+                ]
+                target_probs = level["constants"] * np.multiply.reduceat(
+                    terms, level["starts"], axis=1
+                )
+                if level is self._levels[-1]:
+                    failure_probs = np.where(
+                        level["targets"], target_probs, 1.0 - target_probs
+                    )[:, 0]
+                    break
+
+                hits = rng.random(target_probs.shape) < target_probs
+                failed[:, level["nodes"]] = hits == level["targets"]
+
+            yield roots.astype(float), np.exp(log_weights) * failure_probs
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class ResultCache:
+    """Thread-safe, size-bounded cache with least-recently-used (LRU) eviction and hit-rate metrics.
+
+    Instances can be shared between multiple NesicBayesianGsnTree instances (e.g. to reuse results of
+    identical sub-arguments across safety cases, see GsnTree.subtree_hashes).
+
+    Attributes:
+        max_size (int): Maximum number of cached entries.
+        hits (int): Number of lookups that found an entry.
+        misses (int): Number of lookups that did not find an entry.
+    """
+
+    def __init__(self, max_size: int = 100000) -> None:
+        if max_size < 1:
+            raise ValueError(f"Cache size needs to be at least 1 but is {max_size}.")
+
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default=None):
+        """Return the cached value (and mark it as recently used) or the default if not cached."""
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return default
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value) -> None:
+        """Cache a value, the least recently used entry is evicted if the cache is full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Remove all entries whose key matches the predicate (all entries if none is provided).
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if not predicate or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+
+            return len(keys)
+
+    def rekey(self, func: Callable[[Hashable, object], Optional[Hashable]]) -> int:
+        """Replace the key of each entry by func(key, value) while keeping the LRU order.
+        Entries for which None is returned are removed (e.g. results invalidated by a model change).
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self._lock:
+            entries = OrderedDict()
+            for key, value in self._entries.items():
+                new_key = func(key, value)
+                if new_key is not None:
+                    entries[new_key] = value
+
+            removed = len(self._entries) - len(entries)
+            self._entries = entries
+            return removed
+
+    def clear(self) -> None:
+        """Remove all entries and reset the metrics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
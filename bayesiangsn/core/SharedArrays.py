@@ -0,0 +1,83 @@
+import os
+import tempfile
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# arrays are placed at multiples of a cache line within the mapped file
+ALIGNMENT = 64
+
+
+class SharedArraysHandle(NamedTuple):
+    """Small, picklable reference to arrays published by `publish_arrays`, e.g. to pass to worker processes.
+
+    Attributes:
+        path (str): Memory-mapped file that contains the arrays.
+        layout (Dict<str, tuple<int, tuple<int>, str>>): Byte offset, shape and dtype of each array.
+        metadata (Dict<str, object>): Small scalar values published alongside the arrays.
+    """
+
+    path: str
+    layout: Dict[str, Tuple[int, Tuple[int, ...], str]]
+    metadata: Dict[str, object]
+
+
+def publish_arrays(
+    arrays: Dict[str, np.ndarray],
+    metadata: Optional[Dict[str, object]] = None,
+    path: Optional[str] = None,
+) -> SharedArraysHandle:
+    """Write arrays into a single file, which other processes map read-only (see `attach_arrays`).
+
+    All processes that attach to the file share the same physical pages of the OS page cache, i.e. the arrays
+    are neither copied nor unpickled per process. The file is placed in /dev/shm (memory-backed) if available.
+    The publisher owns the file and removes it with `unlink_arrays`, mapped arrays stay valid until released.
+
+    Args:
+        arrays (Dict<str, numpy.ndarray>): Arrays to publish by name.
+        metadata (Dict<str, object>): Small scalar values passed along with the handle.
+        path (str): File to write, a temporary file if omitted.
+
+    Returns:
+        SharedArraysHandle: Reference to the published arrays.
+    """
+    if path is None:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        descriptor, path = tempfile.mkstemp(suffix=".arrays", dir=directory)
+        os.close(descriptor)
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(f"Array {name} cannot be shared, it contains objects.")
+
+        layout[name] = (offset, array.shape, array.dtype.str)
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    with open(path, "wb") as file:
+        for name, array in arrays.items():
+            file.seek(layout[name][0])
+            file.write(np.ascontiguousarray(array).tobytes())
+        file.truncate(max(offset, ALIGNMENT))
+
+    return SharedArraysHandle(path=path, layout=layout, metadata=dict(metadata or {}))
+
+
+def attach_arrays(handle: SharedArraysHandle) -> Dict[str, np.ndarray]:
+    """Map the published arrays read-only into this process (without copying them).
+
+    Returns:
+        Dict<str, numpy.ndarray>: Read-only views of all published arrays by name.
+    """
+    buffer = np.memmap(handle.path, dtype=np.uint8, mode="r")
+    return {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        for name, (offset, shape, dtype) in handle.layout.items()
+    }
+
+
+def unlink_arrays(handle: SharedArraysHandle) -> None:
+    """Remove the file of published arrays, processes that already mapped it keep valid arrays."""
+    if os.path.exists(handle.path):
+        os.remove(handle.path)
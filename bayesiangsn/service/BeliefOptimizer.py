@@ -0,0 +1,311 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+from bayesiangsn.utils.Utils import is_valid_prob
+
+# tolerance of the comparison of a goal belief with the target
+TARGET_TOLERANCE = 1e-12
+
+
+class ImprovementStep(NamedTuple):
+    """Improvement of the belief of a root node as part of an ImprovementPlan.
+
+    Attributes:
+        label (str): Improved root node (e.g. a Solution).
+        belief (float): Improved belief of the root node.
+        cost (float): Cost of the improvement.
+        goal_belief (float): Belief in the goal after applying this and all previous steps of the plan.
+    """
+
+    label: str
+    belief: float
+    cost: float
+    goal_belief: float
+
+
+class ImprovementPlan(NamedTuple):
+    """Set of belief improvements that reaches a target belief in a goal.
+
+    Attributes:
+        goal (str): Goal of the target belief.
+        target (float): Target belief P(goal=sat).
+        goal_belief (float): Belief in the goal after applying all steps.
+        cost (float): Total cost of all steps.
+        reached (bool): Whether the target is reached, otherwise the plan applies all improvements that help.
+        steps (List<ImprovementStep>): Improvements ranked by their cost-effectiveness.
+    """
+
+    goal: str
+    target: float
+    goal_belief: float
+    cost: float
+    reached: bool
+    steps: List[ImprovementStep]
+
+
+class BeliefOptimizer:
+    """Search of the cheapest belief improvements of root nodes (e.g. additional tests of Solutions) that raise
+    the belief in a goal to a target, e.g. P(G1=sat) >= 0.999.
+
+    Each root node may be improved to one of several beliefs with user-supplied costs. The belief in a goal is
+    multilinear in the root node beliefs, hence the effect of changing a single belief is exactly the change of
+    the belief times the derivative of the goal belief with respect to it. The derivatives of all root nodes
+    are obtained by a single reverse pass of the compiled arithmetic circuit (see ArithmeticCircuit), i.e. each
+    step of the search evaluates all candidate improvements at once:
+    1) Greedily apply the improvement with the largest gain (up to the target) per additional cost.
+    2) Revert or downgrade the improvements with the largest savings as long as the target is still reached.
+    3) Local search: revert a single improvement, exclude it and repeat 1) and 2), as long as this is cheaper.
+    Finally, the improvements are ranked by their gain per cost given all higher-ranked improvements.
+    """
+
+    def __init__(
+        self, nesic_tree: NesicBayesianGsnTree, goal: Optional[str] = None
+    ) -> None:
+        """
+        Args:
+            nesic_tree (NesicBayesianGsnTree): Model to optimise, later changes of the model are not reflected.
+            goal (str): Goal of the target belief (defaults to the main goal).
+        """
+        self._circuit = nesic_tree.compile_circuit()
+        self._goal = goal if goal else nesic_tree.gsn_tree.root
+        if self._goal not in self._circuit.labels:
+            raise ValueError(
+                f"Provided goal ({self._goal}) is not part of the BN representation."
+            )
+
+        self._evidence = {self._goal: nesic_tree.state_names[self._goal][0]}
+        self._index = {label: i for i, label in enumerate(self._circuit.roots)}
+
+    @property
+    def goal(self) -> str:
+        return self._goal
+
+    def goal_belief(self, beliefs: Optional[Dict[str, float]] = None) -> float:
+        """Calculate the belief in the goal if the given root node beliefs are changed."""
+        return float(self._circuit.evaluate(self._priors(beliefs), self._evidence)[0])
+
+    def optimize(
+        self,
+        target: float,
+        improvements: Dict[str, Union[Tuple[float, float], List[Tuple[float, float]]]],
+    ) -> ImprovementPlan:
+        """Find the cheapest improvements that raise the belief in the goal to the target.
+
+        Args:
+            target (float): Target belief P(goal=sat).
+            improvements (Dict<str, List<tuple<float, float>>>): Possible improvements per root node as
+                (belief, cost), e.g. {"Sn1": [(0.99, 5.0), (0.999, 20.0)]}. A single tuple may be passed.
+
+        Returns:
+            ImprovementPlan: Ranked improvements, their total cost and the resulting goal belief.
+        """
+        if not is_valid_prob(target):
+            raise ValueError(
+                f"Target belief needs to be between 0...1 but is {target}."
+            )
+
+        options = self._validate_improvements(improvements)
+        initial = {
+            label: (float(self._circuit.priors[self._index[label]]), 0.0)
+            for label in options
+        }
+
+        # 1) greedy search  2) pruning of redundant improvements
+        levels = self._prune(
+            self._greedy(initial, options, target, set()), options, target
+        )
+
+        # 3) local search: replace an improvement by the cheapest alternatives found without it
+        improved = self._goal_belief(levels) >= target - TARGET_TOLERANCE
+        while improved:
+            improved = False
+            for label in [x for x in levels if levels[x] != initial[x]]:
+                if levels[label] == initial[label]:
+                    continue
+
+                candidate = self._prune(
+                    self._greedy(
+                        {**levels, label: initial[label]}, options, target, {label}
+                    ),
+                    options,
+                    target,
+                )
+                if (
+                    self._goal_belief(candidate) >= target - TARGET_TOLERANCE
+                    and _cost(candidate) < _cost(levels) - TARGET_TOLERANCE
+                ):
+                    levels, improved = candidate, True
+
+        order = self._rank(initial, levels)
+        cumulative = np.tile(self._circuit.priors, (len(order), 1))
+        for step, label in enumerate(order):
+            cumulative[step:, self._index[label]] = levels[label][0]
+        goal_beliefs = (
+            self._circuit.evaluate(cumulative, self._evidence) if order else []
+        )
+        goal_belief = self._goal_belief(levels)
+
+        return ImprovementPlan(
+            goal=self._goal,
+            target=target,
+            goal_belief=goal_belief,
+            cost=_cost(levels),
+            reached=goal_belief >= target - TARGET_TOLERANCE,
+            steps=[
+                ImprovementStep(
+                    label=label,
+                    belief=levels[label][0],
+                    cost=levels[label][1],
+                    goal_belief=float(belief),
+                )
+                for label, belief in zip(order, goal_beliefs)
+            ],
+        )
+
+    def _greedy(
+        self,
+        levels: Dict[str, Tuple[float, float]],
+        options: Dict[str, List[Tuple[float, float]]],
+        target: float,
+        excluded: Set[str],
+    ) -> Dict[str, Tuple[float, float]]:
+        """Apply the improvement with the largest gain (up to the target) per additional cost until the target
+        is reached or no improvement helps anymore."""
+        levels = dict(levels)
+        belief, derivatives = self._differentiate(levels)
+        while belief < target - TARGET_TOLERANCE:
+            best, best_ratio = None, 0.0
+            for label, choices in options.items():
+                if label in excluded:
+                    continue
+
+                level_belief, level_cost = levels[label]
+                for option in choices:
+                    gain = (option[0] - level_belief) * derivatives[self._index[label]]
+                    if gain <= 0.0:
+                        continue
+
+                    extra_cost = option[1] - level_cost
+                    ratio = (
+                        np.inf
+                        if extra_cost <= 0.0
+                        else min(gain, target - belief) / extra_cost
+                    )
+                    if ratio > best_ratio:
+                        best, best_ratio = (label, option), ratio
+
+            if best is None:
+                break
+
+            levels[best[0]] = best[1]
+            belief, derivatives = self._differentiate(levels)
+
+        return levels
+
+    def _prune(
+        self,
+        levels: Dict[str, Tuple[float, float]],
+        options: Dict[str, List[Tuple[float, float]]],
+        target: float,
+    ) -> Dict[str, Tuple[float, float]]:
+        """Revert|downgrade the improvements with the largest savings as long as the target is still reached."""
+        levels = dict(levels)
+        belief, derivatives = self._differentiate(levels)
+        while belief >= target - TARGET_TOLERANCE:
+            best, best_saving = None, 0.0
+            for label, (level_belief, level_cost) in levels.items():
+                initial = (float(self._circuit.priors[self._index[label]]), 0.0)
+                for option in [initial] + options[label]:
+                    saving = level_cost - option[1]
+                    loss = (level_belief - option[0]) * derivatives[self._index[label]]
+                    if (
+                        saving > best_saving
+                        and belief - loss >= target - TARGET_TOLERANCE
+                    ):
+                        best, best_saving = (label, option), saving
+
+            if best is None:
+                break
+
+            levels[best[0]] = best[1]
+            belief, derivatives = self._differentiate(levels)
+
+        return levels
+
+    def _rank(
+        self,
+        initial: Dict[str, Tuple[float, float]],
+        levels: Dict[str, Tuple[float, float]],
+    ) -> List[str]:
+        """Order the improvements of a plan by their gain per cost, given all previously ranked improvements."""
+        current = dict(initial)
+        remaining = [label for label in levels if levels[label] != initial[label]]
+        order = []
+        while remaining:
+            _, derivatives = self._differentiate(current)
+            label = max(
+                remaining,
+                key=lambda x: (
+                    (levels[x][0] - current[x][0])
+                    * derivatives[self._index[x]]
+                    / levels[x][1]
+                    if levels[x][1] > 0.0
+                    else np.inf
+                ),
+            )
+            order.append(label)
+            remaining.remove(label)
+            current[label] = levels[label]
+
+        return order
+
+    def _goal_belief(self, levels: Dict[str, Tuple[float, float]]) -> float:
+        return float(self._differentiate(levels)[0])
+
+    def _differentiate(
+        self, levels: Dict[str, Tuple[float, float]]
+    ) -> Tuple[float, np.ndarray]:
+        """Return the goal belief and its derivatives with respect to all root node beliefs."""
+        results = self._circuit.differentiate(
+            self._priors({label: x[0] for label, x in levels.items()}), self._evidence
+        )
+        return results.probability_of_evidence[0], results.belief_derivatives[0]
+
+    def _priors(self, beliefs: Optional[Dict[str, float]]) -> np.ndarray:
+        priors = self._circuit.priors.copy()
+        for label, belief in (beliefs if beliefs else {}).items():
+            priors[self._index[label]] = belief
+
+        return priors
+
+    def _validate_improvements(
+        self,
+        improvements: Dict[str, Union[Tuple[float, float], List[Tuple[float, float]]]],
+    ) -> Dict[str, List[Tuple[float, float]]]:
+        options = {}
+        for label, choices in improvements.items():
+            if label not in self._index:
+                raise ValueError(
+                    f"Scoped element {label} is not a root node of the BN representation."
+                )
+
+            choices = [choices] if isinstance(choices, tuple) else list(choices)
+            for belief, cost in choices:
+                if not is_valid_prob(belief):
+                    raise ValueError(
+                        f"Improved belief for element {label} needs to be between 0...1 but is {belief}."
+                    )
+                if cost < 0.0:
+                    raise ValueError(
+                        f"Cost of the improvement of element {label} cannot be negative but is {cost}."
+                    )
+
+            options[label] = [(float(b), float(c)) for b, c in choices]
+
+        return options
+
+
+def _cost(levels: Dict[str, Tuple[float, float]]) -> float:
+    return float(sum(cost for _, cost in levels.values()))
@@ -0,0 +1,173 @@
+import argparse
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+
+class BulkEvaluator:
+    """Streaming evaluation of goal beliefs for large tables of records (e.g. nightly test results).
+
+    Each record (row) maps columns to BN root nodes (Solutions, Contexts, ...). A numeric value is used as
+    belief of the root node, a state name (e.g. 'sat' | 'notSat') as evidence on it. Empty values keep the
+    belief of the loaded model. As root nodes are independent, evidence on them is equivalent to a belief
+    of 1.0 | 0.0, hence all records are evaluated batch-wise by the compiled array program of the model
+    (see NesicBayesianGsnTree.compile). All other columns are passed through to the results.
+
+    Input files are read lazily in chunks and results are written incrementally, i.e. the memory is bounded
+    by the chunk size regardless of the input size. CSV and JSONL (one JSON record per line) are supported.
+
+    Only tree-structured BNs can be compiled, i.e. models with goals shared by multiple strategies are rejected.
+    """
+
+    def __init__(
+        self,
+        nesic_tree: NesicBayesianGsnTree,
+        goals: Optional[List[str]] = None,
+        columns: Optional[Dict[str, str]] = None,
+        chunk_size: int = 10000,
+    ) -> None:
+        """
+        Args:
+            nesic_tree (NesicBayesianGsnTree): Model to evaluate, later changes of the model are not reflected.
+            goals (List<str>): Goals whose beliefs are calculated per record (defaults to the main goal).
+            columns (Dict<str, str>): Mapping of input columns to root nodes. By default, all columns named
+                like a root node are mapped.
+            chunk_size (int): Number of records read, evaluated and written at once.
+        """
+        if not nesic_tree.is_tree_structured:
+            raise ValueError(
+                f"Bulk evaluation requires a tree-structured BN, but model {nesic_tree.name} shares Goals|Strategies "
+                "between multiple elements (use query_belief_in_goal per record instead)."
+            )
+
+        self._compiled = nesic_tree.compile()
+        self._goals = goals if goals else [nesic_tree.gsn_tree.root]
+        self._chunk_size = chunk_size
+
+        for goal in self._goals:
+            if goal not in self._compiled.labels:
+                raise ValueError(
+                    f"Provided goal ({goal}) is not part of the BN representation."
+                )
+
+        roots = self._compiled.roots
+        self._columns = columns if columns else {x: x for x in roots}
+        for column, root in self._columns.items():
+            if root not in roots:
+                raise ValueError(
+                    f"Column {column} is mapped to {root}, which is not a root node of the BN representation."
+                )
+
+        self._state_values = {
+            root: dict(zip(nesic_tree.state_names[root], [1.0, 0.0])) for root in roots
+        }
+
+    @property
+    def goals(self) -> List[str]:
+        return self._goals
+
+    @property
+    def columns(self) -> Dict[str, str]:
+        return self._columns
+
+    def evaluate_chunk(self, records: pd.DataFrame) -> pd.DataFrame:
+        """Calculate the goal beliefs of a chunk of records.
+
+        Returns:
+            pandas.DataFrame: All unmapped columns of the records and the belief of each goal.
+        """
+        roots = self._compiled.roots
+        priors = np.tile(self._compiled.priors, (len(records), 1))
+        mapped = [column for column in records.columns if column in self._columns]
+
+        for column in mapped:
+            root = self._columns[column]
+            values = records[column]
+            states = values.map(self._state_values[root])
+            beliefs = pd.to_numeric(values.where(states.isna()), errors="coerce")
+
+            invalid = values.notna() & states.isna() & beliefs.isna()
+            if invalid.any():
+                raise ValueError(
+                    f"Column {column} contains values which are neither a belief nor a state of {root}: "
+                    f"{values[invalid].unique().tolist()}"
+                )
+
+            beliefs = beliefs.fillna(states).to_numpy(dtype=float)
+            j = roots.index(root)
+            priors[:, j] = np.where(np.isnan(beliefs), priors[:, j], beliefs)
+
+        results = records.drop(columns=mapped)
+        results[self._goals] = self._compiled.evaluate(priors, self._goals)
+
+        return results
+
+    def evaluate_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Lazily evaluate a stream of record chunks (e.g. pandas.read_csv(..., chunksize=n))."""
+        for records in chunks:
+            yield self.evaluate_chunk(records)
+
+    def evaluate_file(self, input_path: str, output_path: str) -> int:
+        """Stream all records of a CSV|JSONL file through the model and write the results incrementally.
+        The formats are derived from the file extensions (.csv | .jsonl).
+
+        Returns:
+            int: Number of evaluated records.
+        """
+        reader = _read_chunks(input_path, self._chunk_size)
+        output_format = _file_format(output_path)
+
+        n_records = 0
+        with open(output_path, "w", newline="") as file:
+            for results in self.evaluate_chunks(reader):
+                if output_format == "csv":
+                    results.to_csv(file, header=n_records == 0, index=False)
+                else:
+                    lines = results.to_json(orient="records", lines=True).rstrip("\n")
+                    file.write(lines + "\n" if len(results) else "")
+                n_records += len(results)
+
+        return n_records
+
+
+def _file_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".csv", ".jsonl"):
+        raise ValueError(
+            f"Unsupported file format {extension} of {path}, use .csv or .jsonl."
+        )
+
+    return extension[1:]
+
+
+def _read_chunks(path: str, chunk_size: int) -> Iterable[pd.DataFrame]:
+    if _file_format(path) == "csv":
+        return pd.read_csv(path, chunksize=chunk_size)
+
+    return pd.read_json(path, lines=True, chunksize=chunk_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate goal beliefs for all records of a CSV|JSONL file."
+    )
+    parser.add_argument("yaml_path")
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--goals", nargs="*", default=None)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    name = os.path.basename(args.yaml_path)
+    evaluator = BulkEvaluator(
+        NesicBayesianGsnTree(name, GsnTree(name, args.yaml_path)),
+        goals=args.goals,
+        chunk_size=args.chunk_size,
+    )
+    n_records = evaluator.evaluate_file(args.input_path, args.output_path)
+    print(f"Evaluated {n_records} records.")
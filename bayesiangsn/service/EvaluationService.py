@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Callable, Dict, Optional, Tuple
+
+import yaml
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+
+class EvaluationService:
+    """Local asyncio-based HTTP/JSON service keeping loaded GSN trees resident in memory.
+
+    Models are loaded once from a gsn2x YAML and keyed by the SHA-256 hash of the file content.
+    Inference, model construction and file hashing run in a worker pool to keep the event loop responsive.
+    The pool uses threads, because models are resident and mutable (see `/aggregation`) and cannot be
+    pickled to worker processes. The native evaluators spend most of their time in NumPy operations,
+    which release the GIL, while pgmpy inference (e.g. evidence on BNs that are not tree-structured)
+    holds it, i.e. such queries are served concurrently but not in parallel.
+    All requests run concurrently, NesicBayesianGsnTree publishes consistent model snapshots on every change.
+
+    Routes (JSON bodies):
+        GET  /models      -> {"models": {model_id: name}}
+        POST /models      {"path": str, "name": Optional[str]} -> {"model": model_id}
+        POST /belief      {"model": str, "goal": Optional[str], "evidence": Optional[dict]} -> {"goal": str, "belief": float}
+        POST /what-if     {"model": str, "goal": Optional[str], "evidence": dict} -> {"goal": str, "baseline": float, "belief": float}
+        POST /aggregation {"model": str, "goal": str, "gate_model": str, "prob_values", "substitute_probs", "leak"} -> {"goal": str}
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._models: Dict[str, NesicBayesianGsnTree] = {}
+        self._load_lock = None
+        self._server = None
+
+        self._routes: Dict[Tuple[str, str], Callable] = {
+            ("GET", "/models"): self._list_models,
+            ("POST", "/models"): self._load_model,
+            ("POST", "/belief"): self._query_belief,
+            ("POST", "/what-if"): self._query_what_if,
+            ("POST", "/aggregation"): self._change_aggregation,
+        }
+
+    @property
+    def models(self) -> Dict[str, NesicBayesianGsnTree]:
+        return self._models
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    async def start(self) -> None:
+        self._load_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port
+        )
+        # the port might have been chosen by the OS (port=0)
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if not self._server:
+            await self.start()
+        print(f"Serving GSN evaluations on http://{self._host}:{self._port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def handle_request(
+        self, method: str, path: str, payload: Dict
+    ) -> Tuple[HTTPStatus, Dict]:
+        """Dispatch a parsed request and return the HTTP status and JSON-serialisable response."""
+        handler = self._routes.get((method, path), None)
+        if not handler:
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown route: {method} {path}"}
+
+        try:
+            return HTTPStatus.OK, await handler(payload)
+        except (KeyError, TypeError, ValueError, OSError, yaml.YAMLError) as err:
+            return HTTPStatus.BAD_REQUEST, {"error": str(err)}
+        except Exception as err:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(err)}
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if len(request_line) < 2:
+                status, response = HTTPStatus.BAD_REQUEST, {
+                    "error": "Malformed request."
+                }
+            else:
+                try:
+                    payload = json.loads(body) if body else {}
+                except json.JSONDecodeError as err:
+                    status, response = HTTPStatus.BAD_REQUEST, {"error": str(err)}
+                else:
+                    status, response = await self.handle_request(
+                        request_line[0].upper(), request_line[1], payload
+                    )
+
+            content = json.dumps(response).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + content
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _run_in_worker(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
+
+    def _get_model(self, model_id: str) -> NesicBayesianGsnTree:
+        if model_id not in self._models:
+            raise KeyError(f"Model {model_id} is not loaded.")
+        return self._models[model_id]
+
+    async def _list_models(self, payload: Dict) -> Dict:
+        return {"models": {key: model.name for key, model in self._models.items()}}
+
+    async def _load_model(self, payload: Dict) -> Dict:
+        yaml_path = payload["path"]
+        model_id = await self._run_in_worker(_hash_file, yaml_path)
+
+        async with self._load_lock:
+            if model_id not in self._models:
+                name = payload.get("name", yaml_path)
+                self._models[model_id] = await self._run_in_worker(
+                    _build_model, name, yaml_path
+                )
+
+        return {"model": model_id}
+
+    async def _query_belief(self, payload: Dict) -> Dict:
+        goal, belief = await self._run_in_worker(
+            _belief_in_goal,
+            self._get_model(payload["model"]),
+            payload.get("goal"),
+            payload.get("evidence"),
+        )
+
+        return {"goal": goal, "belief": belief}
+
+    async def _query_what_if(self, payload: Dict) -> Dict:
+        goal, baseline, belief = await self._run_in_worker(
+            _what_if_beliefs,
+            self._get_model(payload["model"]),
+            payload.get("goal"),
+            payload["evidence"],
+        )
+
+        return {"goal": goal, "baseline": baseline, "belief": belief}
+
+    async def _change_aggregation(self, payload: Dict) -> Dict:
+        await self._run_in_worker(
+            self._get_model(payload["model"]).change_goal_aggregation,
+            payload["goal"],
+            gate_model=payload.get("gate_model", "and"),
+            prob_values=payload.get("prob_values"),
+            substitute_probs=payload.get("substitute_probs"),
+            leak=payload.get("leak"),
+        )
+
+        return {"goal": payload["goal"]}
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _build_model(name: str, yaml_path: str) -> NesicBayesianGsnTree:
+    return NesicBayesianGsnTree(name, GsnTree(name, yaml_path))
+
+
+def _belief_in_goal(
+    model: NesicBayesianGsnTree, goal: Optional[str], evidence: Optional[Dict[str, str]]
+) -> Tuple[str, float]:
+    goal = goal if goal else model.gsn_tree.root
+    return goal, model.query_goal_belief(goal, evidence)
+
+
+def _what_if_beliefs(
+    model: NesicBayesianGsnTree, goal: Optional[str], evidence: Dict[str, str]
+) -> Tuple[str, float, float]:
+    # both cases are evaluated by one query, i.e. on the same model snapshot
+    goal = goal if goal else model.gsn_tree.root
+    baseline, belief = model.query_beliefs([goal], [None, evidence]).beliefs[:, 0]
+    return goal, float(baseline), float(belief)
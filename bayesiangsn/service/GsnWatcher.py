@@ -0,0 +1,140 @@
+import argparse
+import os
+import time
+from typing import Dict, Optional, Tuple, Union
+
+import yaml
+
+from bayesiangsn.core.Enums import EGsnType
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+
+class GsnFileWatcher:
+    """Watch a gsn2x YAML file and incrementally update its BN representation on every save.
+
+    Each reload classifies the edited elements (see GsnTree.diff):
+        - text-only edits leave the BN untouched,
+        - belief edits only patch the affected CPDs and cached messages (see NesicBayesianGsnTree.update_beliefs),
+        - structural edits rebuild the BN representation.
+    """
+
+    def __init__(
+        self, yaml_path: str, name: Optional[str] = None, poll_interval: float = 0.5
+    ) -> None:
+        self._yaml_path = yaml_path
+        self._name = name if name else os.path.basename(yaml_path)
+        self._poll_interval = poll_interval
+
+        self._mtime = os.stat(yaml_path).st_mtime_ns
+        self._gsn_tree = GsnTree(self._name, yaml_path)
+        self._nesic_tree = NesicBayesianGsnTree(self._name, self._gsn_tree)
+
+    @property
+    def gsn_tree(self) -> GsnTree:
+        return self._gsn_tree
+
+    @property
+    def nesic_tree(self) -> NesicBayesianGsnTree:
+        return self._nesic_tree
+
+    def reload(self) -> Dict:
+        """Parse the YAML file again and apply the detected changes.
+
+        Returns:
+            Dict: The detected changes, whether the BN was rebuilt, the beliefs of the main goal and all
+                changed goals, and the elapsed time in milliseconds.
+        """
+        start = time.perf_counter()
+        new_tree = GsnTree(self._name, self._yaml_path)
+        changes = self._gsn_tree.diff(new_tree)
+        rebuilt = bool(changes["structural"])
+
+        if rebuilt:
+            self._nesic_tree = NesicBayesianGsnTree(self._name, new_tree)
+            self._gsn_tree = new_tree
+            changed_goals = None
+        else:
+            for label in set(changes["belief"] + changes["text"]):
+                self._gsn_tree.tree_elements[label] = new_tree.tree_elements[label]
+                self._gsn_tree.tree_obj.nodes[label]["data"] = new_tree.tree_elements[
+                    label
+                ]
+
+            beliefs = {
+                label: _yaml_belief(new_tree.tree_elements[label].data)
+                for label in changes["belief"]
+                if new_tree.tree_elements[label].element_type
+                not in [EGsnType.GOAL, EGsnType.STRATEGY]
+            }
+            affected = self._nesic_tree.update_beliefs(beliefs) if beliefs else []
+            changed_goals = [
+                label
+                for label in affected
+                if label in self._gsn_tree.tree_elements
+                and self._gsn_tree.tree_elements[label].element_type == EGsnType.GOAL
+            ]
+
+        beliefs = self._nesic_tree.query_goal_beliefs(
+            None
+            if rebuilt
+            else list(dict.fromkeys([self._gsn_tree.root] + changed_goals))
+        )
+
+        return {
+            "changes": changes,
+            "rebuilt": rebuilt,
+            "beliefs": beliefs,
+            "elapsed_ms": (time.perf_counter() - start) * 1e3,
+        }
+
+    def poll(self) -> Optional[Dict]:
+        """Reload the YAML file if it has been modified since the last (re)load."""
+        mtime = os.stat(self._yaml_path).st_mtime_ns
+        if mtime == self._mtime:
+            return None
+
+        self._mtime = mtime
+        return self.reload()
+
+    def watch(self, max_reloads: Optional[int] = None) -> None:
+        """Poll the YAML file and print the main goal and changed goal beliefs after each save."""
+        root = self._gsn_tree.root
+        belief = self._nesic_tree.query_goal_beliefs([root])[root]
+        print(f"Watching {self._yaml_path} (belief in {root}: {belief:.6f})")
+
+        reloads = 0
+        while max_reloads is None or reloads < max_reloads:
+            time.sleep(self._poll_interval)
+            try:
+                report = self.poll()
+            except (ValueError, TypeError, KeyError, yaml.YAMLError) as err:
+                # keep the last valid model while the file is being edited
+                print(f"Ignoring invalid GSN tree: {err}")
+                continue
+
+            if report:
+                reloads += 1
+                kind = "structural" if report["rebuilt"] else "incremental"
+                print(f"{kind} update in {report['elapsed_ms']:.2f} ms")
+                for goal, belief in report["beliefs"].items():
+                    print(f"  {goal}: {belief:.6f}")
+
+
+def _yaml_belief(data: Dict) -> Optional[Union[float, Tuple[float, float]]]:
+    # consistent with the BN creation, a point belief of 0 in the YAML is treated as not provided
+    if data.get("belief_bounds", None) is not None:
+        return data["belief_bounds"]
+
+    return data.get("belief", None) or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Watch a gsn2x YAML file and print goal beliefs after each save."
+    )
+    parser.add_argument("yaml_path")
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    GsnFileWatcher(args.yaml_path, poll_interval=args.interval).watch()
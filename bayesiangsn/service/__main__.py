@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+
+from bayesiangsn.service.EvaluationService import EvaluationService
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    service = EvaluationService(args.host, args.port, args.workers)
+    await service.start()
+    for yaml_path in args.preload:
+        model = await service.handle_request("POST", "/models", {"path": yaml_path})
+        print(f"Loaded {yaml_path}: {model[1]}")
+    await service.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local HTTP/JSON service keeping GSN trees resident in memory."
+    )
+    parser.add_argument(
+        "preload", nargs="*", help="gsn2x YAML files to load at start-up"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.Enums import EGateModel
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+
+@pytest.fixture
+def nesic_tree():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree)
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 0.95})
+    nesic_tree.change_goal_aggregation(
+        "G2",
+        gate_model=EGateModel.LEAKY_OR,
+        prob_values=[0.9, 0.8, 0.7, 0.6],
+        leak=0.1,
+    )
+
+    return nesic_tree
+
+
+@pytest.mark.parametrize(
+    "evidence", [None, {"G1": "notSat"}, {"Sn2": "notSat", "G2": "sat"}]
+)
+def test_marginals_match_message_passing(nesic_tree, evidence):
+    circuit = nesic_tree.compile_circuit()
+    assert circuit.size > 0 and circuit.compile_time > 0.0
+
+    priors = np.random.default_rng(0).uniform(0.5, 1.0, (3, len(circuit.roots)))
+    results = circuit.differentiate(priors, evidence, chunk_size=2)
+    assert circuit.evaluate(priors, evidence) == pytest.approx(
+        results.probability_of_evidence
+    )
+
+    for case, prior in enumerate(priors):
+        network = nesic_tree._gate_network().copy()
+        network.update_priors(dict(zip(circuit.roots, prior)))
+        marginals = network.marginals(evidence)
+        assert results.probability_of_evidence[case] == pytest.approx(
+            network.probability_of_evidence(evidence) if evidence else 1.0
+        )
+        for i, label in enumerate(circuit.labels):
+            assert results.marginals[case, i] == pytest.approx(marginals[label])
+
+
+def test_belief_derivatives(nesic_tree):
+    circuit = nesic_tree.compile_circuit()
+    results = circuit.differentiate(evidence={"G1": "sat"})
+
+    # P(e) is linear in the belief of a root node: dP(e)/dP(r) = P(e | r=sat) - P(e | r=notSat)
+    sensitivities = nesic_tree._gate_network().root_sensitivities({"G1": "sat"})
+    for j, root in enumerate(circuit.roots):
+        expected = sensitivities[root][0] - sensitivities[root][1]
+        assert results.belief_derivatives[0, j] == pytest.approx(expected)
+
+
+def test_deterministic_gates_are_folded():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    circuit = NesicBayesianGsnTree("SharedContext", gsn_tree).compile_circuit()
+
+    # all gates are deterministic ANDs, hence no constants besides 0|1 are left
+    assert circuit.n_inputs == 2 * len(circuit.labels) + 2 * len(circuit.roots) + 2
+
+    with pytest.raises(ValueError):
+        circuit.differentiate(evidence={"G1": "sound"})
@@ -0,0 +1,83 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.CanonicalCPT import (
+    create_binary_logic_gate,
+    expand_gate_factors,
+    factorize_binary_logic_gate,
+    fold_gate_evidences,
+)
+from bayesiangsn.core.Enums import EGateModel
+
+GATE_PARAMS = [
+    {"gate_model": EGateModel.AND},
+    {"gate_model": "or"},
+    {
+        "gate_model": EGateModel.NOISY_AND,
+        "prob_values": [0.1, 0.2, 0.3],
+        "substitute_probs": [0.05, 0.0, 0.2],
+    },
+    {
+        "gate_model": EGateModel.LEAKY_AND,
+        "prob_values": [0.1, 0.2, 0.3],
+        "substitute_probs": [0.05, 0.0, 0.2],
+        "leak": 0.1,
+    },
+    {"gate_model": EGateModel.NOISY_OR, "prob_values": [0.9, 0.5, 0.3]},
+    {
+        "gate_model": EGateModel.LEAKY_OR,
+        "prob_values": [0.9, 0.5, 0.3],
+        "leak": 0.2,
+    },
+]
+
+
+@pytest.mark.parametrize("gate_params", GATE_PARAMS)
+def test_factorize_binary_logic_gate(gate_params):
+    evidences = ["A", "B", "C"]
+    cpt = create_binary_logic_gate(evidences=evidences, **gate_params)
+    factors = factorize_binary_logic_gate(evidences=evidences, **gate_params)
+
+    for column, states in enumerate(product([0, 1], repeat=len(evidences))):
+        p_target = factors.constant * np.prod(
+            factors.weights[np.arange(len(evidences)), states]
+        )
+        assert cpt[factors.target_state, column] == pytest.approx(p_target)
+
+
+@pytest.mark.parametrize("gate_params", GATE_PARAMS)
+def test_create_binary_logic_gate_log_space(gate_params):
+    evidences = ["A", "B", "C"]
+    cpt = create_binary_logic_gate(evidences=evidences, **gate_params)
+    log_cpt = create_binary_logic_gate(
+        evidences=evidences, dtype=np.float32, log_space=True, **gate_params
+    )
+
+    assert log_cpt.dtype == np.float32
+    assert log_cpt == pytest.approx(cpt, abs=1e-7)
+
+
+@pytest.mark.parametrize("gate_params", GATE_PARAMS)
+def test_fold_gate_evidences(gate_params):
+    evidences = ["A", "B", "C"]
+    cpt = create_binary_logic_gate(evidences=evidences, **gate_params)
+    factors = factorize_binary_logic_gate(evidences=evidences, **gate_params)
+    assert expand_gate_factors(factors) == pytest.approx(cpt)
+
+    # folding B into the gate equals the columns of the CPT with the state of B
+    states = np.array(list(product([0, 1], repeat=len(evidences))))
+    for state in [0, 1]:
+        folded = expand_gate_factors(fold_gate_evidences(factors, {1: state}))
+        assert folded == pytest.approx(cpt[:, states[:, 1] == state])
+
+
+def test_factorize_binary_logic_gate_invalid():
+    with pytest.raises(TypeError):
+        factorize_binary_logic_gate(evidences=["A"], gate_model="xor")
+
+    with pytest.raises(ValueError):
+        factorize_binary_logic_gate(
+            evidences=["A"], gate_model=EGateModel.NOISY_OR, prob_values=[1.5]
+        )
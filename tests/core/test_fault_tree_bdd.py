@@ -0,0 +1,84 @@
+import os
+from itertools import combinations
+
+import pytest
+
+from bayesiangsn.core.Enums import EGateModel
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+
+@pytest.fixture
+def nesic_tree():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree)
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 0.5, "implicit_S_G3": 0.5})
+    nesic_tree.change_goal_aggregation("G2", gate_model=EGateModel.OR)
+    nesic_tree.change_goal_aggregation("G3", gate_model=EGateModel.OR)
+
+    return nesic_tree
+
+
+def _fails(parents, gate_models, label, failed):
+    if not parents[label]:
+        return label in failed
+
+    failures = [_fails(parents, gate_models, x, failed) for x in parents[label]]
+    return all(failures) if gate_models.get(label) == EGateModel.OR else any(failures)
+
+
+@pytest.mark.parametrize("ordering", ["dfs", "bfs"])
+def test_minimal_cut_sets_match_brute_force(nesic_tree, ordering):
+    fault_tree = nesic_tree.compile_fault_tree(ordering=ordering)
+    assert fault_tree.top_probability == pytest.approx(
+        1.0 - nesic_tree.query_goal_belief()
+    )
+
+    parents = nesic_tree._snapshot.parents
+    gate_models = {"G2": EGateModel.OR, "G3": EGateModel.OR}
+    expected = []
+    for order in range(1, len(fault_tree.variables) + 1):
+        for events in combinations(fault_tree.variables, order):
+            if _fails(parents, gate_models, "G1", set(events)) and not any(
+                set(x) <= set(events) for x in expected
+            ):
+                expected.append(events)
+
+    cut_sets = fault_tree.minimal_cut_sets()
+    assert fault_tree.n_minimal_cut_sets() == len(cut_sets) == len(expected)
+    assert {frozenset(x) for _, x in cut_sets} == {frozenset(x) for x in expected}
+    assert [x for x, _ in cut_sets] == sorted([x for x, _ in cut_sets], reverse=True)
+    probs = {frozenset(x): p for p, x in cut_sets}
+    assert probs[frozenset(["C2", "Sn2", "Sn3", "implicit_S_G3"])] == pytest.approx(
+        0.3 * 0.2 * 0.05 * 0.5
+    )
+    assert all(len(x) == 1 for _, x in fault_tree.minimal_cut_sets(max_order=1))
+
+
+def test_fault_tree_of_subgoal(nesic_tree):
+    fault_tree = nesic_tree.compile_fault_tree(
+        "G2", ordering=["C2", "Sn1", "J1", "implicit_S_G2"]
+    )
+    assert fault_tree.variables == ["C2", "Sn1", "J1", "implicit_S_G2"]
+    assert fault_tree.size == 4
+    assert [x for _, x in fault_tree.minimal_cut_sets()] == [
+        ["C2", "Sn1", "J1", "implicit_S_G2"]
+    ]
+
+    with pytest.raises(ValueError):
+        nesic_tree.compile_fault_tree("G2", ordering=["C2", "Sn1"])
+    with pytest.raises(ValueError):
+        nesic_tree.compile_fault_tree(ordering="random")
+
+    nesic_tree.change_goal_aggregation(
+        "G2", gate_model=EGateModel.NOISY_OR, prob_values=[0.9, 0.8, 0.7, 0.6]
+    )
+    with pytest.raises(ValueError):
+        nesic_tree.compile_fault_tree()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from bayesiangsn.core.CanonicalCPT import factorize_binary_logic_gate
+from bayesiangsn.core.GateNetwork import GateNetwork
+
+
+def _deep_and_network(dtype, log_space, n_solutions=2000, belief=1.0 - 2**-30):
+    solutions = [f"Sn{i}" for i in range(n_solutions)]
+    parents = {label: [] for label in solutions + ["C1"]}
+    parents["G2"] = solutions[: n_solutions // 2] + ["C1"]
+    parents["G3"] = solutions[n_solutions // 2 :] + ["C1"]
+    parents["G1"] = ["G2", "G3"]
+
+    priors = {label: belief for label in solutions}
+    priors["C1"] = 1.0
+    gates = {
+        label: factorize_binary_logic_gate(parents[label], "and")
+        for label in ["G1", "G2", "G3"]
+    }
+    state_names = {label: ["sat", "notSat"] for label in parents}
+
+    return GateNetwork(
+        parents, state_names, priors, gates, dtype=dtype, log_space=log_space
+    )
+
+
+@pytest.mark.parametrize(
+    "dtype,log_space",
+    [(np.float64, False), (np.float64, True), (np.float32, True)],
+)
+def test_deep_and_chain_keeps_small_notsat_masses(dtype, log_space):
+    n_solutions, belief = 2000, 1.0 - 2**-30
+    network = _deep_and_network(dtype, log_space, n_solutions, belief)
+    expected = -np.expm1(n_solutions * np.log1p(-(2**-30)))
+
+    prior = network.prior_marginals()["G1"]
+    assert prior.dtype == dtype
+    assert prior[1] == pytest.approx(expected, rel=1e-5)
+
+    posterior = network.marginals({"G1": "notSat"})
+    assert posterior["Sn0"][1] == pytest.approx(2**-30 / expected, rel=1e-5)
+
+
+def test_deep_and_chain_float32_without_log_space_cancels():
+    network = _deep_and_network(np.float32, False)
+
+    assert network.prior_marginals()["G1"][1] == 0.0
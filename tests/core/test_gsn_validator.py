@@ -0,0 +1,82 @@
+import glob
+import os
+
+import pytest
+
+from bayesiangsn.core.Enums import EGsnConstraint
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+INVALID_GSN = """
+G1:
+ text: Goal 1
+ supportedBy: [S1, S2]
+ inContextOf: [C1]
+
+S1:
+ text: Strategy without justification
+ supportedBy: [G2, Sn1, Sn9]
+
+S2:
+ text: Strategy 2
+ supportedBy: [G3]
+ inContextOf: [J1, Sn1]
+
+G2:
+ text: Goal 2
+ supportedBy: [G3]
+
+G3:
+ text: Goal 3
+ supportedBy: [Sn1]
+
+Sn1:
+ text: Solution 1
+
+J1:
+ text: Justification 1
+
+C1:
+ text: Context 1
+
+C2:
+ text: Unreferenced context
+"""
+
+
+def test_validate_reports_all_violations(tmp_path):
+    yaml_path = tmp_path / "invalid.yaml"
+    yaml_path.write_text(INVALID_GSN)
+
+    violations = GsnTree.validate_yaml(str(yaml_path))
+
+    assert {(v.constraint, v.label) for v in violations} == {
+        (EGsnConstraint.WELLFORMEDNESS_II, "G1"),
+        (EGsnConstraint.WELLFORMEDNESS_III, "S1"),
+        (EGsnConstraint.SUPPORT_RELATION, "S1"),
+        (EGsnConstraint.DANGLING_REFERENCE, "S1"),
+        (EGsnConstraint.CONTEXT_RELATION, "S2"),
+        (EGsnConstraint.WELLFORMEDNESS_I, "G2"),
+        (EGsnConstraint.WELLFORMEDNESS_II, "G2"),
+        (EGsnConstraint.ROOT, None),
+    }
+    assert len(violations) == 8
+
+
+@pytest.mark.parametrize(
+    "yaml_path", sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.yaml")))
+)
+def test_validate_is_consistent_with_fail_fast_checks(yaml_path):
+    violations = GsnTree.validate_yaml(yaml_path)
+
+    try:
+        NesicBayesianGsnTree("validation", GsnTree("validation", yaml_path))
+    except ValueError as err:
+        first_line = str(err).split("\n")[0]
+        assert any(v.message.startswith(first_line) for v in violations)
+    else:
+        assert not violations
@@ -0,0 +1,515 @@
+import os
+import pickle
+import threading
+from itertools import product
+
+import numpy as np
+import pytest
+from pgmpy.inference import VariableElimination
+
+from bayesiangsn.core.CanonicalCPT import (
+    factorize_binary_logic_gate,
+    gate_parameter_grid,
+)
+from bayesiangsn.core.Enums import EGateModel, EGsnType
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.core.ResultCache import ResultCache
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+
+def _joint_distribution(bn):
+    """Brute-force joint distribution of all BN variables (state indices 0=sat|sound, 1=notSat|notSound)."""
+    variables = list(bn.nodes())
+    cpds = bn.get_cpds()
+    joint = {}
+    for states in product([0, 1], repeat=len(variables)):
+        assignment = dict(zip(variables, states))
+        prob = 1.0
+        for cpd in cpds:
+            prob *= cpd.values[tuple(assignment[v] for v in cpd.variables)]
+        joint[states] = prob
+
+    return variables, joint
+
+
+@pytest.fixture
+def nesic_tree():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree)
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 0.95})
+
+    return nesic_tree
+
+
+@pytest.mark.parametrize("noisy", [False, True])
+def test_query_failure_explanations(nesic_tree, noisy):
+    if noisy:
+        nesic_tree.change_goal_aggregation(
+            "G1",
+            gate_model=EGateModel.LEAKY_AND,
+            prob_values=[0.05, 0.0, 0.1, 0.2],
+            substitute_probs=[0.1, 0.0, 0.3, 0.2],
+            leak=0.01,
+        )
+
+    variables, joint = _joint_distribution(nesic_tree.bn)
+    state_names = {
+        cpd.variable: cpd.state_names[cpd.variable] for cpd in nesic_tree.bn.get_cpds()
+    }
+    failures = {
+        states: prob
+        for states, prob in joint.items()
+        if states[variables.index("G1")] == 1
+    }
+    prob_failure = sum(failures.values())
+    expected = sorted(failures.items(), key=lambda x: x[1], reverse=True)[:3]
+
+    explanations = nesic_tree.query_failure_explanations("G1", top_k=3)
+
+    assert len(explanations) == 3
+    for (prob, assignment), (states, joint_prob) in zip(explanations, expected):
+        assert prob == pytest.approx(joint_prob / prob_failure)
+    assert explanations[0][1] == {
+        var: state_names[var][state] for var, state in zip(variables, expected[0][0])
+    }
+
+
+def test_query_diagnostic_beliefs(nesic_tree):
+    variables, joint = _joint_distribution(nesic_tree.bn)
+    evidence = {"G1": "notSat", "G3": "sat"}
+    admissible = {
+        states: prob
+        for states, prob in joint.items()
+        if states[variables.index("G1")] == 1 and states[variables.index("G3")] == 0
+    }
+    prob_evidence = sum(admissible.values())
+
+    posteriors = nesic_tree.query_diagnostic_beliefs(evidence)
+
+    assert set(posteriors) == {
+        cpd.variable for cpd in nesic_tree.bn.get_cpds() if len(cpd.variables) == 1
+    }
+    for label, belief in posteriors.items():
+        expected = sum(
+            prob
+            for states, prob in admissible.items()
+            if states[variables.index(label)] == 0
+        )
+        assert belief == pytest.approx(expected / prob_evidence)
+
+
+def test_rank_evidence_importance(nesic_tree):
+    ranking = nesic_tree.rank_evidence_importance(
+        "G1", element_types=[EGsnType.SOLUTION, EGsnType.CONTEXT]
+    )
+
+    assert ranking["importance"].is_monotonic_decreasing
+    assert set(ranking["node"]) == {"Sn1", "Sn2", "Sn3", "C1", "C2"}
+
+    infer = VariableElimination(nesic_tree.bn)
+    for _, row in ranking.iterrows():
+        for state in ["sat", "notSat"]:
+            expected = infer.query(
+                ["G1"], evidence={row["node"]: state}, show_progress=False
+            )
+            assert row[f"goal_belief_if_{state}"] == pytest.approx(
+                expected.get_value(G1="sat")
+            )
+
+
+def test_sweep_goal_aggregations(nesic_tree):
+    grid = {
+        "G2": gate_parameter_grid(
+            [EGateModel.AND, EGateModel.LEAKY_OR],
+            prob_values=[[0.9, 0.8, 0.7, 0.6]],
+            leaks=[0.01, 0.1],
+        ),
+        "G3": gate_parameter_grid(
+            ["noisy_and"],
+            prob_values=[[0.9, 0.8, 0.7, 0.6], [0.99, 0.99, 0.99, 0.99]],
+            substitute_probs=[[0.1, 0.2, 0.3, 0.4]],
+        ),
+    }
+    sweep = nesic_tree.sweep_goal_aggregations(grid, "G1")
+
+    assert len(sweep) == 3 * 2
+    assert sweep["G2_gate_model"].tolist() == ["and"] * 2 + ["leaky_or"] * 4
+    assert sweep["G2_leak"].tolist()[2:] == [0.01, 0.01, 0.1, 0.1]
+    for _, row in sweep.iterrows():
+        for goal in ["G2", "G3"]:
+            nesic_tree.change_goal_aggregation(
+                goal,
+                gate_model=row[f"{goal}_gate_model"],
+                prob_values=row[f"{goal}_prob_values"],
+                substitute_probs=row[f"{goal}_substitute_probs"],
+                leak=row[f"{goal}_leak"],
+            )
+        expected = nesic_tree.query_belief_in_goal("G1").get_value(G1="sat")
+        assert row["belief"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("log_space", [False, True])
+def test_compile(log_space):
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree, log_space=log_space)
+    compiled = nesic_tree.compile()
+
+    beliefs = compiled.evaluate(outputs=["G1", "G2", "G3"])
+    assert beliefs[0] == pytest.approx(
+        list(nesic_tree.query_goal_beliefs(["G1", "G2", "G3"]).values())
+    )
+
+    priors = np.random.default_rng(0).uniform(0.5, 1.0, (3, len(compiled.roots)))
+    beliefs = compiled.evaluate(priors, outputs=["G1"], chunk_size=2)
+    for case, expected in zip(priors, beliefs[:, 0]):
+        network = nesic_tree._gate_network().copy()
+        network.update_priors(dict(zip(compiled.roots, case)))
+        assert network.prior_marginals()["G1"][0] == pytest.approx(expected)
+
+    aggregation = {
+        "gate_model": EGateModel.LEAKY_OR,
+        "prob_values": [0.9, 0.8, 0.7, 0.6],
+        "leak": 0.1,
+    }
+    compiled.update_gate(
+        "G2",
+        factorize_binary_logic_gate(nesic_tree.bn.get_parents("G2"), **aggregation),
+    )
+    nesic_tree.change_goal_aggregation("G2", **aggregation)
+    assert compiled.evaluate(outputs=["G1"])[0, 0] == pytest.approx(
+        nesic_tree.query_goal_beliefs(["G1"])["G1"]
+    )
+
+
+def test_subtree_cache():
+    yaml_path = os.path.join(TEST_DATA_DIR, "example_nesic_reused_subarguments.yaml")
+    cache = ResultCache()
+    first = NesicBayesianGsnTree(
+        "first", GsnTree("first", yaml_path), subtree_cache=cache
+    )
+    hashes = first._subtree_hashes()
+    assert hashes["G2"] == hashes["G3"]
+    assert hashes["Sn1"] == hashes["Sn2"]
+
+    expected = first.query_goal_beliefs(["G1"])["G1"]
+    assert expected == pytest.approx(0.9**2 * 0.8**2)
+    assert (cache.hits, len(cache)) == (0, 3)
+
+    # a second case with a changed sub-argument reuses the unchanged one and the strategy
+    second = NesicBayesianGsnTree(
+        "second", GsnTree("second", yaml_path), subtree_cache=cache
+    )
+    second.update_beliefs({"Sn1": 0.5})
+    assert second.query_goal_beliefs(["G1"])["G1"] == pytest.approx(0.5 * 0.9 * 0.8**2)
+    assert cache.hits == 2
+
+    second.update_beliefs({"Sn1": 0.9})
+    assert second.query_goal_beliefs(["G1"])["G1"] == pytest.approx(expected)
+    assert cache.hits == 3
+
+    # results of other numeric backends are not reused
+    third = NesicBayesianGsnTree(
+        "third", GsnTree("third", yaml_path), dtype=np.float32, subtree_cache=cache
+    )
+    assert third._subtree_hashes()["G2"] != hashes["G2"]
+    third.query_goal_beliefs(["G1"])
+    assert cache.hits == 3
+
+
+def test_subtree_cache_with_asymmetric_gate():
+    yaml_path = os.path.join(TEST_DATA_DIR, "example_nesic_reused_subarguments.yaml")
+    cache = ResultCache()
+    models = []
+    for name, solution in [("a", "Sn2"), ("b", "Sn1")]:
+        model = NesicBayesianGsnTree(
+            name, GsnTree(name, yaml_path), subtree_cache=cache
+        )
+        model.change_goal_aggregation(
+            "G1",
+            gate_model=EGateModel.NOISY_AND,
+            prob_values=[0.0, 0.0, 0.0, 0.0],
+            substitute_probs=[0.0, 0.0, 0.9, 0.1],
+        )
+        model.update_beliefs({solution: 0.5})
+        models.append(model)
+
+    # the cases only differ by swapped sub-goals, which are weighted differently by the gate of G1
+    assert models[0]._subtree_hashes()["G1"] != models[1]._subtree_hashes()["G1"]
+    for model in models:
+        assert model.query_goal_beliefs(["G1"])["G1"] == pytest.approx(
+            model.query_belief_in_goal("G1").values[0]
+        )
+
+
+def test_query_beliefs_of_shared_goals():
+    yaml_path = os.path.join(TEST_DATA_DIR, "example_nesic_shared_goal.yaml")
+    nesic_tree = NesicBayesianGsnTree("SharedGoal", GsnTree("SharedGoal", yaml_path))
+    assert not nesic_tree.is_tree_structured
+
+    evidence = {"Sn2": "notSat"}
+    for goal in ["G1", "G2", "G3"]:
+        expected = nesic_tree.query_belief_in_goal(goal, evidence).values[0]
+        assert nesic_tree.query_goal_belief(goal, evidence) == pytest.approx(expected)
+
+    beliefs = nesic_tree.query_goal_beliefs(["G1", "G4"])
+    assert beliefs["G1"] == pytest.approx(nesic_tree.query_belief_in_goal().values[0])
+    assert nesic_tree.query_beliefs(["G4"], [None, evidence]).beliefs[0, 0] == (
+        pytest.approx(beliefs["G4"])
+    )
+
+
+def test_query_beliefs(nesic_tree):
+    cases = [None, {"Sn2": "notSat"}, {"C2": "notSat", "Sn1": "sat"}]
+    results = nesic_tree.query_beliefs(["G1", "G2"], cases)
+    assert results.goals == ("G1", "G2")
+    assert results.beliefs.shape == (3, 2)
+
+    inference = VariableElimination(nesic_tree.bn)
+    for i, evidence in enumerate(cases):
+        for goal in results.goals:
+            expected = inference.query([goal], evidence=evidence, show_progress=False)
+            assert results.belief(goal, i) == pytest.approx(
+                expected.get_value(**{goal: "sat"})
+            )
+
+    belief = nesic_tree.query_goal_belief(evidence={"Sn2": "notSat"})
+    assert type(belief) is float
+    assert belief == pytest.approx(results.belief("G1", 1))
+
+    restored = pickle.loads(pickle.dumps(results))
+    assert restored.to_dict(2) == results.to_dict(2)
+
+
+def test_query_beliefs_with_impossible_root_evidence(nesic_tree):
+    # evidence contradicting a belief of 1.0 of a root node replaces its belief (as in pgmpy)
+    cases = [
+        {"J1": "notSat"},
+        {"implicit_S_G3": "notSound", "Sn1": "sat"},
+        {"C1": "notSat", "Sn3": "notSat"},
+    ]
+    results = nesic_tree.query_beliefs(["G1", "G2", "G3"], cases)
+
+    for i, evidence in enumerate(cases):
+        for goal in results.goals:
+            expected = nesic_tree.query_belief_in_goal(goal, evidence).values[0]
+            assert results.belief(goal, i) == pytest.approx(expected)
+    assert results.belief("G2", 0) == 0.0
+
+    with pytest.raises(ValueError):
+        nesic_tree.query_goal_belief("G1", {"J1": "notSat", "G2": "sat"})
+
+
+def test_lazy_bn_export(nesic_tree):
+    # native queries do not need the pgmpy representation
+    nesic_tree.query_goal_beliefs()
+    assert nesic_tree._snapshot.cached_bn is None
+
+    bn = nesic_tree.bn
+    assert bn.check_model()
+    assert nesic_tree.bn is bn
+
+    # an exported BN is carried over incrementally to later snapshots
+    nesic_tree.update_beliefs({"Sn2": 0.6})
+    nesic_tree.change_goal_aggregation("G3", gate_model=EGateModel.OR)
+    assert nesic_tree._snapshot.cached_bn is not None
+    assert nesic_tree.bn.check_model()
+    assert nesic_tree.bn.get_cpds("Sn2").values[0] == pytest.approx(0.6)
+
+    expected = VariableElimination(nesic_tree.bn).query(["G1"], show_progress=False)
+    assert nesic_tree.query_goal_belief("G1") == pytest.approx(
+        expected.get_value(G1="sat")
+    )
+
+
+def test_cpds_are_created_on_demand(nesic_tree):
+    assert not nesic_tree._snapshot.cached_cpds
+
+    nesic_tree.query_belief_in_goal("G3")
+    cpds = dict(nesic_tree._snapshot.cached_cpds)
+    assert {label for label, _ in cpds} <= set(nesic_tree.plan_query("G3").nodes)
+
+    # CPDs that do not depend on a changed node are reused by later snapshots
+    nesic_tree.update_beliefs({"Sn1": 0.5})
+    nesic_tree.change_goal_aggregation("G2", gate_model=EGateModel.OR)
+    assert nesic_tree._snapshot.cached_cpds == cpds
+
+    nesic_tree.update_beliefs({"Sn2": 0.5})
+    assert ("Sn2", frozenset()) not in nesic_tree._snapshot.cached_cpds
+    assert nesic_tree.query_belief_in_goal("G3").get_value(G3="sat") == pytest.approx(
+        nesic_tree.query_goal_belief("G3")
+    )
+
+
+def test_query_cache(nesic_tree):
+    cache = nesic_tree.query_cache
+
+    def belief(goal, evidence=None):
+        return nesic_tree.query_belief_in_goal(goal, evidence).get_value(
+            **{goal: "sat"}
+        )
+
+    g2 = belief("G2")
+    g3 = belief("G3")
+    g2_given_sn2 = belief("G2", {"Sn2": "notSat"})
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert belief("G2") == g2
+    assert cache.hits == 1
+
+    # G3 does not depend on the implicit rule of G2
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 0.5})
+    assert belief("G3") == g3
+    assert cache.hits == 2
+    g2_given_sn2 = belief("G2", {"Sn2": "notSat"})
+    assert g2_given_sn2 == pytest.approx(g2 / 0.95 * 0.5)
+    assert cache.misses == 4
+
+    # G2 does not depend on the aggregation of G3
+    nesic_tree.change_goal_aggregation(
+        "G3", EGateModel.NOISY_AND, prob_values=[0.1] * 4, substitute_probs=[0.5] * 4
+    )
+    assert belief("G2", {"Sn2": "notSat"}) == g2_given_sn2
+    assert cache.hits == 3
+    assert belief("G3") != g3
+    assert cache.misses == 5
+    assert cache.hit_rate == pytest.approx(3 / 8)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_concurrent_queries_see_consistent_snapshots(cached):
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    # with a subtree cache, beliefs must be stored under the hashes of the snapshot they belong to
+    nesic_tree = NesicBayesianGsnTree(
+        "SharedContext", gsn_tree, subtree_cache=ResultCache() if cached else None
+    )
+    configurations = [{"Sn1": 0.9, "Sn2": 0.8}, {"Sn1": 0.5, "Sn2": 0.4}]
+    expected = []
+    for beliefs in configurations:
+        nesic_tree.update_beliefs(beliefs)
+        expected.append(nesic_tree.query_goal_beliefs(["G1"])["G1"])
+
+    errors, observed = [], []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                observed.append(nesic_tree.query_goal_beliefs(["G1"])["G1"])
+                factor = nesic_tree.query_belief_in_goal("G1")
+                observed.append(factor.get_value(G1="sat"))
+        except Exception as err:
+            errors.append(err)
+
+    def writer():
+        try:
+            for i in range(100):
+                nesic_tree.update_beliefs(configurations[i % 2])
+        except Exception as err:
+            errors.append(err)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    writer_thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    assert observed
+    assert all(any(belief == pytest.approx(x) for x in expected) for belief in observed)
+    assert nesic_tree.version > 100
+
+
+def test_interval_beliefs(tmp_path):
+    with open(
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml")
+    ) as file:
+        content = file.read()
+    yaml_path = str(tmp_path / "intervals.yaml")
+    with open(yaml_path, "w") as file:
+        file.write(
+            content.replace("belief: 0.9\n", "belief: [0.85, 0.95]\n").replace(
+                "belief: 0.7", "belief: [0.6, 0.8]"
+            )
+        )
+
+    gsn_tree = GsnTree("Intervals", yaml_path)
+    assert gsn_tree.tree_elements["Sn1"].data["belief_bounds"] == (0.85, 0.95)
+    assert gsn_tree.tree_elements["Sn1"].data["belief"] == pytest.approx(0.9)
+    point_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    assert gsn_tree.diff(point_tree)["belief"] == ["C2", "Sn1"]
+
+    nesic_tree = NesicBayesianGsnTree("Intervals", gsn_tree)
+    nesic_tree.update_beliefs({"Sn2": (0.7, 0.9)})
+    bounds = nesic_tree.query_belief_bounds()
+    assert set(bounds) == {"G1", "G2", "G3"}
+
+    # P(goal) is multilinear in the root beliefs, i.e. its extremes are at the vertices of the intervals
+    compiled = nesic_tree.compile()
+    intervals = {"Sn1": (0.85, 0.95), "Sn2": (0.7, 0.9), "C2": (0.6, 0.8)}
+    beliefs = []
+    for vertex in product(*intervals.values()):
+        priors = compiled.priors.copy()
+        for label, belief in zip(intervals, vertex):
+            priors[compiled.roots.index(label)] = belief
+        beliefs.append(compiled.evaluate(priors, ["G1", "G2", "G3"])[0])
+    for i, goal in enumerate(["G1", "G2", "G3"]):
+        assert bounds[goal][0] == pytest.approx(min(x[i] for x in beliefs))
+        assert bounds[goal][1] == pytest.approx(max(x[i] for x in beliefs))
+        assert bounds[goal][0] <= nesic_tree.query_goal_belief(goal) <= bounds[goal][1]
+
+    # bounds are part of the model snapshot, i.e. consistent with the beliefs of the same version
+    version = nesic_tree.version
+    nesic_tree.gsn_tree.tree_elements["Sn2"].data["belief_bounds"] = (0.0, 1.0)
+    assert nesic_tree.query_belief_bounds() == bounds and nesic_tree.version == version
+
+    nesic_tree.update_beliefs({"Sn1": 0.9, "Sn2": 0.8, "C2": 0.7})
+    assert all(
+        lower == upper for lower, upper in nesic_tree.query_belief_bounds().values()
+    )
+    assert bounds["G1"][0] < nesic_tree.query_belief_bounds(["G1"])["G1"][0]
+    assert nesic_tree.query_belief_bounds(["G1"])["G1"] == pytest.approx(
+        (nesic_tree.query_goal_belief("G1"),) * 2
+    )
+
+    with pytest.raises(ValueError):
+        nesic_tree.update_beliefs({"Sn1": (0.9, 0.8)})
+    with open(yaml_path, "w") as file:
+        file.write(content.replace("belief: 0.7", "belief: [0.8, 0.6]"))
+    with pytest.raises(ValueError):
+        GsnTree("Intervals", yaml_path)
+
+
+def test_zero_belief_interval(tmp_path):
+    with open(
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml")
+    ) as file:
+        content = file.read()
+    yaml_path = str(tmp_path / "zero_interval.yaml")
+    with open(yaml_path, "w") as file:
+        file.write(content.replace("belief: 0.9\n", "belief: [0.0, 0.0]\n"))
+
+    # in contrast to a point belief of 0, the interval [0, 0] is an explicit belief
+    nesic_tree = NesicBayesianGsnTree(
+        "ZeroInterval", GsnTree("ZeroInterval", yaml_path)
+    )
+    assert nesic_tree.query_goal_belief("G2") == 0.0
+    assert nesic_tree.query_belief_bounds(["G2"]) == {"G2": (0.0, 0.0)}
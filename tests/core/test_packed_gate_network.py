@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.Enums import EGateModel
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+TEST_FILES = {
+    "shared": "example_nesic_shared_context_with_probs.yaml",
+    "complete": "example_nesic_complete_wellformed_gsn.yaml",
+    "reused": "example_nesic_reused_subarguments.yaml",
+}
+
+
+def _model(name, file_name, **kwargs):
+    gsn_tree = GsnTree(name, os.path.join(TEST_DATA_DIR, file_name))
+    return NesicBayesianGsnTree(name, gsn_tree, **kwargs)
+
+
+@pytest.fixture
+def models():
+    models = [_model(name, file_name) for name, file_name in TEST_FILES.items()]
+    models[0].change_goal_aggregation(
+        "G3",
+        gate_model=EGateModel.LEAKY_AND,
+        prob_values=[0.05, 0.1, 0.0, 0.2],
+        substitute_probs=[0.1, 0.2, 0.0, 0.3],
+        leak=0.01,
+    )
+    models[1].change_goal_aggregation("G1", gate_model=EGateModel.OR)
+
+    return models
+
+
+def test_packed_matches_compiled(models):
+    packed = NesicBayesianGsnTree.pack(models)
+    assert packed.names == list(TEST_FILES)
+    assert packed.n_copies == sum(2 ** len(m.gate_network.cutset) for m in models)
+
+    rng = np.random.default_rng(0)
+    priors = rng.uniform(size=(50, len(packed.roots)))
+    beliefs = packed.evaluate(priors)
+    assert beliefs.shape == (50, len(packed.labels))
+
+    for model in models:
+        compiled = model.compile()
+        columns = [packed.roots.index((model.name, x)) for x in compiled.roots]
+        outputs = [(model.name, x) for x in compiled.labels]
+        expected = compiled.evaluate(priors[:, columns])
+        assert np.allclose(packed.evaluate(priors, outputs, chunk_size=7), expected)
+        assert np.allclose(
+            beliefs[:, [packed.labels.index(x) for x in outputs]], expected
+        )
+
+        goal = (model.name, model.gsn_tree.root)
+        assert packed.evaluate(outputs=[goal])[0, 0] == pytest.approx(
+            model.query_goal_belief()
+        )
+
+
+def test_pack_errors(models):
+    with pytest.raises(ValueError):
+        NesicBayesianGsnTree.pack([models[0], models[0]])
+    with pytest.raises(ValueError):
+        NesicBayesianGsnTree.pack([])
+    with pytest.raises(ValueError):
+        NesicBayesianGsnTree.pack(
+            [models[1], _model("float32", TEST_FILES["shared"], dtype=np.float32)]
+        )
+
+    packed = NesicBayesianGsnTree.pack(models)
+    with pytest.raises(ValueError):
+        packed.evaluate(outputs=[("shared", "G42")])
+    with pytest.raises(ValueError):
+        packed.evaluate(packed.priors[:-1])
+
+
+def test_pack_requires_tree_structure(models):
+    yaml_path = os.path.join(TEST_DATA_DIR, "example_nesic_shared_goal.yaml")
+    shared_goal = NesicBayesianGsnTree("dag", GsnTree("dag", yaml_path))
+    with pytest.raises(ValueError):
+        NesicBayesianGsnTree.pack(models + [shared_goal])
@@ -0,0 +1,72 @@
+import os
+from itertools import product
+
+import pytest
+from pgmpy.inference import VariableElimination
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.core.QueryPlanner import plan_query
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+
+def test_plan_query_prunes_barren_and_d_separated_nodes():
+    # A -> C <- B, C -> D, E -> F
+    parents = {"A": [], "B": [], "C": ["A", "B"], "D": ["C"], "E": [], "F": ["E"]}
+
+    plan = plan_query(parents, "A")
+    assert plan.nodes == ["A"]
+    assert plan.pruned == 5
+
+    # observing the common child makes the parents dependent (explaining away)
+    plan = plan_query(parents, "A", {"C": "sat", "F": "sat"})
+    assert set(plan.nodes) == {"A", "B", "C"}
+    assert plan.evidence == {"C": "sat"}
+    assert plan.pruned == 3
+
+    # an observed parent blocks the path to its ancestors
+    plan = plan_query(parents, "D", {"C": "sat"})
+    assert plan.nodes == ["D"]
+    assert plan.evidence_roots == ["C"]
+    assert plan.pruned == 4
+
+    with pytest.raises(ValueError):
+        plan_query(parents, "X")
+
+
+def test_pruned_queries_match_full_inference():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree, query_cache_size=0)
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 0.95})
+
+    assert nesic_tree.plan_query("G3").pruned == len(nesic_tree.bn.nodes()) - 5
+
+    # contexts and justifications without a belief (1.0) are folded into the CPTs of their children
+    plan = nesic_tree.plan_query("G1")
+    cpd = nesic_tree._snapshot.pruned_bn(plan).get_cpds("G1")
+    assert "C1" in plan.nodes and "C1" not in cpd.variables
+
+    inference = VariableElimination(nesic_tree.bn)
+    for goal, observed, state in product(
+        ["G1", "G2", "G3"],
+        ["G2", "S1", "Sn1", "Sn2", "C1", "C2", "J1"],
+        ["sat", "notSat"],
+    ):
+        if observed == goal:
+            continue
+        state = (
+            {"sat": "sound", "notSat": "notSound"}[state] if observed == "S1" else state
+        )
+        evidence = {observed: state}
+
+        expected = inference.query([goal], evidence=evidence, show_progress=False)
+        result = nesic_tree.query_belief_in_goal(goal, evidence)
+        assert result.get_value(**{goal: "sat"}) == pytest.approx(
+            expected.get_value(**{goal: "sat"})
+        )
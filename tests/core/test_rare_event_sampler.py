@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.Enums import EGateModel
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.core.RareEventSampler import RareEventSampler
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), os.pardir, "test_data"
+)
+
+
+@pytest.fixture
+def nesic_tree():
+    gsn_tree = GsnTree(
+        "SharedContext",
+        os.path.join(TEST_DATA_DIR, "example_nesic_shared_context_with_probs.yaml"),
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedContext", gsn_tree)
+    nesic_tree.update_beliefs({x: 1 - 1e-3 for x in ["Sn1", "Sn2", "Sn3", "C2", "J1"]})
+    nesic_tree.set_implict_beliefs({"implicit_S_G2": 1 - 1e-3, "implicit_S_G3": 1})
+    nesic_tree.change_goal_aggregation("G2", gate_model=EGateModel.OR)
+
+    return nesic_tree
+
+
+def test_rare_failure_of_or_gate(nesic_tree):
+    exact = nesic_tree.query_belief_in_goal("G2").values[1]
+    assert exact == pytest.approx(1e-12)
+
+    estimate = nesic_tree.estimate_goal_failure("G2", seed=0)
+    assert estimate.goal == "G2" and estimate.n_samples == 10000
+    assert estimate.relative_error < 0.01
+    assert estimate.probability == pytest.approx(exact, rel=4 * estimate.relative_error)
+    assert estimate.proposal["Sn1"] > 0.5
+
+
+def test_rare_failure_with_noisy_gate(nesic_tree):
+    nesic_tree.change_goal_aggregation(
+        "G3",
+        gate_model=EGateModel.LEAKY_AND,
+        prob_values=[0.05, 0.1, 0.0, 0.2],
+        substitute_probs=[0.1, 0.2, 0.0, 0.3],
+        leak=1e-6,
+    )
+    exact = 1.0 - nesic_tree.query_goal_belief()
+
+    estimate = nesic_tree.estimate_goal_failure(seed=0)
+    assert estimate.probability == pytest.approx(exact, rel=4 * estimate.relative_error)
+
+
+def test_rare_failure_of_shared_goal():
+    gsn_tree = GsnTree(
+        "SharedGoal", os.path.join(TEST_DATA_DIR, "example_nesic_shared_goal.yaml")
+    )
+    nesic_tree = NesicBayesianGsnTree("SharedGoal", gsn_tree)
+    nesic_tree.update_beliefs(
+        {x: 1 - 1e-4 for x in ["Sn1", "Sn2", "Sn3", "Sn4", "C1", "C2", "J1", "J2"]}
+    )
+    nesic_tree.change_goal_aggregation("G1", gate_model=EGateModel.OR)
+    assert not nesic_tree.is_tree_structured
+
+    # G1 only fails if G2 and G4 fail, which are correlated by the shared G3
+    exact = nesic_tree.query_belief_in_goal().values[1]
+    assert exact < 1e-10
+
+    estimate = nesic_tree.estimate_goal_failure(seed=0)
+    assert estimate.probability == pytest.approx(exact, rel=4 * estimate.relative_error)
+    assert estimate.relative_error < 0.05
+
+
+def test_sampler_without_cross_entropy(nesic_tree):
+    sampler = RareEventSampler(nesic_tree._gate_network(), "G2")
+    assert sampler.roots == ["Sn1", "J1", "C2", "implicit_S_G2"]
+    assert np.allclose(sampler.failure_probs, [1e-3, 1e-3, 1e-3, 1e-3])
+
+    nominal = sampler.estimate(1000, ce_iterations=0, proposal=sampler.failure_probs)
+    assert nominal.probability == 0.0 and nominal.relative_error == np.inf
+
+    # roots that cannot fail are never biased
+    nesic_tree.update_beliefs({"J1": None})
+    sampler = RareEventSampler(nesic_tree._gate_network(), "G2")
+    assert sampler.estimate(100, ce_iterations=2).proposal["J1"] == 0.0
+
+    with pytest.raises(ValueError):
+        RareEventSampler(nesic_tree._gate_network(), "Sn1")
+    with pytest.raises(ValueError):
+        sampler.estimate(1)
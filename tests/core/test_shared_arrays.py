@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.CompiledGateNetwork import CompiledGateNetwork
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.core.SharedArrays import (
+    attach_arrays,
+    publish_arrays,
+    unlink_arrays,
+)
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    "test_data",
+    "example_nesic_shared_context_with_probs.yaml",
+)
+
+
+def _evaluate_attached(handle, priors):
+    return CompiledGateNetwork.attach(handle).evaluate(priors, outputs=["G1", "G2"])
+
+
+@pytest.fixture
+def compiled():
+    gsn_tree = GsnTree("SharedContext", TEST_FILE)
+    return NesicBayesianGsnTree("SharedContext", gsn_tree, log_space=True).compile()
+
+
+def test_publish_and_attach_arrays(tmp_path):
+    arrays = {"a": np.arange(5, dtype=np.int32), "b": np.eye(3), "c": np.array([])}
+    handle = publish_arrays(arrays, {"x": 1}, str(tmp_path / "arrays"))
+
+    attached = attach_arrays(handle)
+    assert handle.metadata == {"x": 1}
+    for name, array in arrays.items():
+        assert np.array_equal(attached[name], array)
+        assert attached[name].dtype == array.dtype
+        assert not attached[name].flags.writeable
+
+    unlink_arrays(handle)
+    assert not os.path.exists(handle.path) and attached["b"][1, 1] == 1.0
+
+    with pytest.raises(TypeError):
+        publish_arrays({"a": np.array([None])}, path=str(tmp_path / "objects"))
+
+
+def test_attached_network_in_workers(compiled):
+    handle = compiled.share()
+    try:
+        attached = CompiledGateNetwork.attach(handle)
+        assert attached.labels == compiled.labels and attached.roots == compiled.roots
+        assert np.allclose(attached.evaluate(), compiled.evaluate())
+        with pytest.raises(ValueError):
+            attached.update_gate("G1", None)
+
+        priors = np.random.default_rng(0).uniform(size=(4, 20, len(compiled.roots)))
+        with ProcessPoolExecutor(2) as pool:
+            results = list(pool.map(_evaluate_attached, [handle] * 4, priors))
+        for batch, result in zip(priors, results):
+            assert np.allclose(result, compiled.evaluate(batch, outputs=["G1", "G2"]))
+    finally:
+        unlink_arrays(handle)
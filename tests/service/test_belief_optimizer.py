@@ -0,0 +1,78 @@
+import os
+from itertools import product
+
+import numpy as np
+import pytest
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+from bayesiangsn.service.BeliefOptimizer import BeliefOptimizer
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    "test_data",
+    "example_nesic_shared_context_with_probs.yaml",
+)
+
+LABELS = ["Sn1", "Sn2", "Sn3", "C2", "J2"]
+
+
+@pytest.fixture
+def nesic_tree():
+    return NesicBayesianGsnTree("SharedContext", GsnTree("SharedContext", TEST_FILE))
+
+
+def _cheapest_cost(optimizer, target, improvements):
+    cheapest = np.inf
+    for choices in product(*[[None] + improvements[x] for x in LABELS]):
+        beliefs = {x: c[0] for x, c in zip(LABELS, choices) if c}
+        cost = sum(c[1] for c in choices if c)
+        if cost < cheapest and optimizer.goal_belief(beliefs) >= target:
+            cheapest = cost
+
+    return cheapest
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_optimize_matches_brute_force(nesic_tree, seed):
+    rng = np.random.default_rng(seed)
+    improvements = {
+        x: [(0.99, rng.uniform(1, 10)), (0.999, rng.uniform(10, 30))] for x in LABELS
+    }
+    target = rng.uniform(0.6, 0.95)
+
+    optimizer = BeliefOptimizer(nesic_tree)
+    plan = optimizer.optimize(target, improvements)
+    assert plan.reached and plan.goal == "G1"
+    assert plan.cost == pytest.approx(_cheapest_cost(optimizer, target, improvements))
+    assert plan.cost == pytest.approx(sum(x.cost for x in plan.steps))
+
+    beliefs = [x.goal_belief for x in plan.steps]
+    assert beliefs == sorted(beliefs) and beliefs[-1] == pytest.approx(plan.goal_belief)
+
+    nesic_tree.update_beliefs({x.label: x.belief for x in plan.steps})
+    assert nesic_tree.query_goal_belief() == pytest.approx(plan.goal_belief)
+    assert plan.goal_belief >= target
+
+
+def test_optimize_edge_cases(nesic_tree):
+    optimizer = BeliefOptimizer(nesic_tree, "G2")
+    belief = optimizer.goal_belief()
+
+    plan = optimizer.optimize(belief, {"Sn1": (0.99, 1.0)})
+    assert plan.reached and plan.cost == 0.0 and not plan.steps
+
+    # G2 does not depend on Sn2, hence the target cannot be reached
+    plan = optimizer.optimize(0.99, {"Sn1": (0.95, 1.0), "Sn2": (1.0, 1.0)})
+    assert not plan.reached
+    assert [(x.label, x.belief) for x in plan.steps] == [("Sn1", 0.95)]
+
+    with pytest.raises(ValueError):
+        optimizer.optimize(1.5, {"Sn1": (0.99, 1.0)})
+    with pytest.raises(ValueError):
+        optimizer.optimize(0.9, {"G3": (0.99, 1.0)})
+    with pytest.raises(ValueError):
+        optimizer.optimize(0.9, {"Sn1": (0.99, -1.0)})
+    with pytest.raises(ValueError):
+        BeliefOptimizer(nesic_tree, "G4")
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+from bayesiangsn.service.BulkEvaluator import BulkEvaluator
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    "test_data",
+    "example_nesic_shared_context_with_probs.yaml",
+)
+
+RECORDS = [
+    {"run": "a", "Sn1": 0.9, "Sn2": 0.8, "C2": "sat"},
+    {"run": "b", "Sn1": 0.5, "Sn2": None, "C2": "notSat"},
+    {"run": "c", "Sn1": None, "Sn2": 0.1, "C2": 0.7},
+]
+
+
+def _expected_beliefs(record):
+    nesic_tree = NesicBayesianGsnTree("expected", GsnTree("expected", TEST_FILE))
+    states = {"sat": 1.0, "notSat": 0.0}
+    nesic_tree.update_beliefs(
+        {
+            label: states.get(value, value)
+            for label, value in record.items()
+            if label != "run" and value is not None
+        }
+    )
+    return nesic_tree.query_goal_beliefs(["G1", "G2"])
+
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl"])
+def test_bulk_evaluator(tmp_path, extension):
+    input_path = str(tmp_path / f"records{extension}")
+    output_path = str(tmp_path / f"results{extension}")
+    if extension == ".csv":
+        pd.DataFrame(RECORDS).to_csv(input_path, index=False)
+    else:
+        with open(input_path, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in RECORDS)
+
+    nesic_tree = NesicBayesianGsnTree("bulk", GsnTree("bulk", TEST_FILE))
+    evaluator = BulkEvaluator(nesic_tree, goals=["G1", "G2"], chunk_size=2)
+
+    assert evaluator.evaluate_file(input_path, output_path) == len(RECORDS)
+
+    if extension == ".csv":
+        results = pd.read_csv(output_path)
+    else:
+        with open(output_path) as file:
+            results = pd.DataFrame([json.loads(line) for line in file])
+    assert results.columns.tolist() == ["run", "G1", "G2"]
+    for record, (_, row) in zip(RECORDS, results.iterrows()):
+        assert row["run"] == record["run"]
+        for goal, belief in _expected_beliefs(record).items():
+            assert row[goal] == pytest.approx(belief)
+
+
+def test_bulk_evaluator_invalid_values():
+    nesic_tree = NesicBayesianGsnTree("bulk", GsnTree("bulk", TEST_FILE))
+
+    with pytest.raises(ValueError):
+        BulkEvaluator(nesic_tree, columns={"pass_rate": "G2"})
+
+    evaluator = BulkEvaluator(nesic_tree, columns={"pass_rate": "Sn1"})
+    with pytest.raises(ValueError):
+        evaluator.evaluate_chunk(pd.DataFrame({"pass_rate": [0.5, "passed"]}))
+
+    shared_goal = os.path.join(
+        os.path.dirname(TEST_FILE), "example_nesic_shared_goal.yaml"
+    )
+    with pytest.raises(ValueError):
+        BulkEvaluator(NesicBayesianGsnTree("dag", GsnTree("dag", shared_goal)))
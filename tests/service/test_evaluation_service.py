@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+from http import HTTPStatus
+
+import pytest
+
+from bayesiangsn.service.EvaluationService import EvaluationService
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    "test_data",
+    "example_nesic_shared_context_with_probs.yaml",
+)
+
+
+async def _post(port, path, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+def test_evaluation_service():
+    async def scenario():
+        service = EvaluationService(port=0)
+        await service.start()
+        try:
+            status, loaded = await _post(service.port, "/models", {"path": TEST_FILE})
+            assert status == HTTPStatus.OK
+            status, reloaded = await _post(service.port, "/models", {"path": TEST_FILE})
+            assert reloaded == loaded and len(service.models) == 1
+
+            model_id = loaded["model"]
+            results = await asyncio.gather(
+                _post(service.port, "/belief", {"model": model_id, "goal": "G1"}),
+                _post(
+                    service.port,
+                    "/what-if",
+                    {"model": model_id, "goal": "G1", "evidence": {"Sn2": "notSat"}},
+                ),
+            )
+            (_, belief), (_, what_if) = results
+            assert belief["belief"] == pytest.approx(what_if["baseline"])
+            assert what_if["belief"] == pytest.approx(0.0)
+
+            status, _ = await _post(
+                service.port,
+                "/aggregation",
+                {"model": model_id, "goal": "G3", "gate_model": "or"},
+            )
+            assert status == HTTPStatus.OK
+            _, changed = await _post(
+                service.port, "/belief", {"model": model_id, "goal": "G1"}
+            )
+            assert changed["belief"] > belief["belief"]
+
+            status, error = await _post(service.port, "/belief", {"model": "unknown"})
+            assert status == HTTPStatus.BAD_REQUEST and "error" in error
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_evaluation_service_with_shared_goals():
+    yaml_path = os.path.join(
+        os.path.dirname(TEST_FILE), "example_nesic_shared_goal.yaml"
+    )
+
+    async def scenario():
+        service = EvaluationService(port=0)
+        await service.start()
+        try:
+            _, loaded = await _post(service.port, "/models", {"path": yaml_path})
+            status, what_if = await _post(
+                service.port,
+                "/what-if",
+                {"model": loaded["model"], "evidence": {"Sn2": "notSat"}},
+            )
+            assert status == HTTPStatus.OK and what_if["goal"] == "G1"
+
+            model = service.models[loaded["model"]]
+            expected = model.query_belief_in_goal("G1").values[0]
+            assert what_if["baseline"] == pytest.approx(expected)
+            assert what_if["belief"] == pytest.approx(0.0)
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_evaluation_service_errors(tmp_path):
+    broken = tmp_path / "broken.yaml"
+    broken.write_text("G1:\n  text: [unclosed\n")
+
+    async def failing(payload):
+        raise RuntimeError("failure")
+
+    async def scenario():
+        service = EvaluationService(port=0)
+        service._routes[("POST", "/failing")] = failing
+        await service.start()
+        try:
+            status, error = await _post(service.port, "/models", {"path": str(broken)})
+            assert status == HTTPStatus.BAD_REQUEST and "error" in error
+
+            status, error = await _post(service.port, "/failing", {})
+            assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+            assert "failure" in error["error"]
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import pytest
+
+from bayesiangsn.core.GsnTree import GsnTree
+from bayesiangsn.NesicGsnTree import NesicBayesianGsnTree
+from bayesiangsn.service.GsnWatcher import GsnFileWatcher
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    "test_data",
+    "example_nesic_shared_context_with_probs.yaml",
+)
+
+
+def _edit(yaml_path, old, new):
+    with open(yaml_path) as file:
+        content = file.read()
+    with open(yaml_path, "w") as file:
+        file.write(content.replace(old, new))
+
+
+def _expected_beliefs(yaml_path):
+    nesic_tree = NesicBayesianGsnTree("expected", GsnTree("expected", yaml_path))
+    return {
+        goal: nesic_tree.query_belief_in_goal(goal).get_value(**{goal: "sat"})
+        for goal in ["G1", "G2", "G3"]
+    }
+
+
+def test_gsn_file_watcher(tmp_path):
+    yaml_path = str(tmp_path / "gsn.yaml")
+    shutil.copy(TEST_FILE, yaml_path)
+    watcher = GsnFileWatcher(yaml_path)
+    nesic_tree = watcher.nesic_tree
+
+    _edit(yaml_path, "text: Goal 3", "text: Goal three")
+    report = watcher.reload()
+    assert report["changes"] == {"structural": [], "belief": [], "text": ["G3"]}
+    assert watcher.gsn_tree.tree_elements["G3"].intent == "Goal three"
+    assert list(report["beliefs"]) == ["G1"]
+
+    _edit(yaml_path, "belief: 0.8", "belief: 0.5")
+    report = watcher.reload()
+    assert not report["rebuilt"] and watcher.nesic_tree is nesic_tree
+    assert set(report["beliefs"]) == {"G1", "G3"}
+    for goal, belief in report["beliefs"].items():
+        assert belief == pytest.approx(_expected_beliefs(yaml_path)[goal])
+
+    _edit(yaml_path, "belief: 0.5", "belief: [0.0, 0.0]")
+    report = watcher.reload()
+    assert report["beliefs"]["G3"] == 0.0
+    assert report["beliefs"] == pytest.approx(
+        {goal: _expected_beliefs(yaml_path)[goal] for goal in report["beliefs"]}
+    )
+
+    _edit(yaml_path, "supportedBy: [Sn2, Sn3]", "supportedBy: [Sn2]")
+    _edit(yaml_path, "supportedBy: [Sn1]", "supportedBy: [Sn1, Sn3]")
+    report = watcher.reload()
+    assert report["rebuilt"] and report["changes"]["structural"] == ["G2", "G3"]
+    assert report["beliefs"] == pytest.approx(_expected_beliefs(yaml_path))